@@ -0,0 +1,96 @@
+"""Benchmarks of the core paths of the client.
+
+The requests are sent to a local server answering like the ORCID API, so
+the timings measure the client rather than the network::
+
+    cd benchmarks
+    export PYTHONPATH=..
+    pytest --benchmark-autosave
+    pytest --benchmark-compare --benchmark-compare-fail=median:15%
+
+The first command stores a baseline in ``.benchmarks``, the second compares
+a run with the last baseline and fails on the benchmarks more than 15%
+slower.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from orcid.testsuite.helpers import exemplary_work, exemplary_work_xml
+
+from conftest import LARGE_ID, ORCID_ID, SEARCH_RESULTS, SMALL_ID, TOKEN
+
+ACCEPT_TYPES = {'json': 'application/orcid+json',
+                'xml': 'application/orcid+xml'}
+
+
+def test_search(benchmark, api):
+    """Read one page of search results."""
+    result = benchmark(api.search, 'family-name:Sanchez', rows=100,
+                       access_token=TOKEN)
+    assert len(result['result']) == 100
+
+
+def test_search_generator(benchmark, api):
+    """Read all the search results, 100 by page."""
+    def search():
+        return sum(1 for _ in api.search_generator(
+            'family-name:Sanchez', pagination=100, access_token=TOKEN))
+
+    assert benchmark(search) == SEARCH_RESULTS
+
+
+@pytest.mark.parametrize('size', ['small', 'large'])
+@pytest.mark.parametrize('data_format', ['json', 'xml'])
+def test_read_record_public(benchmark, api, size, data_format):
+    """Read and deserialize a works response."""
+    orcid_id = SMALL_ID if size == 'small' else LARGE_ID
+    works = benchmark(api.read_record_public, orcid_id, 'works', TOKEN,
+                      accept_type=ACCEPT_TYPES[data_format])
+    assert works is not None
+
+
+@pytest.mark.parametrize('data_format', ['json', 'xml'])
+def test_add_record(benchmark, api, data_format):
+    """Serialize and send a new work."""
+    data = exemplary_work if data_format == 'json' else exemplary_work_xml
+    put_code = benchmark(api.add_record, ORCID_ID, TOKEN, 'work', data,
+                         content_type=ACCEPT_TYPES[data_format])
+    assert put_code == '12345'
+
+
+@pytest.mark.parametrize('data_format', ['json', 'xml'])
+def test_update_record(benchmark, api, data_format):
+    """Serialize and send a changed work."""
+    data = exemplary_work if data_format == 'json' else exemplary_work_xml
+    benchmark(api.update_record, ORCID_ID, TOKEN, 'work', data, '12345',
+              content_type=ACCEPT_TYPES[data_format])
+
+
+def test_get_login_url(benchmark, api):
+    """Build the login URL of a researcher."""
+    url = benchmark(api.get_login_url, ['/read-limited', '/activities/update'],
+                    'https://example.com/orcid', state='state',
+                    family_names=u'S\xe1nchez', given_names=u'Jos\xe9',
+                    email='jose@example.com', lang='es', show_login=True)
+    assert url.startswith('https://orcid.org/oauth/authorize?')
+
+
+def test_get_token(benchmark, api, server):
+    """Log in with the user's password, parsing the login page."""
+    api._signout_url = server.url + '/signout'
+    api._login_or_register_endpoint = server.url + '/oauth/authorize'
+    api._login_url = server.url + '/oauth/custom/login.json'
+    api._token_url = server.url + '/oauth/token'
+    token = benchmark(api.get_token, 'user', 'password',
+                      'https://example.com/orcid')
+    assert token == TOKEN
+
+
+def test_import(benchmark):
+    """Import the package in a new interpreter."""
+    command = [sys.executable, '-c', 'import orcid']
+    benchmark.pedantic(subprocess.check_call, args=(command,), rounds=10,
+                       warmup_rounds=1)
@@ -0,0 +1,187 @@
+"""Benchmarks of concurrent record reads with threads, asyncio and gevent.
+
+Each round reads a works response of 500 groups 200 times, 32 at a time,
+from a local server. The ``longest_stall_ms`` extra info of the benchmarks
+is the longest time a ticker, waking up every millisecond, could not run:
+a thread with threads, a task of the event loop with asyncio and a greenlet
+with gevent. asyncio sends the requests from a thread pool, the client
+being blocking.
+
+gevent has to patch the standard library before anything else, so the
+gevent benchmarks time the rounds of ``gevent_worker.py``, run in its own
+interpreter with its own server. Run them with
+``GEVENT_MONITOR_THREAD_ENABLE=true`` to see which greenlets block the
+gevent hub.
+
+The ticker waits for everything runnable before it, so once the CPU is
+saturated the stall grows with the concurrency in every mode, parsing in
+slices included. Run with the rest of the suite, see ``bench_client.py``.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import simplejson as json
+
+from orcid import PublicAPI
+from orcid.cooperative import CooperativeParser
+from orcid.testsuite.helpers import StubServer
+from orcid.transport import RequestsTransport
+
+from conftest import ORCID_ID, TOKEN, make_json
+
+pytestmark = pytest.mark.benchmark(group='concurrency')
+
+REQUESTS = 200
+CONCURRENCY = 32
+GROUPS = 500
+
+ROUNDS = 5
+
+
+class Ticker(object):
+    """Thread measuring the longest time it could not run.
+
+    Under gevent, once the standard library is patched, the thread is a
+    greenlet.
+    """
+
+    def __init__(self):
+        """Initialize the ticker."""
+        self.stall = 0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._tick)
+
+    def _tick(self):
+        last = time.time()
+        while not self._done.is_set():
+            time.sleep(0.001)
+            now = time.time()
+            self.stall = max(self.stall, now - last)
+            last = now
+
+    def __enter__(self):
+        """Start ticking."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop ticking."""
+        self._done.set()
+        self._thread.join()
+
+
+def serve():
+    """Return a local server answering with the works response."""
+    content = json.dumps(make_json(GROUPS)).encode()
+    return StubServer({'/v2.0/%s/works' % ORCID_ID: (
+        200, {'Content-Type': 'application/orcid+json'}, content)})
+
+
+def make_api(url, cooperative=False):
+    """Return an API reading from the server, connected once."""
+    api = PublicAPI('APP-0000000000000000', 'secret',
+                    transport=RequestsTransport(pool_maxsize=CONCURRENCY),
+                    parser=CooperativeParser() if cooperative else None)
+    api._endpoint = url
+    read(api)
+    return api
+
+
+def read(api):
+    """Read the works response."""
+    # Keep nothing, or the garbage collector pauses grow with the results.
+    api.read_record_public(ORCID_ID, 'works', TOKEN)
+
+
+@pytest.fixture(scope='module')
+def works_server():
+    """Return a local server answering with the works response."""
+    server = serve()
+    yield server
+    server.close()
+
+
+def _record_stalls(benchmark, stalls):
+    benchmark.extra_info['longest_stall_ms'] = max(stalls) * 1000
+
+
+def test_threads(benchmark, works_server):
+    """Read from a pool of threads, ticking in another thread."""
+    api = make_api(works_server.url)
+    stalls = []
+
+    with ThreadPoolExecutor(CONCURRENCY) as executor:
+        def run():
+            with Ticker() as ticker:
+                list(executor.map(lambda _: read(api), range(REQUESTS)))
+            stalls.append(ticker.stall)
+
+        benchmark.pedantic(run, rounds=ROUNDS)
+    _record_stalls(benchmark, stalls)
+
+
+def test_asyncio(benchmark, works_server):
+    """Read from a thread pool driven by an asyncio event loop."""
+    api = make_api(works_server.url)
+    loop = asyncio.new_event_loop()
+    executor = ThreadPoolExecutor(CONCURRENCY)
+    stalls = []
+
+    async def ticker(stall):
+        last = time.time()
+        while True:
+            await asyncio.sleep(0.001)
+            now = time.time()
+            stall[0] = max(stall[0], now - last)
+            last = now
+
+    async def main():
+        stall = [0]
+        task = loop.create_task(ticker(stall))
+        await asyncio.gather(*[loop.run_in_executor(executor, read, api)
+                               for _ in range(REQUESTS)])
+        task.cancel()
+        stalls.append(stall[0])
+
+    try:
+        benchmark.pedantic(lambda: loop.run_until_complete(main()),
+                           rounds=ROUNDS)
+    finally:
+        executor.shutdown()
+        loop.close()
+    _record_stalls(benchmark, stalls)
+
+
+@pytest.fixture(params=['plain', 'cooperative'])
+def gevent_worker(request):
+    """Return a gevent worker, parsing in slices with ``cooperative``."""
+    pytest.importorskip('gevent')
+    worker = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__),
+                                      'gevent_worker.py'), request.param],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    # Wait for the server, the imports and the first connection.
+    assert worker.stdout.readline() == b'ready\n'
+    yield worker
+    worker.stdin.close()
+    worker.wait()
+
+
+def test_gevent(benchmark, gevent_worker):
+    """Read from a pool of greenlets, ticking in another greenlet."""
+    stalls = []
+
+    def run():
+        gevent_worker.stdin.write(b'\n')
+        gevent_worker.stdin.flush()
+        stalls.append(float(gevent_worker.stdout.readline()))
+
+    benchmark.pedantic(run, rounds=ROUNDS)
+    _record_stalls(benchmark, stalls)
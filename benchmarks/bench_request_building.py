@@ -0,0 +1,49 @@
+"""Benchmarks of the building of request URLs and headers.
+
+Compares the precomputed URL templates and cached headers used by the API
+with formatting them for every request. Run with the rest of the suite, see
+``bench_client.py``.
+"""
+
+import pytest
+
+from orcid.orcid import VERSION
+
+from conftest import ORCID_ID, TOKEN
+
+pytestmark = pytest.mark.benchmark(group='request building')
+
+# The same number of iterations per round for both ways of building a
+# record request, so that the timer overhead weighs the same on both.
+ROUNDS = {'rounds': 200, 'iterations': 1000, 'warmup_rounds': 10}
+
+
+def test_formatted_record_request(benchmark, api):
+    """Build a record request the way it was built before caching."""
+    def formatted():
+        url = '%s/%s/%s' % (api._endpoint + VERSION, ORCID_ID, 'work')
+        url += '/%s' % '12345'
+        headers = {'Accept': 'application/orcid+json',
+                   'Authorization': 'Bearer %s' % TOKEN}
+        return url, headers
+
+    url, _ = benchmark.pedantic(formatted, **ROUNDS)
+    assert url.endswith('/work/12345')
+
+
+def test_cached_record_request(benchmark, api):
+    """Build a record request with the cached builder."""
+    def cached():
+        builder = api._get_builder()
+        return (builder.record_url(ORCID_ID, 'work', '12345'),
+                builder.headers('application/orcid+json', TOKEN))
+
+    url, _ = benchmark.pedantic(cached, **ROUNDS)
+    assert url.endswith('/work/12345')
+
+
+def test_search_request(benchmark, api):
+    """Build an encoded search request."""
+    url = benchmark(lambda: api._get_builder().search_url(
+        'family-name:Sanchez', 'lucene', 100, 100))
+    assert 'family-name%3ASanchez' in url
@@ -0,0 +1,53 @@
+"""Benchmarks of the throughput of the HTTP/1.1 and HTTP/2 transports.
+
+Each round reads the same small record concurrently from 32 threads. The
+local server speaks HTTP/1.1 in clear text, so `HTTP2Transport` falls back
+to HTTP/1.1 here and the benchmarks compare the overhead of the transports
+rather than the multiplexing of HTTP/2. Run with the rest of the suite, see
+``bench_client.py``.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from orcid import PublicAPI
+from orcid.transport import HTTP2Transport, RequestsTransport
+
+from conftest import SMALL_ID, TOKEN
+
+pytestmark = pytest.mark.benchmark(group='transport')
+
+THREADS = 32
+REQUESTS = 200
+
+
+@pytest.fixture(params=['http1', 'http2'])
+def transport(request):
+    """Return one of the transports, closed after the benchmark."""
+    if request.param == 'http2':
+        httpx = pytest.importorskip('httpx')
+        pytest.importorskip('h2')
+        # Keep a connection alive for each thread, as the HTTP/1.1 pool
+        # does, since the local server cannot multiplex the requests.
+        transport = HTTP2Transport(limits=httpx.Limits(
+            max_keepalive_connections=THREADS))
+    else:
+        transport = RequestsTransport(pool_maxsize=THREADS)
+    yield transport
+    transport.close()
+
+
+def test_concurrent_reads(benchmark, server, transport):
+    """Read a record ``REQUESTS`` times from ``THREADS`` threads."""
+    api = PublicAPI('APP-0000000000000000', 'secret', transport=transport)
+    api._endpoint = server.url
+
+    def read(_):
+        return api.read_record_public(SMALL_ID, 'works', TOKEN)
+
+    read(None)
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = benchmark.pedantic(
+            lambda: list(executor.map(read, range(REQUESTS))), rounds=10)
+    assert len(results) == REQUESTS
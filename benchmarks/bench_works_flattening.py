@@ -0,0 +1,68 @@
+"""Benchmarks of the flattening of a profile with 10,000 works.
+
+Compares `orcid.works` with the nested loops consumers used to write, on
+the JSON and the XML representations. Run with the rest of the suite, see
+``bench_client.py``.
+"""
+
+import pytest
+
+from orcid.works import doi_index, flatten_works
+
+from conftest import GROUPS
+
+pytestmark = pytest.mark.benchmark(group='works flattening')
+
+
+def nested_loops(works):
+    """Index the preferred summaries by DOI with nested loops.
+
+    Extracts the same fields as `flatten_works`, the way consumers did.
+    """
+    dois = {}
+    for group in works['group']:
+        summaries = sorted(group['work-summary'],
+                           key=lambda summary: int(summary['display-index']),
+                           reverse=True)
+        preferred = summaries[0]
+        external_ids = []
+        for external_id in preferred['external-ids']['external-id']:
+            if external_id['external-id-relationship'] == 'SELF':
+                external_ids.append(
+                    (external_id['external-id-type'].lower(),
+                     external_id['external-id-value']))
+        work = {'put-code': preferred['put-code'],
+                'title': preferred['title']['title']['value'],
+                'type': preferred['type'].lower().replace('_', '-'),
+                'year': preferred['publication-date']['year']['value'],
+                'source': preferred['source']['source-name']['value'],
+                'external-ids': external_ids}
+        for id_type, value in external_ids:
+            if id_type == 'doi':
+                dois.setdefault(value.lower(), work)
+    return dois
+
+
+def test_nested_loops_json(benchmark, works):
+    """Index the JSON works by DOI with nested loops."""
+    assert len(benchmark(nested_loops, works)) == GROUPS
+
+
+def test_flatten_works_json(benchmark, works):
+    """Flatten the JSON works."""
+    assert len(benchmark(flatten_works, works)) == GROUPS
+
+
+def test_doi_index_json(benchmark, works):
+    """Index the JSON works by DOI."""
+    assert len(benchmark(doi_index, works)) == GROUPS
+
+
+def test_flatten_works_xml(benchmark, works_xml):
+    """Flatten the XML works."""
+    assert len(benchmark(flatten_works, works_xml)) == GROUPS
+
+
+def test_doi_index_xml(benchmark, works_xml):
+    """Index the XML works by DOI."""
+    assert len(benchmark(doi_index, works_xml)) == GROUPS
@@ -0,0 +1,59 @@
+"""Benchmarks of reading put-codes and external ids from a large XML payload.
+
+Compares parsing the tree and querying it with namespace maps, the
+precompiled XPath expressions and the target parser of `orcid.xmlutils`.
+Run with the rest of the suite, see ``bench_client.py``.
+"""
+
+import pytest
+from lxml import etree
+
+from orcid.xmlutils import extract, external_ids, parse_xml, put_codes
+
+pytestmark = pytest.mark.benchmark(group='xml access')
+
+NAMESPACES = {'common': 'http://www.orcid.org/ns/common'}
+
+
+def xpath(payload):
+    """Parse the tree and query it the way consumers did."""
+    tree = etree.XML(payload)
+    codes = [int(code) for code in tree.xpath('//@put-code')]
+    ids = [(node.xpath('common:external-id-type/text()',
+                       namespaces=NAMESPACES)[0],
+            node.xpath('common:external-id-value/text()',
+                       namespaces=NAMESPACES)[0])
+           for node in tree.xpath('//common:external-id',
+                                  namespaces=NAMESPACES)]
+    return codes, ids
+
+
+def precompiled(payload):
+    """Parse the tree and query it with the precompiled expressions."""
+    tree = parse_xml(payload)
+    return put_codes(tree), external_ids(tree)
+
+
+def target(payload):
+    """Read the fields without building the tree."""
+    fields = extract(payload, ('put-codes', 'external-ids'))
+    return fields['put-codes'], fields['external-ids']
+
+
+@pytest.fixture(scope='module')
+def payload(works_xml):
+    """Return the works of the large profile as an indented payload."""
+    return etree.tostring(works_xml, pretty_print=True)
+
+
+@pytest.fixture(scope='module')
+def expected(payload):
+    """Return the put-codes and external ids of the payload."""
+    return xpath(payload)
+
+
+@pytest.mark.parametrize('function', [xpath, precompiled, target],
+                         ids=lambda function: function.__name__)
+def test_xml_access(benchmark, payload, expected, function):
+    """Read the put-codes and external ids of the payload."""
+    assert benchmark(function, payload) == expected
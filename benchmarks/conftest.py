@@ -0,0 +1,175 @@
+"""Fixtures of the benchmark suite."""
+
+import pytest
+import simplejson as json
+from lxml import etree
+
+from orcid import MemberAPI
+from orcid.testsuite.helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+SMALL_ID = '0000-0001-5109-3700'
+LARGE_ID = '0000-0002-1694-233X'
+TOKEN = '7f2bd8a3-5f3c-4a41-a4f6-4d0d6e4b1c2e'
+
+SEARCH_RESULTS = 1000
+
+# A profile with 10,000 works: 5,000 groups of two versions.
+GROUPS = 5000
+VERSIONS = 2
+
+ACTIVITIES = 'http://www.orcid.org/ns/activities'
+COMMON = 'http://www.orcid.org/ns/common'
+WORK = 'http://www.orcid.org/ns/work'
+
+LOGIN_PAGE = b"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <meta name="_csrf" content="8f2a1b3c-4d5e-6f70-8192-a3b4c5d6e7f8">
+    <meta name="_csrf_header" content="X-CSRF-TOKEN">
+    <title>ORCID</title>
+    %s
+</head>
+<body>%s</body>
+</html>
+""" % (b'<link rel="stylesheet" href="/static/css/orcid.css">' * 50,
+       b'<div class="row"><p>Sign in with your ORCID account</p></div>' * 200)
+
+
+def _summary(group, version):
+    return {'put-code': group * VERSIONS + version,
+            'display-index': str(version),
+            'type': 'JOURNAL_ARTICLE',
+            'title': {'title': {'value': 'Work %d' % group},
+                      'subtitle': None},
+            'publication-date': {'year': {'value': '2001'},
+                                 'month': {'value': '01'}, 'day': None},
+            'source': {'source-orcid': None,
+                       'source-client-id': {'path': 'APP-%d' % version},
+                       'source-name': {'value': 'Source %d' % version}},
+            'external-ids': {'external-id': [
+                {'external-id-type': 'doi',
+                 'external-id-value': '10.1000/%d' % group,
+                 'external-id-url': None,
+                 'external-id-relationship': 'SELF'},
+                {'external-id-type': 'issn',
+                 'external-id-value': '1234-5678',
+                 'external-id-url': None,
+                 'external-id-relationship': 'PART_OF'}]},
+            'last-modified-date': {'value': 1500000000000}}
+
+
+def make_json(groups):
+    """Return a 'works' response as a dictionary."""
+    return {'group': [{'external-ids': _summary(group, 0)['external-ids'],
+                       'work-summary': [_summary(group, version)
+                                        for version in range(VERSIONS)]}
+                      for group in range(groups)]}
+
+
+def make_xml(works):
+    """Return the 'works' response as an lxml element."""
+    root = etree.Element('{%s}works' % ACTIVITIES,
+                         nsmap={'activities': ACTIVITIES, 'common': COMMON,
+                                'work': WORK})
+    for group in works['group']:
+        group_node = etree.SubElement(root, '{%s}group' % ACTIVITIES)
+        for summary in group['work-summary']:
+            node = etree.SubElement(group_node, '{%s}work-summary' % WORK,
+                                    {'put-code': str(summary['put-code']),
+                                     'display-index':
+                                     summary['display-index']})
+            title = etree.SubElement(node, '{%s}title' % WORK)
+            etree.SubElement(title, '{%s}title' % COMMON).text = \
+                summary['title']['title']['value']
+            external_ids = etree.SubElement(node,
+                                            '{%s}external-ids' % COMMON)
+            for item in summary['external-ids']['external-id']:
+                external_id = etree.SubElement(external_ids,
+                                               '{%s}external-id' % COMMON)
+                for key in ('external-id-type', 'external-id-value',
+                            'external-id-relationship'):
+                    etree.SubElement(external_id, '{%s}%s'
+                                     % (COMMON, key)).text = \
+                        item[key].lower()
+            etree.SubElement(node, '{%s}type' % WORK).text = \
+                'journal-article'
+    return root
+
+
+def _search(handler):
+    query = dict(parameter.split('=', 1) for parameter in
+                 handler.path.split('?', 1)[1].split('&'))
+    start = int(query.get('start', 0))
+    rows = int(query.get('rows', 10))
+    results = [{'orcid-identifier': {
+        'uri': 'https://orcid.org/0000-0000-0000-%04d' % index,
+        'path': '0000-0000-0000-%04d' % index, 'host': 'orcid.org'}}
+        for index in range(start, min(start + rows, SEARCH_RESULTS))]
+    return 200, {'Content-Type': 'application/json'}, json.dumps(
+        {'result': results, 'num-found': SEARCH_RESULTS}).encode()
+
+
+def _works(groups):
+    works = make_json(groups)
+    return (json.dumps(works).encode(),
+            etree.tostring(make_xml(works), xml_declaration=True,
+                           encoding='UTF-8'))
+
+
+@pytest.fixture(scope='session')
+def records():
+    """Return the small and the 5 MB works responses by iD and format."""
+    small_json, small_xml = _works(5)
+    large_json, large_xml = _works(3200)
+    return {(SMALL_ID, 'json'): small_json, (SMALL_ID, 'xml'): small_xml,
+            (LARGE_ID, 'json'): large_json, (LARGE_ID, 'xml'): large_xml}
+
+
+@pytest.fixture(scope='session')
+def works():
+    """Return the 'works' of a profile with 10,000 works as a dictionary."""
+    return make_json(GROUPS)
+
+
+@pytest.fixture(scope='session')
+def works_xml(works):
+    """Return the 'works' of the profile as an lxml element."""
+    return make_xml(works)
+
+
+@pytest.fixture(scope='session')
+def server(records):
+    """Return a local server answering like the ORCID API."""
+    def works(handler):
+        orcid_id = handler.path.split('/')[2]
+        content_type = handler.headers.get('Accept')
+        return 200, {'Content-Type': content_type}, records[
+            orcid_id, content_type.split('+')[-1]]
+
+    created = (201, {'Location': 'http://localhost/v2.0/%s/work/12345'
+                     % ORCID_ID}, b'')
+    stub = StubServer({
+        '/v2.0/search/': _search,
+        '/v2.0/%s/works' % SMALL_ID: works,
+        '/v2.0/%s/works' % LARGE_ID: works,
+        '/v2.0/%s/work' % ORCID_ID: created,
+        '/v2.0/%s/work/12345' % ORCID_ID: (200, {}, b''),
+        '/signout': (200, {}, b''),
+        '/oauth/authorize': (200, {'Content-Type': 'text/html'}, LOGIN_PAGE),
+        '/oauth/custom/login.json': (200, {}, json.dumps({
+            'redirectUrl': 'https://example.com/orcid?code=Q70Y3A'}).encode()),
+        '/oauth/token': (200, {}, json.dumps({
+            'access_token': TOKEN, 'orcid': ORCID_ID}).encode()),
+    })
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def api(server):
+    """Return a member API sending its requests to the local server."""
+    api = MemberAPI('APP-0000000000000000', 'secret')
+    api._endpoint = server.url
+    return api
@@ -0,0 +1,38 @@
+"""Worker of the gevent benchmarks of ``bench_concurrency.py``.
+
+Patches the standard library, starts a local server and, for every line
+read from its standard input, reads the works response with a pool of
+greenlets and answers with the longest stall of a ticker greenlet::
+
+    python gevent_worker.py plain|cooperative
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+
+def main():
+    """Serve the rounds asked on the standard input."""
+    import sys
+
+    from gevent.pool import Pool
+
+    from bench_concurrency import (CONCURRENCY, REQUESTS, Ticker, make_api,
+                                   read, serve)
+
+    server = serve()
+    api = make_api(server.url, cooperative=sys.argv[1] == 'cooperative')
+    pool = Pool(CONCURRENCY)
+    sys.stdout.write('ready\n')
+    sys.stdout.flush()
+    for _ in sys.stdin:
+        with Ticker() as ticker:
+            pool.map(lambda _: read(api), range(REQUESTS))
+        sys.stdout.write('%f\n' % ticker.stall)
+        sys.stdout.flush()
+    server.close()
+
+
+if __name__ == '__main__':
+    main()
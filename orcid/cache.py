@@ -0,0 +1,163 @@
+"""Record cache shared by the processes of a host."""
+
+import hashlib
+import struct
+import threading
+import time
+import zlib
+
+# Expiry time and flags stored in front of every cached payload.
+_HEADER = struct.Struct('>dB')
+_COMPRESSED = 1
+
+
+class LMDBCache(object):
+    """Cache of records stored in a memory-mapped LMDB database.
+
+    All the processes of a host opening the same ``path`` share the cached
+    payloads through the page cache instead of holding a copy each. Entries
+    expire after the time-to-live of their request type. When the database
+    is full, expired entries and then the entries closest to expiry are
+    evicted.
+
+    Requires the ``lmdb`` package. Open the cache after forking worker
+    processes, not before.
+    """
+
+    def __init__(self, path, map_size=2 ** 30, ttl=None, default_ttl=300,
+                 compress=False):
+        """Initialize the cache.
+
+        Parameters
+        ----------
+        :param path: string
+            The directory of the database.
+        :param map_size: integer
+            The maximum size of the database in bytes.
+        :param ttl: dict
+            The time-to-live in seconds per request type, for example
+            ``{'record': 3600, 'works': 600}``. A time-to-live of 0 disables
+            caching of the type.
+        :param default_ttl: float
+            The time-to-live of the other request types.
+        :param compress: boolean
+            Should the payloads be kept compressed, trading CPU time for
+            memory.
+        """
+        import lmdb
+        self._lmdb = lmdb
+        self._env = lmdb.open(path, map_size=map_size, max_dbs=2)
+        self._records = self._env.open_db(b'records')
+        self._expiry = self._env.open_db(b'expiry')
+        self._ttl = dict(ttl or {})
+        self._default_ttl = default_ttl
+        self._compress = compress
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, orcid_id, endpoint, request_type, put_code, accept_type,
+            token=None):
+        """Return the cache key of a read.
+
+        The token is part of the key of reads whose content depends on it,
+        such as member API reads.
+        """
+        if isinstance(put_code, list):
+            put_code = ','.join(put_code)
+        parts = [endpoint, request_type, '%s' % (put_code or ''),
+                 accept_type]
+        if token is not None:
+            parts.append(hashlib.sha1(token.encode('utf-8')).hexdigest())
+        return (orcid_id + '\0' + '\0'.join(parts)).encode('utf-8')
+
+    def get(self, key):
+        """Return the cached payload, or None if missing or expired."""
+        with self._env.begin(db=self._records, buffers=True) as txn:
+            value = txn.get(key)
+            if value is not None:
+                expires, flags = _HEADER.unpack_from(value)
+                if expires >= time.time():
+                    payload = value[_HEADER.size:]
+                    if flags & _COMPRESSED:
+                        payload = zlib.decompress(payload)
+                    else:
+                        payload = bytes(payload)
+                    with self._lock:
+                        self.hits += 1
+                    return payload
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, request_type, payload):
+        """Store a payload for the time-to-live of its request type."""
+        ttl = self._ttl.get(request_type, self._default_ttl)
+        if not ttl:
+            return
+        flags = 0
+        if self._compress:
+            payload = zlib.compress(payload)
+            flags |= _COMPRESSED
+        expires = time.time() + ttl
+        value = _HEADER.pack(expires, flags) + payload
+        try:
+            self._put(key, value, expires)
+        except self._lmdb.MapFullError:
+            self._evict()
+            try:
+                self._put(key, value, expires)
+            except self._lmdb.MapFullError:
+                pass
+
+    def invalidate(self, orcid_id):
+        """Remove all the cached reads of a record."""
+        prefix = (orcid_id + '\0').encode('utf-8')
+        with self._env.begin(write=True) as txn:
+            cursor = txn.cursor(self._records)
+            if not cursor.set_range(prefix):
+                return
+            while cursor.key().startswith(prefix):
+                expires, _ = _HEADER.unpack_from(cursor.value())
+                txn.delete(_expiry_key(expires, cursor.key()),
+                           db=self._expiry)
+                if not cursor.delete():
+                    break
+
+    def close(self):
+        """Close the database."""
+        self._env.close()
+
+    def _put(self, key, value, expires):
+        with self._env.begin(write=True) as txn:
+            previous = txn.get(key, db=self._records)
+            if previous is not None:
+                txn.delete(_expiry_key(_HEADER.unpack_from(previous)[0],
+                                       key), db=self._expiry)
+            txn.put(key, value, db=self._records)
+            txn.put(_expiry_key(expires, key), b'', db=self._expiry)
+
+    def _evict(self, fraction=0.1):
+        now = time.time()
+        with self._env.begin(write=True) as txn:
+            count = txn.stat(self._records)['entries']
+            to_evict = max(1, int(count * fraction))
+            cursor = txn.cursor(self._expiry)
+            evicted = 0
+            if not cursor.first():
+                return
+            expiry_key = cursor.key()
+            while expiry_key:
+                expires = struct.unpack_from('>d', expiry_key)[0]
+                if evicted >= to_evict and expires >= now:
+                    break
+                txn.delete(expiry_key[8:], db=self._records)
+                evicted += 1
+                if not cursor.delete():
+                    break
+                expiry_key = cursor.key()
+
+
+def _expiry_key(expires, key):
+    # Big-endian doubles of positive numbers sort in numerical order.
+    return struct.pack('>d', expires) + bytes(key)
@@ -0,0 +1,242 @@
+"""Circuit breaker failing fast while an ORCID endpoint is unhealthy."""
+
+from collections import deque
+import threading
+import time
+
+import requests
+
+from .exceptions import CircuitOpen, DeadlineExceeded, ResponseTooLarge
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+_now = getattr(time, 'monotonic', time.time)
+
+
+def _endpoint(url):
+    scheme, _, rest = url.partition('://')
+    return scheme + '://' + rest.split('/', 1)[0].split('?', 1)[0]
+
+
+class _Circuit(object):
+
+    def __init__(self, window):
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = None
+        self.trials = 0
+        self.trial_successes = 0
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+
+
+class CircuitBreaker(object):
+    """Stop sending requests to an endpoint that keeps failing.
+
+    Every endpoint (scheme and host) has its own circuit. A closed circuit
+    lets the requests through and records whether they failed or were slow.
+    When the rate of failures or of slow calls over the recent requests
+    exceeds its threshold, the circuit opens, and requests raise
+    `orcid.exceptions.CircuitOpen` immediately instead of waiting for a
+    timeout. After ``open_duration`` seconds, the circuit is half-open and
+    lets a few trial requests through. It closes if they all succeed and
+    opens again otherwise.
+
+    Connection errors, timeouts, bodies cut short or failing to decode and
+    responses with a 5xx status are failures. Requests that waited on the
+    endpoint until the caller's deadline ran out are slow calls. Other error
+    responses do not count, and neither do requests whose deadline had
+    passed before they were sent.
+    """
+
+    def __init__(self, failure_rate=0.5, slow_call_rate=0.8,
+                 slow_call_duration=10.0, window=50, min_calls=10,
+                 open_duration=30.0, half_open_calls=3,
+                 on_state_change=None):
+        """Initialize the breaker.
+
+        Parameters
+        ----------
+        :param failure_rate: float
+            The ratio of failed requests opening the circuit.
+        :param slow_call_rate: float
+            The ratio of slow requests opening the circuit.
+        :param slow_call_duration: float
+            The duration in seconds from which a request is slow.
+        :param window: integer
+            The number of recent requests the rates are computed from.
+        :param min_calls: integer
+            The number of requests to observe before the circuit may open.
+        :param open_duration: float
+            The time in seconds the circuit stays open before trial requests
+            are let through.
+        :param half_open_calls: integer
+            The number of successful trial requests closing the circuit.
+        :param on_state_change: callable
+            Called as ``on_state_change(endpoint, old_state, new_state)``
+            whenever a circuit changes its state.
+        """
+        self._failure_rate = failure_rate
+        self._slow_call_rate = slow_call_rate
+        self._slow_call_duration = slow_call_duration
+        self._window = window
+        self._min_calls = min_calls
+        self._open_duration = open_duration
+        self._half_open_calls = half_open_calls
+        self._on_state_change = on_state_change
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def state(self, endpoint):
+        """Return the state of an endpoint: 'closed', 'open' or 'half-open'.
+
+        Parameters
+        ----------
+        :param endpoint: string
+            The endpoint, or any URL on it.
+        """
+        endpoint = _endpoint(endpoint)
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None:
+                return CLOSED
+            if circuit.state == OPEN and self._retry_after(circuit) <= 0:
+                return HALF_OPEN
+            return circuit.state
+
+    def metrics(self):
+        """Return the state and the counters of every endpoint.
+
+        Returns
+        -------
+        :returns: dict
+            Maps the endpoints to dictionaries with the keys 'state',
+            'calls', 'failures', 'slow_calls' and 'rejected'.
+        """
+        with self._lock:
+            endpoints = list(self._circuits.items())
+        return dict((endpoint, {'state': self.state(endpoint),
+                                'calls': circuit.calls,
+                                'failures': circuit.failures,
+                                'slow_calls': circuit.slow_calls,
+                                'rejected': circuit.rejected})
+                    for endpoint, circuit in endpoints)
+
+    def call(self, url, send):
+        """Call `send` if the circuit of the URL's endpoint allows it.
+
+        Parameters
+        ----------
+        :param url: string
+            The URL of the request.
+        :param send: callable
+            Sends the request and returns a `requests.Response`.
+
+        Returns
+        -------
+        :returns: requests.Response
+            The response.
+
+        Raises
+        ------
+        :raises: orcid.exceptions.CircuitOpen
+            If the circuit is open.
+        """
+        endpoint = _endpoint(url)
+        self._acquire(endpoint)
+        start = _now()
+        try:
+            response = send()
+        except DeadlineExceeded:
+            # Deadlines passed before sending are raised before `call`, so
+            # this request waited on the endpoint for all the time left.
+            self._record(endpoint, False, _now() - start, True)
+            raise
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.ContentDecodingError):
+            self._record(endpoint, True, _now() - start)
+            raise
+        except ResponseTooLarge:
+            self._record(endpoint, False, _now() - start)
+            raise
+        except BaseException:
+            self._release(endpoint)
+            raise
+        self._record(endpoint, response.status_code >= 500, _now() - start)
+        return response
+
+    def _retry_after(self, circuit):
+        return circuit.opened_at + self._open_duration - _now()
+
+    def _acquire(self, endpoint):
+        changes = []
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None:
+                circuit = self._circuits[endpoint] = _Circuit(self._window)
+            if circuit.state == OPEN:
+                retry_after = self._retry_after(circuit)
+                if retry_after > 0:
+                    circuit.rejected += 1
+                    raise CircuitOpen(endpoint, retry_after)
+                self._transition(endpoint, circuit, HALF_OPEN, changes)
+            if circuit.state == HALF_OPEN:
+                if circuit.trials >= self._half_open_calls:
+                    circuit.rejected += 1
+                    raise CircuitOpen(endpoint, 0)
+                circuit.trials += 1
+        self._notify(changes)
+
+    def _release(self, endpoint):
+        # The request failed for a reason unrelated to the endpoint.
+        with self._lock:
+            circuit = self._circuits[endpoint]
+            if circuit.state == HALF_OPEN and circuit.trials:
+                circuit.trials -= 1
+
+    def _record(self, endpoint, failed, duration, slow=False):
+        slow = slow or duration >= self._slow_call_duration
+        changes = []
+        with self._lock:
+            circuit = self._circuits[endpoint]
+            circuit.calls += 1
+            circuit.failures += failed
+            circuit.slow_calls += slow
+            if circuit.state == HALF_OPEN:
+                if failed or slow:
+                    self._transition(endpoint, circuit, OPEN, changes)
+                else:
+                    circuit.trial_successes += 1
+                    if circuit.trial_successes >= self._half_open_calls:
+                        self._transition(endpoint, circuit, CLOSED, changes)
+            elif circuit.state == CLOSED:
+                circuit.outcomes.append((failed, slow))
+                count = len(circuit.outcomes)
+                if count >= self._min_calls and (
+                        sum(o[0] for o in circuit.outcomes) >=
+                        self._failure_rate * count or
+                        sum(o[1] for o in circuit.outcomes) >=
+                        self._slow_call_rate * count):
+                    self._transition(endpoint, circuit, OPEN, changes)
+        self._notify(changes)
+
+    def _transition(self, endpoint, circuit, state, changes):
+        changes.append((endpoint, circuit.state, state))
+        circuit.state = state
+        circuit.trials = circuit.trial_successes = 0
+        if state == OPEN:
+            circuit.opened_at = _now()
+        elif state == CLOSED:
+            circuit.outcomes.clear()
+
+    def _notify(self, changes):
+        # Called without the lock, so the callback may use the breaker.
+        if self._on_state_change is not None:
+            for change in changes:
+                self._on_state_change(*change)
@@ -0,0 +1,412 @@
+"""Command-line harvester of ORCID records.
+
+Installed as the ``orcid`` command::
+
+    orcid search 'affiliation-org-name:CERN' -o people.jsonl
+    orcid fetch people.jsonl -o records.jsonl --concurrency 16 --rate 20
+    orcid works people.jsonl -o works --format parquet --resume
+
+Run ``orcid --help`` for all the options.
+"""
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import glob
+import os
+import sys
+import threading
+import time
+
+import simplejson as json
+
+from .orcid import PublicAPI
+from .transport import HTTP2Transport, RequestsTransport
+from .validation import validate_identifiers
+
+# The maximum number of results of a search request.
+SEARCH_PAGE_SIZE = 1000
+
+# The maximum number of works read with a single request.
+WORKS_BATCH_SIZE = 100
+
+_now = getattr(time, 'monotonic', time.time)
+
+
+class _RateLimiter(object):
+    """Space the requests of all the threads evenly."""
+
+    def __init__(self, rate):
+        self._interval = 1.0 / rate if rate else 0
+        self._next = _now()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self._interval:
+            return
+        with self._lock:
+            now = _now()
+            at = max(self._next, now)
+            self._next = at + self._interval
+        if at > now:
+            time.sleep(at - now)
+
+
+class _Progress(object):
+    """Progress line with the throughput and the error count."""
+
+    def __init__(self, stream, quiet=False):
+        self._stream = stream
+        self._quiet = quiet
+        self._start = self._shown = _now()
+        self.done = 0
+        self.rows = 0
+        self.errors = 0
+
+    def update(self, force=False):
+        now = _now()
+        if self._quiet or not force and now - self._shown < 1:
+            return
+        self._shown = now
+        elapsed = max(now - self._start, 1e-9)
+        self._stream.write('\r%d done, %d rows, %d errors, %.1f/s'
+                           % (self.done, self.rows, self.errors,
+                              self.done / elapsed))
+        self._stream.flush()
+
+    def finish(self):
+        self.update(force=True)
+        if not self._quiet:
+            self._stream.write('\n')
+
+    def error(self, item, error):
+        self.errors += 1
+        if not self._quiet:
+            self._stream.write('\r%s: %s\n' % (item, error))
+
+
+class _JSONLinesWriter(object):
+    """Write the rows to a file of JSON lines.
+
+    Once all the rows of an iD are written, the iD is added to a ``.done``
+    file next to the output with the size of the output at that point.
+    Resumed runs skip the iDs listed there and drop the rows written after
+    the last of them.
+    """
+
+    def __init__(self, path, resume):
+        self.done = set()
+        if path == '-':
+            self._file = sys.stdout
+            self._finished = None
+            return
+        finished = path + '.done'
+        mode = 'w'
+        if resume and os.path.exists(path) and os.path.exists(finished):
+            size = self._read_done(finished)
+            with open(path, 'rb+') as existing:
+                # Drop the rows of an iD cut by an interruption.
+                existing.truncate(size)
+            mode = 'a'
+        self._file = open(path, mode)
+        self._finished = open(finished, mode)
+
+    def _read_done(self, path):
+        with open(path, 'rb+') as finished:
+            end = size = 0
+            for line in finished:
+                if not line.endswith(b'\n'):
+                    break
+                end += len(line)
+                orcid_id, size = line.decode('utf-8').split('\t')
+                self.done.add(orcid_id)
+            finished.truncate(end)
+        return int(size)
+
+    def write(self, item, rows):
+        for row in rows:
+            self._file.write(json.dumps(row) + '\n')
+        self._file.flush()
+        if self._finished is not None:
+            self._finished.write('%s\t%d\n' % (item, self._file.tell()))
+            self._finished.flush()
+
+    def close(self):
+        if self._finished is not None:
+            self._file.close()
+            self._finished.close()
+
+
+class _ParquetWriter(object):
+    """Write the rows to a directory of Parquet files.
+
+    Every run writes a new part file, so resumed runs add to the previous
+    parts. The files have the columns ``orcid_id`` and ``json``, the
+    JSON-encoded row. When a part is closed, the iDs whose rows it holds
+    are listed in a ``.done`` file of the same name. Resumed runs skip those
+    iDs and delete the parts that were never closed.
+    """
+
+    def __init__(self, path, resume, row_group_size=10000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit('Parquet output requires the pyarrow package.')
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.done = set()
+        if path == '-':
+            raise SystemExit('Parquet output requires --output.')
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        finished = set()
+        if resume:
+            for part in glob.glob(os.path.join(path, 'part-*.done')):
+                finished.add(part[:-len('.done')])
+                with open(part) as done:
+                    self.done.update(line.strip() for line in done)
+        for part in glob.glob(os.path.join(path, 'part-*.*')):
+            if os.path.splitext(part)[0] not in finished:
+                os.remove(part)
+        self._path = os.path.join(path, 'part-%05d' % len(finished))
+        self._schema = pyarrow.schema([('orcid_id', pyarrow.string()),
+                                       ('json', pyarrow.string())])
+        self._writer = None
+        self._rows = []
+        self._finished = []
+        self._row_group_size = row_group_size
+
+    def write(self, item, rows):
+        self._rows.extend((row['orcid-id'], json.dumps(row))
+                          for row in rows)
+        self._finished.append(item)
+        if len(self._rows) >= self._row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path + '.parquet',
+                                                  self._schema)
+        ids, documents = zip(*self._rows)
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(ids, self._pa.string()),
+             self._pa.array(documents, self._pa.string())],
+            schema=self._schema))
+        self._rows = []
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+        with open(self._path + '.done', 'w') as done:
+            done.writelines('%s\n' % item for item in self._finished)
+
+
+_WRITERS = {'jsonl': _JSONLinesWriter, 'parquet': _ParquetWriter}
+
+
+def _read_ids(path):
+    """Yield the iDs of a file of iDs or of rows written by this command."""
+    stream = sys.stdin if path == '-' else open(path)
+    try:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                yield json.loads(line)['orcid-id']
+            else:
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _harvest(items, task, writer, progress, concurrency):
+    """Run `task` on the items concurrently and write the rows it returns."""
+    with ThreadPoolExecutor(concurrency) as executor:
+        pending = {}
+        items = iter(items)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < concurrency * 2:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if item in writer.done:
+                    continue
+                writer.done.add(item)
+                pending[executor.submit(task, item)] = item
+            if not pending:
+                break
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    rows = future.result()
+                except Exception as error:
+                    progress.error(item, error)
+                else:
+                    writer.write(item, rows)
+                    progress.rows += len(rows)
+                progress.done += 1
+            progress.update()
+
+
+def _search(api, args, limiter, token):
+    index = 0
+    while True:
+        limiter.wait()
+        page = api.expanded_search(args.query, index, SEARCH_PAGE_SIZE,
+                                   token).get('expanded-result')
+        if not page:
+            return
+        for result in page:
+            yield result
+        index += SEARCH_PAGE_SIZE
+
+
+def _run_search(api, args, writer, progress, limiter, token):
+    for result in _search(api, args, limiter, token):
+        if result['orcid-id'] in writer.done:
+            continue
+        writer.done.add(result['orcid-id'])
+        writer.write(result['orcid-id'], [result])
+        progress.done += 1
+        progress.rows += 1
+        progress.update()
+
+
+def _fetch_task(api, args, limiter, token):
+    def fetch(orcid_id):
+        # Malformed iDs fail without spending the rate.
+        validate_identifiers(orcid_id)
+        limiter.wait()
+        return [{'orcid-id': orcid_id,
+                 args.request_type: api.read_record_public(
+                     orcid_id, args.request_type, token)}]
+    return fetch
+
+
+def _works_task(api, args, limiter, token):
+    def works(orcid_id):
+        validate_identifiers(orcid_id)
+        limiter.wait()
+        summary = api.read_record_public(orcid_id, 'works', token)
+        put_codes = ['%s' % work_summary['put-code']
+                     for group in summary.get('group') or []
+                     for work_summary in group.get('work-summary') or []]
+        rows = []
+        for start in range(0, len(put_codes), WORKS_BATCH_SIZE):
+            limiter.wait()
+            bulk = api.read_record_public(
+                orcid_id, 'works', token,
+                put_codes[start:start + WORKS_BATCH_SIZE])
+            for item in bulk.get('bulk') or []:
+                if 'work' in item:
+                    rows.append({'orcid-id': orcid_id,
+                                 'put-code': item['work']['put-code'],
+                                 'work': item['work']})
+        return rows
+    return works
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='orcid', description='Harvest ORCID records.')
+    parser.add_argument('--key', default=os.environ.get('ORCID_KEY'),
+                        help='institution key, by default $ORCID_KEY')
+    parser.add_argument('--secret', default=os.environ.get('ORCID_SECRET'),
+                        help='institution secret, by default $ORCID_SECRET')
+    parser.add_argument('--token', help='search token, fetched with the '
+                        'key and secret if not given')
+    parser.add_argument('--sandbox', action='store_true',
+                        help='use the sandbox')
+    parser.add_argument('--endpoint', help=argparse.SUPPRESS)
+    parser.add_argument('-o', '--output', default='-',
+                        help='output file, or directory for Parquet, by '
+                        'default the standard output')
+    parser.add_argument('--format', choices=sorted(_WRITERS),
+                        default='jsonl', help='output format')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip the iDs already written in full')
+    parser.add_argument('-c', '--concurrency', type=int, default=8,
+                        help='number of concurrent requests')
+    parser.add_argument('--rate', type=float, default=0,
+                        help='maximum requests per second, 0 for no limit')
+    parser.add_argument('--timeout', type=float, default=30,
+                        help='request timeout in seconds')
+    parser.add_argument('--http2', action='store_true',
+                        help='multiplex the requests over HTTP/2')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='do not show the progress')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    search = commands.add_parser(
+        'search', help='write the expanded results of a search')
+    search.add_argument('query', help='Lucene query')
+
+    fetch = commands.add_parser(
+        'fetch', help='read the records of a file of iDs')
+    fetch.add_argument('ids', help="file of iDs, or of rows written by "
+                       "'search', or - for the standard input")
+    fetch.add_argument('--request-type', default='record',
+                       help="request type, for example 'person'")
+
+    works = commands.add_parser(
+        'works', help='read all the works of a file of iDs')
+    works.add_argument('ids', help="file of iDs, or of rows written by "
+                       "'search', or - for the standard input")
+    return parser
+
+
+def main(argv=None):
+    """Run the ``orcid`` command.
+
+    Parameters
+    ----------
+    :param argv: list of strings
+        The arguments. By default the arguments of the process.
+
+    Returns
+    -------
+    :returns: integer
+        The exit status, 1 if any item failed.
+    """
+    args = _parser().parse_args(argv)
+    if args.token is None and not (args.key and args.secret):
+        raise SystemExit('Either --token or --key and --secret are needed.')
+    if args.http2:
+        transport = HTTP2Transport()
+    else:
+        transport = RequestsTransport(pool_maxsize=args.concurrency)
+    api = PublicAPI(args.key, args.secret, sandbox=args.sandbox,
+                    timeout=args.timeout, transport=transport)
+    if args.endpoint:
+        api._endpoint = args.endpoint
+    token = args.token or api.get_search_token_from_orcid()
+    limiter = _RateLimiter(args.rate)
+    progress = _Progress(sys.stderr, args.quiet)
+    writer = _WRITERS[args.format](args.output, args.resume)
+    try:
+        if args.command == 'search':
+            _run_search(api, args, writer, progress, limiter, token)
+        else:
+            task = (_fetch_task if args.command == 'fetch'
+                    else _works_task)(api, args, limiter, token)
+            _harvest(_read_ids(args.ids), task, writer, progress,
+                     args.concurrency)
+    finally:
+        writer.close()
+        progress.finish()
+        transport.close()
+    return 1 if progress.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Parsing of large responses without blocking an event loop.
+
+Under gevent or eventlet, all the greenlets of a process share one thread.
+Parsing a large response in a greenlet stops the others for as long as it
+takes. `CooperativeParser` parses XML and HTML documents in native worker
+threads, where lxml releases the GIL and html5lib, written in Python, is
+interrupted regularly. JSON documents are decoded in slices instead,
+yielding to the event loop between them: the C decoder of simplejson keeps
+the GIL until it is done, so a thread would not help.
+"""
+
+import re
+import time
+
+from bs4 import BeautifulSoup
+from lxml import etree
+import simplejson as json
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+
+class _SlicedDecoder(object):
+    """Decode JSON, yielding every ``time_slice`` seconds.
+
+    The containers near the root are walked here, and their items are
+    decoded by the C decoder of simplejson.
+    """
+
+    def __init__(self, text, pause, time_slice, depth):
+        self._text = text
+        self._pause = pause
+        self._time_slice = time_slice
+        self._depth = depth
+        self._decoder = json.JSONDecoder()
+        self._yielded = _timer()
+
+    def decode(self):
+        value, index = self._value(0, self._depth)
+        index = _WHITESPACE.match(self._text, index).end()
+        if index != len(self._text):
+            raise json.JSONDecodeError('Extra data', self._text, index)
+        return value
+
+    def _skip(self, index):
+        return _WHITESPACE.match(self._text, index).end()
+
+    def _expect(self, index, characters):
+        index = self._skip(index)
+        if index >= len(self._text) or self._text[index] not in characters:
+            raise json.JSONDecodeError('Expecting %s' % ' or '.join(
+                repr(character) for character in characters), self._text,
+                index)
+        return self._text[index], index + 1
+
+    def _value(self, index, depth):
+        text = self._text
+        index = self._skip(index)
+        opening = text[index:index + 1]
+        if depth == 0 or opening not in ('[', '{'):
+            value, index = self._decoder.raw_decode(text, index)
+            now = _timer()
+            if now - self._yielded > self._time_slice:
+                self._pause()
+                self._yielded = _timer()
+            return value, index
+        closing = ']' if opening == '[' else '}'
+        result = [] if opening == '[' else {}
+        index = self._skip(index + 1)
+        if text[index:index + 1] == closing:
+            return result, index + 1
+        while True:
+            if opening == '[':
+                value, index = self._value(index, depth - 1)
+                result.append(value)
+            else:
+                _, index = self._expect(index, '"')
+                key, index = self._decoder.raw_decode(text, index - 1)
+                _, index = self._expect(index, ':')
+                result[key], index = self._value(index, depth - 1)
+            separator, index = self._expect(index, (',', closing))
+            if separator == closing:
+                return result, index
+
+
+class CooperativeParser(object):
+    """Parser of responses letting other greenlets run meanwhile.
+
+    JSON and XML documents smaller than ``threshold`` bytes are parsed
+    directly, the larger ones are parsed in ``threadpool`` or, for JSON, in
+    slices. HTML pages are always parsed in ``threadpool``.
+    """
+
+    def __init__(self, threadpool=None, threshold=64 * 1024,
+                 time_slice=0.005, pause=None, xml_parser=etree.XML):
+        """Initialize the parser.
+
+        Parameters
+        ----------
+        :param threadpool: gevent.threadpool.ThreadPool
+            The pool of native threads parsing XML and HTML, or any object
+            with an ``apply(function, args)`` method calling the function
+            without blocking the event loop, for example around
+            ``eventlet.tpool.execute``. If None, the thread pool of the
+            gevent hub is used.
+        :param threshold: integer
+            The size in bytes from which JSON and XML documents are parsed
+            cooperatively.
+        :param time_slice: float
+            The time in seconds JSON decoding runs before yielding.
+        :param pause: callable
+            Lets the event loop run its pending timers and I/O, for example
+            ``eventlet.sleep``. If None, ``gevent.idle`` is used:
+            ``gevent.sleep(0)`` only switches to the greenlets already
+            runnable.
+        :param xml_parser: callable
+            Parses XML documents, for example `orcid.xmlutils.parse_xml`.
+        """
+        self._threadpool = threadpool
+        self._threshold = threshold
+        self._time_slice = time_slice
+        self._pause = pause
+        self._xml_parser = xml_parser
+
+    def loads(self, data):
+        """Decode a JSON document."""
+        if len(data) < self._threshold:
+            return json.loads(data)
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        if self._pause is None:
+            import gevent
+            self._pause = gevent.idle
+        # The items of the responses are decoded whole: the works of a
+        # 'works' response, for example, are at the third level.
+        return _SlicedDecoder(data, self._pause, self._time_slice,
+                              3).decode()
+
+    def parse_xml(self, data):
+        """Parse an XML document with ``xml_parser``."""
+        if len(data) < self._threshold:
+            return self._xml_parser(data)
+        return self._apply(self._xml_parser, data)
+
+    def parse_html(self, data):
+        """Parse an HTML page with html5lib."""
+        return self._apply(BeautifulSoup, data, 'html5lib')
+
+    def _apply(self, function, *args):
+        if self._threadpool is None:
+            import gevent
+            self._threadpool = gevent.get_hub().threadpool
+        return self._threadpool.apply(function, args)
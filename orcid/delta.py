@@ -0,0 +1,127 @@
+"""Detection of record updates that would not change anything."""
+
+import hashlib
+import threading
+
+from lxml import etree
+import simplejson as json
+
+# Set by ORCID rather than by the client, so they differ between the
+# payload written and the copy read back. They are only ignored at the top
+# level of an item: nested fields of the same name, such as the 'path' of a
+# contributor's iD, belong to the record.
+SERVER_FIELDS = frozenset(['put-code', 'path', 'visibility', 'display-index',
+                           'created-date', 'last-modified-date', 'source'])
+
+
+def _normalize_json(value, top=False):
+    if isinstance(value, dict):
+        normalized = {}
+        for key, item in value.items():
+            if top and key in SERVER_FIELDS:
+                continue
+            item = _normalize_json(item)
+            if item not in (None, '', [], {}):
+                normalized[key] = item
+        return normalized
+    if isinstance(value, list):
+        return [_normalize_json(item) for item in value]
+    return value
+
+
+def _normalize_xml(element, top=False):
+    attributes = sorted((name, value) for name, value in element.attrib.items()
+                        if not top or
+                        etree.QName(name).localname not in SERVER_FIELDS)
+    # Comments and processing instructions have a function as tag.
+    children = [_normalize_xml(child) for child in element
+                if not callable(child.tag) and
+                (not top or
+                 etree.QName(child).localname not in SERVER_FIELDS)]
+    return [element.tag, attributes, (element.text or '').strip(), children]
+
+
+def digest(data, content_type='application/orcid+json'):
+    """Return the hash of a record, ignoring the fields set by ORCID.
+
+    Payloads differing only by their put-code, source, dates, visibility,
+    empty values, key order, namespace prefixes or whitespace have the same
+    hash.
+
+    Parameters
+    ----------
+    :param data: dict | lxml.etree._Element
+        The record, as passed to `MemberAPI.update_record`.
+    :param content_type: string
+        MIME type of the record.
+
+    Returns
+    -------
+    :returns: string
+        The hexadecimal SHA-1 of the normalized record.
+    """
+    if content_type == 'application/orcid+json':
+        normalized = _normalize_json(data, top=True)
+    elif content_type == 'application/orcid+xml':
+        normalized = _normalize_xml(data, top=True)
+    else:
+        raise NotImplementedError('Cannot hash content of type %s'
+                                  % content_type)
+    return hashlib.sha1(json.dumps(normalized, sort_keys=True,
+                                   separators=(',', ':')).encode(
+                                       'utf-8')).hexdigest()
+
+
+class DeltaTracker(object):
+    """Hashes of the records last written, to skip identical updates.
+
+    ``sent`` counts the updates ORCID accepted and ``suppressed`` the ones
+    skipped because the record had not changed. Additions and removals are
+    not counted. ``fetched`` counts the records read to compare with, when
+    no hash was known.
+    """
+
+    def __init__(self, store=None, fetch_missing=False):
+        """Initialize the tracker.
+
+        Parameters
+        ----------
+        :param store: mapping
+            Where the hashes are kept, by 'orcid_id/request_type/put_code'
+            string. Pass a persistent mapping, for example a `shelve`, to
+            keep them between runs. If None, a dictionary is used.
+        :param fetch_missing: boolean
+            If True, a record with no known hash is read from ORCID, or
+            from the cache of the API, and compared with the update before
+            sending it.
+        """
+        self._store = {} if store is None else store
+        self.fetch_missing = fetch_missing
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.suppressed = 0
+        self.fetched = 0
+
+    def get(self, orcid_id, request_type, put_code):
+        """Return the hash of the record last written, or None."""
+        with self._lock:
+            return self._store.get(_key(orcid_id, request_type, put_code))
+
+    def set(self, orcid_id, request_type, put_code, value):
+        """Remember the hash of a record written."""
+        with self._lock:
+            self._store[_key(orcid_id, request_type, put_code)] = value
+
+    def forget(self, orcid_id, request_type, put_code):
+        """Forget the hash of a removed record."""
+        with self._lock:
+            self._store.pop(_key(orcid_id, request_type, put_code), None)
+
+    def count(self, counter):
+        """Increment 'sent', 'suppressed' or 'fetched'."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def _key(orcid_id, request_type, put_code):
+    return '%s/%s/%s' % (orcid_id, request_type, put_code)
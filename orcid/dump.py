@@ -0,0 +1,167 @@
+"""Reading records from the ORCID public data files.
+
+ORCID publishes the public records of all researchers as tar.gz archives
+of XML files, one per record summary or activity, and the list of the
+records changed since. Reading them replaces polling the API for large
+numbers of iDs::
+
+    from orcid.dump import changed_ids, read_dump
+
+    tracked = set(changed_ids('last_modified.csv.tar', since='2019-06-01'))
+    for item in read_dump('ORCID_2019_summaries.tar.gz', tracked):
+        update(item.orcid_id, item.data)
+
+The archives are read as streams. No file is extracted and only the
+records of the selected iDs are parsed.
+"""
+
+from collections import namedtuple
+from contextlib import closing, contextmanager
+import csv
+import gzip
+import re
+import sys
+import tarfile
+
+from lxml import etree
+
+from .xmlutils import _PARSER_OPTIONS as _XML_OPTIONS
+
+_ID_IN_NAME = re.compile(r'\d{4}-\d{4}-\d{4}-\d{3}[\dX]')
+
+# The files are ORCID's own, and some records exceed the limits of lxml.
+_PARSER_OPTIONS = dict(_XML_OPTIONS, huge_tree=True, remove_blank_text=True)
+
+
+class DumpItem(namedtuple('DumpItem', ['orcid_id', 'request_type',
+                                       'put_code', 'data'])):
+    """A record of a public data file.
+
+    ``request_type`` is the request type returning the same data from the
+    API, for example 'record' for the summaries and 'work' for the works,
+    or 'error' for the records that are not public anymore. ``put_code``
+    is an integer for activities and None otherwise. ``data`` is the XML
+    element, as returned by ``read_record_public`` with
+    ``accept_type='application/orcid+xml'``. The files hold no JSON, and
+    the JSON of the API is not a plain translation of its XML, so no
+    dictionary is offered in its place.
+    """
+
+    __slots__ = ()
+
+
+def _parse(stream, orcid_id, request_types):
+    context = etree.iterparse(stream, events=('start',), **_PARSER_OPTIONS)
+    root = request_type = None
+    for _, element in context:
+        if root is None:
+            root = element
+            request_type = etree.QName(root).localname
+            if request_types is not None and \
+                    request_type not in request_types:
+                # Skip the rest of the file unparsed.
+                return None
+    put_code = root.get('put-code')
+    return DumpItem(orcid_id, request_type,
+                    int(put_code) if put_code else None, root)
+
+
+def read_dump(source, orcid_ids=None, request_types=None,
+              accept_type='application/orcid+xml'):
+    """Yield the records of a public data file.
+
+    Parameters
+    ----------
+    :param source: string or file
+        The path of the archive, or the archive opened in binary mode. Both
+        compressed and uncompressed archives are read.
+    :param orcid_ids: set of strings
+        The iDs to read. If None, all the records are read.
+    :param request_types: set of strings
+        The types of the records to read, for example ``{'work'}``. If
+        None, all the records are read.
+    :param accept_type: string
+        Only 'application/orcid+xml': the data files contain XML only. Read
+        the records from the API for their JSON representation.
+
+    Yields
+    -------
+    :yields: DumpItem
+        The records, in the order of the archive.
+    """
+    if accept_type != 'application/orcid+xml':
+        raise NotImplementedError('The public data files only contain XML, '
+                                  'not %s' % accept_type)
+    if orcid_ids is not None and not isinstance(orcid_ids, (set, dict)):
+        orcid_ids = set(orcid_ids)
+    if hasattr(source, 'read'):
+        archive = tarfile.open(fileobj=source, mode='r|*')
+    else:
+        archive = tarfile.open(source, 'r|*')
+    with archive:
+        for member in archive:
+            if not member.isfile() or not member.name.endswith('.xml'):
+                continue
+            ids = _ID_IN_NAME.findall(member.name)
+            if not ids or orcid_ids is not None and ids[-1] not in orcid_ids:
+                continue
+            item = _parse(archive.extractfile(member), ids[-1],
+                          request_types)
+            if item is not None:
+                yield item
+
+
+@contextmanager
+def _open_changes(path):
+    if tarfile.is_tarfile(path):
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if member.isfile() and member.name.endswith('.csv'):
+                    with closing(archive.extractfile(member)) as stream:
+                        yield stream
+                    return
+        raise ValueError('No CSV file in %s' % path)
+    with (gzip.open if path.endswith('.gz') else open)(path, 'rb') as stream:
+        yield stream
+
+
+def _csv_rows(stream):
+    # Decoded line by line: the archive members of Python 2 cannot be
+    # wrapped in io.TextIOWrapper.
+    if sys.version_info[0] > 2:
+        for row in csv.reader(line.decode('utf-8') for line in stream):
+            yield row
+        return
+    # The csv module of Python 2 reads bytes only.
+    for row in csv.reader(stream):
+        yield [value.decode('utf-8') for value in row]
+
+
+def changed_ids(path, since=None):
+    """Yield the iDs of the list of changed records.
+
+    Parameters
+    ----------
+    :param path: string
+        The list, as a CSV file with the 'orcid' and 'last_modified'
+        columns, compressed or in a tar archive.
+    :param since: string
+        An ISO 8601 date or time. If given, only the iDs of the records
+        modified since are yielded.
+
+    Yields
+    -------
+    :yields: string
+        The iDs.
+    """
+    if since is not None:
+        since = since.replace('T', ' ')
+    with _open_changes(path) as stream:
+        reader = _csv_rows(stream)
+        header = [column.strip().lower() for column in next(reader)]
+        id_column = header.index('orcid')
+        modified_column = header.index('last_modified')
+        for row in reader:
+            if since is None or \
+                    row[modified_column].replace('T', ' ') >= since:
+                yield row[id_column]
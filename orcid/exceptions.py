@@ -0,0 +1,87 @@
+"""Exceptions raised by python-orcid."""
+
+from requests.exceptions import RequestException, Timeout
+
+
+class ValidationError(ValueError):
+    """A payload does not conform to the ORCID schema.
+
+    The ``errors`` attribute is a list of ``(path, message)`` tuples, one for
+    every failing field.
+    """
+
+    def __init__(self, request_type, errors):
+        """Initialize the error.
+
+        Parameters
+        ----------
+        :param request_type: string
+            The type of the rejected record, for example 'work'.
+        :param errors: list of tuples
+            ``(path, message)`` pairs describing the failing fields.
+        """
+        self.request_type = request_type
+        self.errors = list(errors)
+        super(ValidationError, self).__init__(
+            "Invalid '%s' payload: %s" % (
+                request_type,
+                "; ".join("%s: %s" % error for error in self.errors)))
+
+
+class InvalidIdentifier(ValueError):
+    """ORCID iDs or put-codes are malformed.
+
+    The ``errors`` attribute is a list of ``(value, message)`` tuples, one
+    for every rejected value.
+    """
+
+    def __init__(self, errors):
+        """Initialize the error.
+
+        Parameters
+        ----------
+        :param errors: list of tuples
+            ``(value, message)`` pairs describing the rejected values.
+        """
+        self.errors = list(errors)
+        super(InvalidIdentifier, self).__init__(
+            "; ".join("%r: %s" % error for error in self.errors))
+
+
+class DeadlineExceeded(Timeout):
+    """The deadline of an operation passed before it could complete."""
+
+
+class ResponseTooLarge(RequestException):
+    """A response body exceeded the configured maximum size."""
+
+
+class CircuitOpen(RequestException):
+    """The circuit of an endpoint is open and requests fail fast.
+
+    The ``endpoint`` attribute is the scheme and host of the endpoint and
+    ``retry_after`` the number of seconds until a trial request is allowed.
+    """
+
+    def __init__(self, endpoint, retry_after):
+        """Initialize the error.
+
+        Parameters
+        ----------
+        :param endpoint: string
+            The endpoint, for example 'https://pub.orcid.org'.
+        :param retry_after: float
+            The number of seconds until the circuit lets a request through.
+        """
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super(CircuitOpen, self).__init__(
+            'Circuit of %s is open, retry in %.1f seconds'
+            % (endpoint, retry_after))
+
+
+class TokenNotFound(LookupError):
+    """No usable token is stored for an ORCID iD.
+
+    The researcher has to authorize the application again.
+    """
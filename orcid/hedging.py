@@ -0,0 +1,156 @@
+"""Hedged requests reducing the tail latency of idempotent reads."""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import threading
+import time
+
+
+class HedgingPolicy(object):
+    """Send a duplicate of a slow read and use whichever answers first.
+
+    If a request did not complete within the given percentile of the
+    recently observed latencies, a second, identical request is sent. The
+    first successful response wins and the other one is discarded. Hedges
+    are limited to a ``budget`` fraction of all the requests.
+
+    Requests that cannot be hedged are sent from the calling thread, the
+    others from a pool of ``max_primaries`` threads, and the hedges from a
+    separate pool of ``max_workers`` threads. When all the threads of the
+    first pool are busy, requests are sent from the calling thread without
+    hedging.
+
+    The counters ``requests``, ``hedges`` and ``hedge_wins`` show how often
+    hedging happened and how often the duplicate was faster.
+    """
+
+    def __init__(self, percentile=95, budget=0.05, min_samples=20,
+                 window=1000, max_workers=8, max_primaries=32):
+        """Initialize the policy.
+
+        Parameters
+        ----------
+        :param percentile: float
+            The percentile of observed latencies after which a request is
+            hedged.
+        :param budget: float
+            The maximum ratio of hedges to requests, for example 0.05 for at
+            most 5% extra requests.
+        :param min_samples: integer
+            The number of latencies to observe before hedging starts.
+        :param window: integer
+            The number of recent latencies the percentile is computed from.
+        :param max_workers: integer
+            The number of threads sending the hedges.
+        :param max_primaries: integer
+            The number of threads sending the requests that may be hedged.
+        """
+        self._percentile = percentile
+        self._budget = budget
+        self._min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers)
+        self._primaries = ThreadPoolExecutor(max_primaries)
+        self._idle_primaries = threading.Semaphore(max_primaries)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def delay(self):
+        """Return the current hedging delay in seconds, or None."""
+        with self._lock:
+            if not self._latencies or \
+                    len(self._latencies) < self._min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = int(len(latencies) * self._percentile / 100.0)
+        return latencies[min(index, len(latencies) - 1)]
+
+    def run(self, send, hedge=None):
+        """Call `send`, hedging it if it is slow.
+
+        Parameters
+        ----------
+        :param send: callable
+            Sends the request and returns a `requests.Response`.
+        :param hedge: callable
+            Sends the duplicate request, by default `send`. It may return
+            None to give up the hedge, for example when the rate limit does
+            not allow another request.
+
+        Returns
+        -------
+        :returns: requests.Response
+            The first successful response.
+        """
+        with self._lock:
+            self.requests += 1
+        delay = self.delay()
+        if delay is None or not self._has_budget() or \
+                not self._idle_primaries.acquire(False):
+            return self._timed(send)
+        primary = self._primaries.submit(self._timed, send)
+        primary.add_done_callback(
+            lambda future: self._idle_primaries.release())
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_budget():
+            return primary.result()
+
+        duplicate = self._executor.submit(self._timed, hedge or send, True)
+        pending = set([primary, duplicate])
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as exception:
+                    error = exception
+                    continue
+                if future is duplicate and response is None:
+                    # The hedge was given up.
+                    with self._lock:
+                        self.hedges -= 1
+                    continue
+                for loser in pending:
+                    self._discard(loser)
+                if future is duplicate:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return response
+        raise error
+
+    def shutdown(self):
+        """Stop the worker threads."""
+        self._primaries.shutdown()
+        self._executor.shutdown()
+
+    def _has_budget(self):
+        with self._lock:
+            return self.hedges + 1 <= self._budget * self.requests
+
+    def _take_budget(self):
+        with self._lock:
+            if self.hedges + 1 > self._budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def _timed(self, send, is_hedge=False):
+        start = time.time()
+        response = send()
+        if is_hedge and response is None:
+            return None
+        with self._lock:
+            self._latencies.append(time.time() - start)
+        return response
+
+    def _discard(self, future):
+        if not future.cancel():
+            future.add_done_callback(_close_response)
+
+
+def _close_response(future):
+    if future.exception() is None:
+        future.result().close()
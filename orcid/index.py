@@ -0,0 +1,344 @@
+"""Local index over harvested ORCID records."""
+
+import re
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    orcid_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS identifiers (
+    orcid_id TEXT NOT NULL,
+    put_code TEXT,
+    section TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    UNIQUE (orcid_id, section, put_code, type, value)
+);
+CREATE INDEX IF NOT EXISTS identifiers_value ON identifiers (type, value);
+CREATE TABLE IF NOT EXISTS affiliations (
+    orcid_id TEXT NOT NULL,
+    put_code TEXT,
+    section TEXT NOT NULL,
+    organization TEXT NOT NULL,
+    UNIQUE (orcid_id, section, put_code, organization)
+);
+CREATE INDEX IF NOT EXISTS affiliations_organization
+    ON affiliations (organization);
+CREATE TABLE IF NOT EXISTS put_codes (
+    put_code TEXT NOT NULL,
+    orcid_id TEXT NOT NULL,
+    request_type TEXT NOT NULL,
+    PRIMARY KEY (orcid_id, request_type, put_code)
+);
+CREATE INDEX IF NOT EXISTS put_codes_put_code ON put_codes (put_code);
+"""
+
+_NAMES_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5 (
+    orcid_id UNINDEXED, name
+);
+"""
+
+_NAMES_PLAIN = """
+CREATE TABLE IF NOT EXISTS names (orcid_id TEXT NOT NULL, name TEXT);
+"""
+
+# Maps the keys of records and the request types to the request type of
+# their items, which is also the section of the index they are kept in.
+_ITEM_TYPES = {'educations': 'education',
+               'education-summary': 'education',
+               'employments': 'employment',
+               'employment-summary': 'employment',
+               'external-identifiers': 'external-identifier',
+               'fundings': 'funding',
+               'funding-summary': 'funding',
+               'peer-reviews': 'peer-review',
+               'peer-review-summary': 'peer-review',
+               'works': 'work',
+               'work-summary': 'work'}
+
+_ACTIVITY_TYPES = set(['education', 'employment', 'funding', 'peer-review',
+                       'work'])
+
+_PUT_CODE_TYPES = _ACTIVITY_TYPES | set(['external-identifier'])
+
+# The sections replaced by the records of a request type, all of them for
+# 'record'. The other request types replace their own section.
+_SECTIONS = {'activities': _ACTIVITY_TYPES,
+             'person': set(['external-identifier']),
+             'record': None}
+
+# Work identifier types, such as 'doi' or 'eid', are searchable as
+# '<type>-self'.
+_SEARCHABLE_ID_TYPE = re.compile(r'^[a-z0-9-]+$')
+
+_AFFILIATION_TYPES = set(['education', 'employment'])
+
+
+def _quote(value):
+    return '"%s"' % value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _fts_quote(token):
+    # FTS5 strings escape a quote by doubling it.
+    return '"%s"' % token.replace('"', '""')
+
+
+def _value(node, key):
+    value = node.get(key)
+    if isinstance(value, dict):
+        value = value.get('value')
+    return value
+
+
+class RecordIndex(object):
+    """Index harvested records by DOI, external id, affiliation and name.
+
+    Records read with an API created with ``index=...`` are added
+    automatically. The queries are answered locally. The ``api`` argument
+    of the ``find_by_*`` methods enables a search against ORCID when the
+    index has no match.
+    """
+
+    def __init__(self, path=':memory:'):
+        """Initialize the index.
+
+        Parameters
+        ----------
+        :param path: string
+            The sqlite database file. By default the index lives in memory.
+        """
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+            try:
+                self._connection.executescript(_NAMES_FTS)
+                self._fts = True
+            except sqlite3.OperationalError:
+                self._connection.executescript(_NAMES_PLAIN)
+                self._fts = False
+
+    def add(self, orcid_id, request_type, data, put_code=None):
+        """Index a record, as returned by `read_record_public`.
+
+        The identifiers and affiliations previously indexed from the same
+        part of the record are replaced.
+
+        Parameters
+        ----------
+        :param orcid_id: string
+            Id of the author.
+        :param request_type: string
+            The request type the record was read with, for example 'record'.
+        :param data: dict
+            The JSON-compatible dictionary representation of the record.
+        :param put_code: string | list of strings
+            The put-code or put-codes the record was read with, if any.
+        """
+        rows = {'identifiers': [], 'affiliations': [], 'put_codes': [],
+                'names': []}
+        item_type = _ITEM_TYPES.get(request_type, request_type)
+        self._walk(orcid_id, data, item_type, None, rows)
+        with self._lock, self._connection as connection:
+            connection.execute('INSERT OR IGNORE INTO records VALUES (?)',
+                               (orcid_id,))
+            self._delete(connection, orcid_id, request_type, item_type,
+                         put_code, rows)
+            connection.executemany(
+                'INSERT OR IGNORE INTO identifiers VALUES (?, ?, ?, ?, ?)',
+                rows['identifiers'])
+            connection.executemany(
+                'INSERT OR IGNORE INTO affiliations VALUES (?, ?, ?, ?)',
+                rows['affiliations'])
+            connection.executemany(
+                'INSERT OR REPLACE INTO put_codes VALUES (?, ?, ?)',
+                rows['put_codes'])
+            if rows['names']:
+                connection.execute('DELETE FROM names WHERE orcid_id = ?',
+                                   (orcid_id,))
+                connection.executemany('INSERT INTO names VALUES (?, ?)',
+                                       rows['names'])
+
+    def add_search_result(self, result):
+        """Register the iD of a search result, as yielded by `search`."""
+        with self._lock, self._connection as connection:
+            connection.execute('INSERT OR IGNORE INTO records VALUES (?)',
+                               (result['orcid-identifier']['path'],))
+
+    def __contains__(self, orcid_id):
+        """Check if any record of the iD has been indexed."""
+        return bool(self._query('SELECT 1 FROM records WHERE orcid_id = ?',
+                                (orcid_id,)))
+
+    def find_by_doi(self, doi, api=None, access_token=None):
+        """Return the iDs of the authors of a DOI.
+
+        Parameters
+        ----------
+        :param doi: string
+            The DOI, for example '10.1000/xyz123'.
+        :param api: orcid.PublicAPI
+            If given, ORCID is searched when the index has no match.
+        :param access_token: string
+            The search token for the fallback search.
+
+        Returns
+        -------
+        :returns: list of strings
+            The matching ORCID iDs.
+        """
+        return self.find_by_external_id('doi', doi, api, access_token)
+
+    def find_by_external_id(self, id_type, value, api=None,
+                            access_token=None):
+        """Return the iDs of records referencing an external id.
+
+        The external id can belong to a work, an affiliation or the person,
+        for example ('doi', '10.1000/xyz123') or ('eid', '2-s2.0-1234').
+        See `find_by_doi` for the other arguments.
+        """
+        id_type = id_type.lower()
+        ids = self._ids('SELECT DISTINCT orcid_id FROM identifiers '
+                        'WHERE type = ? AND value = ?',
+                        (id_type, value.lower()))
+        if not _SEARCHABLE_ID_TYPE.match(id_type):
+            # Types such as 'scopus author id' have no search field.
+            return ids
+        return self._fallback(ids, api, access_token, '%s-self:%s'
+                              % (id_type, _quote(value)))
+
+    def find_by_affiliation(self, organization, api=None,
+                            access_token=None):
+        """Return the iDs of researchers employed or educated at a place.
+
+        The organization name is compared case-insensitively. See
+        `find_by_doi` for the other arguments.
+        """
+        ids = self._ids('SELECT DISTINCT orcid_id FROM affiliations '
+                        'WHERE organization = ?', (organization.lower(),))
+        return self._fallback(ids, api, access_token,
+                              'affiliation-org-name:%s' % _quote(organization))
+
+    def find_by_name(self, name, api=None, access_token=None):
+        """Return the iDs of researchers whose names contain all the words.
+
+        See `find_by_doi` for the other arguments.
+        """
+        tokens = name.lower().split()
+        if not tokens:
+            return []
+        if self._fts:
+            ids = self._ids('SELECT DISTINCT orcid_id FROM names '
+                            'WHERE names MATCH ?',
+                            (' '.join(_fts_quote(token) for token in tokens),))
+        else:
+            ids = self._ids('SELECT DISTINCT orcid_id FROM names WHERE ' +
+                            ' AND '.join(['name LIKE ?'] * len(tokens)),
+                            ['%%%s%%' % token for token in tokens])
+        return self._fallback(ids, api, access_token,
+                              'given-and-family-names:%s' % _quote(name))
+
+    def find_by_put_code(self, put_code, request_type=None):
+        """Return the (orcid_id, request_type) of a put-code, or None.
+
+        Put-codes are only unique within an activity type, pass
+        ``request_type``, for example 'work', to tell them apart.
+        """
+        if request_type is None:
+            rows = self._query('SELECT orcid_id, request_type FROM put_codes '
+                               'WHERE put_code = ? ORDER BY request_type',
+                               ('%s' % put_code,))
+        else:
+            rows = self._query('SELECT orcid_id, request_type FROM put_codes '
+                               'WHERE put_code = ? AND request_type = ?',
+                               ('%s' % put_code, request_type))
+        return rows[0] if rows else None
+
+    def close(self):
+        """Close the database."""
+        self._connection.close()
+
+    def _query(self, sql, parameters):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def _ids(self, sql, parameters):
+        return sorted(row[0] for row in self._query(sql, parameters))
+
+    def _fallback(self, ids, api, access_token, query):
+        if ids or api is None:
+            return ids
+        results = api.search_generator(query, pagination=100,
+                                       access_token=access_token)
+        return sorted(set(result['orcid-identifier']['path']
+                          for result in results))
+
+    def _delete(self, connection, orcid_id, request_type, item_type,
+                put_code, rows):
+        columns = {'identifiers': 'section', 'affiliations': 'section',
+                   'put_codes': 'request_type'}
+        if put_code is not None or request_type in _PUT_CODE_TYPES:
+            # Only the items read are replaced. Put-codes are unique within
+            # a section only.
+            if put_code is None:
+                values = [row[0] for row in rows['put_codes']]
+            elif isinstance(put_code, list):
+                values = ['%s' % code for code in put_code]
+            else:
+                values = ['%s' % put_code]
+            for table in ('identifiers', 'affiliations', 'put_codes'):
+                if values:
+                    connection.execute(
+                        'DELETE FROM %s WHERE orcid_id = ? AND %s = ? '
+                        'AND put_code IN (%s)' % (
+                            table, columns[table],
+                            ', '.join('?' * len(values))),
+                        [orcid_id, item_type] + sorted(values))
+            return
+        sections = _SECTIONS.get(request_type, set([item_type]))
+        for table in ('identifiers', 'affiliations', 'put_codes'):
+            if sections is None:
+                connection.execute('DELETE FROM %s WHERE orcid_id = ?'
+                                   % table, (orcid_id,))
+            else:
+                connection.execute(
+                    'DELETE FROM %s WHERE orcid_id = ? AND %s IN (%s)' % (
+                        table, columns[table],
+                        ', '.join('?' * len(sections))),
+                    [orcid_id] + sorted(sections))
+
+    def _walk(self, orcid_id, node, item_type, put_code, rows):
+        if isinstance(node, list):
+            for item in node:
+                self._walk(orcid_id, item, item_type, put_code, rows)
+            return
+        if not isinstance(node, dict):
+            return
+        if node.get('put-code') is not None and item_type in _PUT_CODE_TYPES:
+            put_code = '%s' % node['put-code']
+            rows['put_codes'].append((put_code, orcid_id, item_type))
+        if 'external-id-type' in node and 'external-id-value' in node:
+            id_type = node['external-id-type']
+            value = node['external-id-value']
+            # ORCID returns null types and values.
+            if id_type and value:
+                rows['identifiers'].append((orcid_id, put_code, item_type,
+                                            id_type.lower(), value.lower()))
+            return
+        if item_type in _AFFILIATION_TYPES and \
+                isinstance(node.get('organization'), dict) and \
+                node['organization'].get('name'):
+            rows['affiliations'].append(
+                (orcid_id, put_code, item_type,
+                 node['organization']['name'].lower()))
+        if 'given-names' in node or 'family-name' in node:
+            names = [_value(node, key) for key in
+                     ('given-names', 'family-name', 'credit-name')]
+            rows['names'].append((orcid_id, ' '.join(
+                name for name in names if name)))
+        for key, value in node.items():
+            self._walk(orcid_id, value, _ITEM_TYPES.get(key, item_type),
+                       put_code, rows)
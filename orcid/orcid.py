@@ -1,23 +1,177 @@
 """Implementation of python-orcid library."""
 
 from bs4 import BeautifulSoup
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+import csv
+import functools
+import logging
 import requests
 import simplejson as json
 import sys
+import threading
+import time
 from lxml import etree
+
+from .delta import digest
+from .exceptions import DeadlineExceeded, ResponseTooLarge, TokenNotFound
+from .profiling import (DESERIALIZE, DOWNLOAD, QUEUE, SERIALIZE, VALIDATE,
+                        WAIT, attempt, current as current_timing, timed,
+                        timer)
+from .query import Query
+from .singleflight import SingleFlight
+from .transport import RequestsTransport
+from .validation import validate_identifiers
 if sys.version_info[0] == 2:
-    from urllib import urlencode
+    from urllib import quote_plus, urlencode
     string_types = basestring,
 else:
-    from urllib.parse import urlencode
+    from urllib.parse import quote_plus, urlencode
     string_types = str,
 
 
 SEARCH_VERSION = "/v2.0"
+EXPANDED_SEARCH_VERSION = "/v3.0"
 VERSION = "/v2.0"
 
+CSV_SEARCH_FIELDS = ('orcid', 'given-names', 'family-name',
+                     'current-institution-affiliation-name')
+
+# Stored tokens expiring within this many seconds are refreshed before use.
+TOKEN_REFRESH_MARGIN = 300
+
+_logger = logging.getLogger(__name__)
+
 __version__ = "1.0.3"
 
+_now = getattr(time, 'monotonic', time.time)
+
+
+def _call_scope(method):
+    """Run the method within the per-call deadline and profiling, if any."""
+    name = method.__name__.lstrip('_')
+
+    def run(self, args, kwargs):
+        if self._call_deadline is None:
+            return method(self, *args, **kwargs)
+        with self.deadline(self._call_deadline):
+            return method(self, *args, **kwargs)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self._profiler
+        if profiler is None or current_timing() is not None:
+            return run(self, args, kwargs)
+        timing = self._local.timing = profiler.start(name)
+        if timing is None:
+            return run(self, args, kwargs)
+        try:
+            result = run(self, args, kwargs)
+        except Exception as error:
+            profiler.finish(timing, error)
+            raise
+        profiler.finish(timing)
+        return result
+    return wrapper
+
+
+def _clip_timeout(timeout, remaining):
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(_clip_timeout(part, remaining) for part in timeout)
+    return min(timeout, remaining)
+
+
+def _read_csv(text):
+    """Return the rows of a CSV document as dictionaries of strings."""
+    if sys.version_info[0] > 2:
+        return list(csv.DictReader(text.splitlines()))
+    # The csv module of Python 2 reads bytes only.
+    rows = csv.DictReader([line.encode('utf-8')
+                           for line in text.splitlines()])
+    return [dict((_decode(key), _decode(value))
+                 for key, value in row.items()) for row in rows]
+
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class _RequestBuilder(object):
+    """Build the URLs and headers of the requests to an endpoint.
+
+    The URL prefixes are computed once and the headers are cached per
+    token, accept type and content type, so that bulk workloads do not
+    rebuild them for every request. The cache is emptied when it holds more
+    than ``max_headers`` entries. The cached headers are shared and must not
+    be modified.
+    """
+
+    def __init__(self, endpoint, max_headers=4096):
+        self.endpoint = endpoint
+        self._record_prefix = endpoint + VERSION + '/'
+        self._search_prefix = endpoint + SEARCH_VERSION + '/search/?'
+        self._expanded_search_prefix = endpoint + EXPANDED_SEARCH_VERSION + \
+            '/expanded-search/?'
+        self._csv_search_prefix = endpoint + EXPANDED_SEARCH_VERSION + \
+            '/csv-search/?'
+        self._max_headers = max_headers
+        self._headers = {}
+
+    def record_url(self, orcid_id, request_type, put_code=None,
+                   multiple=False):
+        if not put_code:
+            return self._record_prefix + orcid_id + '/' + request_type
+        if multiple:
+            put_code = ','.join(put_code)
+        elif not isinstance(put_code, str):
+            put_code = '%s' % put_code
+        return ''.join((self._record_prefix, orcid_id, '/', request_type,
+                        '/', put_code))
+
+    def search_url(self, query, method, start=None, rows=None):
+        return self._query_url(self._search_prefix + 'defType=' +
+                               quote_plus(method) + '&', query, start, rows)
+
+    def expanded_search_url(self, query, start=None, rows=None):
+        return self._query_url(self._expanded_search_prefix, query, start,
+                               rows)
+
+    def csv_search_url(self, query, fields, start=None, rows=None):
+        return self._query_url(self._csv_search_prefix + 'fl=' +
+                               quote_plus(','.join(fields)) + '&', query,
+                               start, rows)
+
+    def _query_url(self, prefix, query, start, rows):
+        if isinstance(query, Query):
+            query = query.text
+        if not isinstance(query, str):
+            # Python 2 cannot urlencode non-ASCII unicode strings.
+            query = query.encode('utf-8')
+        url = prefix + 'q=' + quote_plus(query)
+        if start:
+            url += '&start=%s' % start
+        if rows:
+            url += '&rows=%s' % rows
+        return url
+
+    def headers(self, accept, token, content_type=None):
+        # Single dictionary operations need no lock. Concurrent misses at
+        # worst build the same headers twice.
+        key = (token, accept, content_type)
+        headers = self._headers.get(key)
+        if headers is None:
+            headers = {'Accept': accept,
+                       'Authorization': 'Bearer %s' % token}
+            if content_type is not None:
+                headers['Content-Type'] = content_type
+            if len(self._headers) >= self._max_headers:
+                # Cheaper than tracking the use of every entry.
+                self._headers.clear()
+            self._headers[key] = headers
+        return headers
+
 
 class PublicAPI(object):
     """Public API."""
@@ -37,7 +191,11 @@ class PublicAPI(object):
     TYPES_WITH_MULTIPLE_PUTCODES = set(['works'])
 
     def __init__(self, institution_key, institution_secret, sandbox=False,
-                 timeout=None, do_store_raw_response=False):
+                 timeout=None, do_store_raw_response=False, deadline=None,
+                 max_response_bytes=None, hedging=None, index=None,
+                 transport=None, cache=None, single_flight=None,
+                 circuit_breaker=None, scheduler=None, profiler=None,
+                 parser=None):
         """Initialize public API.
 
         Parameters
@@ -54,14 +212,66 @@ class PublicAPI(object):
             `requests documentation
             <http://docs.python-requests.org/en/master/user/advanced/#timeouts>`_
             for more information.
+        :param deadline: float
+            The maximum time in seconds a single method call may take,
+            including all the requests it makes. If None, only `timeout`
+            applies. `orcid.exceptions.DeadlineExceeded` is raised when the
+            deadline passes.
+        :param max_response_bytes: integer
+            The maximum size of a response body. Larger downloads are
+            aborted with `orcid.exceptions.ResponseTooLarge`. If None, the
+            size is not limited.
+        :param hedging: orcid.hedging.HedgingPolicy
+            If given, slow record reads and searches are hedged with a
+            duplicate request according to the policy. With a `scheduler`,
+            a hedge is only sent if a slot is free at once.
+        :param index: orcid.index.RecordIndex
+            If given, the JSON records read and the search results are added
+            to the local index.
+        :param transport: orcid.transport.RequestsTransport |
+                          orcid.transport.HTTP2Transport
+            The transport sending the requests. If None, a new
+            `RequestsTransport` is used.
+        :param cache: orcid.cache.LMDBCache
+            If given, the records read are cached, and cached records are
+            returned without a request.
+        :param single_flight: orcid.singleflight.SingleFlight
+            If given, concurrent reads of the same record share one request.
+        :param circuit_breaker: orcid.circuit.CircuitBreaker
+            If given, requests to an endpoint that keeps failing raise
+            `orcid.exceptions.CircuitOpen` without being sent.
+        :param scheduler: orcid.scheduler.RequestScheduler
+            If given, the requests wait for a slot of the scheduler, which
+            serves the priority classes set with `priority`.
+        :param profiler: orcid.profiling.Profiler
+            If given, a sample of the calls is timed phase by phase. The
+            timing of the last sampled call is available as `last_timing`.
+        :param parser: orcid.xmlutils.TunedParser
+            If given, the responses are parsed with it: `TunedParser` parses
+            XML faster, and `orcid.cooperative.CooperativeParser` does not
+            block the other greenlets under gevent or eventlet.
         """
         self._key = institution_key
         self._secret = institution_secret
         self._timeout = timeout
+        self._call_deadline = deadline
+        self._max_response_bytes = max_response_bytes
+        self._hedging = hedging
+        self._index = index
+        self._transport = transport or RequestsTransport()
+        self._builder = None
+        self._cache = cache
+        self._single_flight = single_flight
+        self._circuit_breaker = circuit_breaker
+        self._scheduler = scheduler
+        self._profiler = profiler
+        self._parser = parser
+        self._local = threading.local()
         self.raw_response = None
         self.do_store_raw_response = do_store_raw_response
         if sandbox:
             self._host = "sandbox.orcid.org"
+            self._signout_url = "https://sandbox.orcid.org/signout"
             self._login_or_register_endpoint = \
                 "https://sandbox.orcid.org/oauth/authorize"
             self._login_url = \
@@ -70,6 +280,7 @@ class PublicAPI(object):
             self._endpoint = "https://pub.sandbox.orcid.org"
         else:
             self._host = "orcid.org"
+            self._signout_url = "https://orcid.org/signout"
             self._login_or_register_endpoint = \
                 "https://orcid.org/oauth/authorize"
             self._login_url = \
@@ -129,14 +340,65 @@ class PublicAPI(object):
             data.append(("show_login", "true" if show_login else "false"))
         return self._login_or_register_endpoint + "?" + urlencode(data)
 
+    @contextmanager
+    def deadline(self, seconds):
+        """Limit the total time of all the requests made within the block.
+
+        Deadlines propagate through retries, pagination and the multiple
+        requests of the authentication. Nested deadlines never extend the
+        enclosing one. Deadlines are per thread.
+
+        Parameters
+        ----------
+        :param seconds: float
+            The time budget of the block.
+        """
+        expires = _now() + seconds
+        previous = getattr(self._local, 'deadline', None)
+        if previous is not None:
+            expires = min(expires, previous)
+        self._local.deadline = expires
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    @contextmanager
+    def priority(self, name):
+        """Send the requests made within the block with a priority class.
+
+        Only applies if the API uses a scheduler. Priorities are per thread.
+
+        Parameters
+        ----------
+        :param name: string
+            A class of the scheduler, for example 'batch'.
+        """
+        previous = getattr(self._local, 'priority', None)
+        self._local.priority = name
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    @property
+    def last_timing(self):
+        """The `CallTiming` of the last call of this thread, if sampled.
+
+        None if the API has no profiler or the last call was not sampled.
+        """
+        return getattr(self._local, 'timing', None)
+
+    @_call_scope
     def search(self, query, method="lucene", start=None,
                rows=None, access_token=None):
         """Search the ORCID database.
 
         Parameters
         ----------
-        :param query: string
-            Query in line with the chosen method.
+        :param query: string or orcid.query.Query
+            Query in line with the chosen method. It is URL-encoded before
+            it is sent.
         :param method: string
             One of 'lucene', 'edismax', 'dismax'
         :param start: string
@@ -159,8 +421,8 @@ class PublicAPI(object):
             access_token = self. \
                 get_search_token_from_orcid()
 
-        headers = {'Accept': 'application/orcid+json',
-                   'Authorization': 'Bearer %s' % access_token}
+        headers = self._get_builder().headers('application/orcid+json',
+                                              access_token)
 
         return self._search(query, method, start, rows, headers,
                             self._endpoint)
@@ -173,8 +435,9 @@ class PublicAPI(object):
 
         Parameters
         ----------
-        :param query: string
-            Query in line with the chosen method.
+        :param query: string or orcid.query.Query
+            Query in line with the chosen method. It is URL-encoded before
+            it is sent.
         :param method: string
             One of 'lucene', 'edismax', 'dismax'
         :param pagination: integer
@@ -193,8 +456,8 @@ class PublicAPI(object):
             access_token = self. \
                 get_search_token_from_orcid()
 
-        headers = {'Accept': 'application/orcid+json',
-                   'Authorization': 'Bearer %s' % access_token}
+        headers = self._get_builder().headers('application/orcid+json',
+                                              access_token)
 
         index = 0
 
@@ -208,6 +471,119 @@ class PublicAPI(object):
                 yield result
             index += pagination
 
+    @_call_scope
+    def expanded_search(self, query, start=None, rows=None,
+                        access_token=None):
+        """Search the ORCID database, returning names and affiliations.
+
+        Unlike `search`, every result contains the names, emails and
+        institutions of the researcher, so no record has to be read
+        afterwards.
+
+        Parameters
+        ----------
+        :param query: string or orcid.query.Query
+            Lucene query.
+        :param start: integer
+            Index of the first record requested. Use for pagination.
+        :param rows: integer
+            Number of records requested. Use for pagination.
+        :param access_token: string
+            If obtained before, the access token to use to pass through
+            authorization.
+
+        Returns
+        -------
+        :returns: dict
+            Search result. The results can be obtained by accessing key
+            'expanded-result', each of them containing the keys 'orcid-id',
+            'given-names', 'family-names', 'credit-name', 'other-name',
+            'email' and 'institution-name'. To get the number of all
+            results, access the key 'num-found'.
+        """
+        if access_token is None:
+            access_token = self.get_search_token_from_orcid()
+        builder = self._get_builder()
+        response = self._expanded_search(
+            builder.expanded_search_url(query, start, rows),
+            builder.headers('application/vnd.orcid+json', access_token))
+        return self._json(response)
+
+    def expanded_search_generator(self, query, pagination=100,
+                                  access_token=None):
+        """Search the ORCID database with a generator of expanded results.
+
+        See `expanded_search`.
+
+        Parameters
+        ----------
+        :param query: string or orcid.query.Query
+            Lucene query.
+        :param pagination: integer
+            How many results should be fetched with one request.
+        :param access_token: string
+            If obtained before, the access token to use to pass through
+            authorization.
+
+        Yields
+        -------
+        :yields: dict
+            Single expanded result.
+        """
+        if access_token is None:
+            access_token = self.get_search_token_from_orcid()
+
+        index = 0
+
+        while True:
+            paginated_result = self.expanded_search(query, index, pagination,
+                                                    access_token)
+            if not paginated_result.get('expanded-result'):
+                return
+
+            for result in paginated_result['expanded-result']:
+                yield result
+            index += pagination
+
+    @_call_scope
+    def csv_search(self, query, fields=CSV_SEARCH_FIELDS, start=None,
+                   rows=None, access_token=None):
+        """Search the ORCID database, returning only the selected fields.
+
+        The fields are selected by the server, so the responses stay small.
+
+        Parameters
+        ----------
+        :param query: string or orcid.query.Query
+            Lucene query.
+        :param fields: iterable of strings
+            The fields to return, for example 'orcid', 'email',
+            'given-names', 'family-name', 'credit-name', 'other-names',
+            'current-institution-affiliation-name' or
+            'past-institution-affiliation-name'.
+        :param start: integer
+            Index of the first record requested. Use for pagination.
+        :param rows: integer
+            Number of records requested. Use for pagination.
+        :param access_token: string
+            If obtained before, the access token to use to pass through
+            authorization.
+
+        Returns
+        -------
+        :returns: list of dicts
+            One dictionary per result, mapping the field names to values.
+        """
+        if access_token is None:
+            access_token = self.get_search_token_from_orcid()
+        builder = self._get_builder()
+        response = self._expanded_search(
+            builder.csv_search_url(query, fields, start, rows),
+            builder.headers('text/csv', access_token))
+        response.encoding = 'utf-8'
+        return _read_csv(response.text)
+
+    @_call_scope
     def get_search_token_from_orcid(self, scope='/read-public'):
         """Get a token for searching ORCID records.
 
@@ -230,13 +606,13 @@ class PublicAPI(object):
         url = "%s/oauth/token" % self._endpoint
         headers = {'Accept': 'application/json'}
 
-        response = requests.post(url, data=payload, headers=headers,
-                                 timeout=self._timeout)
+        response = self._request('POST', url, data=payload, headers=headers)
         response.raise_for_status()
         if self.do_store_raw_response:
             self.raw_response = response
         return response.json()['access_token']
 
+    @_call_scope
     def get_token(self, user_id, password, redirect_uri,
                   scope='/read-limited'):
         """Get the token.
@@ -262,6 +638,7 @@ class PublicAPI(object):
                                       scope)
         return response['access_token']
 
+    @_call_scope
     def get_token_from_authorization_code(self,
                                           authorization_code, redirect_uri):
         """Like `get_token`, but using an OAuth 2 authorization code.
@@ -290,14 +667,50 @@ class PublicAPI(object):
             "code": authorization_code,
             "redirect_uri": redirect_uri,
         }
-        response = requests.post(self._token_url, data=token_dict,
-                                 headers={'Accept': 'application/json'},
-                                 timeout=self._timeout)
+        response = self._request('POST', self._token_url, data=token_dict,
+                                 headers={'Accept': 'application/json'})
+        response.raise_for_status()
+        if self.do_store_raw_response:
+            self.raw_response = response
+        return json.loads(response.text)
+
+    @_call_scope
+    def refresh_token(self, refresh_token, scope=None, revoke_old=False):
+        """Get a new access token with a refresh token.
+
+        Parameters
+        ----------
+        :param refresh_token: string
+            The ``"refresh_token"`` of a token.
+        :param scope: string
+            The scope of the new token. If None, the scope of the old one.
+        :param revoke_old: boolean
+            Should the old access token be revoked.
+
+        Returns
+        -------
+        :returns: dict
+            All data of the new access token, see
+            `get_token_from_authorization_code`.
+        """
+        token_dict = {
+            "client_id": self._key,
+            "client_secret": self._secret,
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+        }
+        if scope is not None:
+            token_dict["scope"] = scope
+        if revoke_old:
+            token_dict["revoke_old"] = "true"
+        response = self._request('POST', self._token_url, data=token_dict,
+                                 headers={'Accept': 'application/json'})
         response.raise_for_status()
         if self.do_store_raw_response:
             self.raw_response = response
         return json.loads(response.text)
 
+    @_call_scope
     def read_record_public(self, orcid_id, request_type, token, put_code=None,
                            accept_type='application/orcid+json'):
         """Get the public info about the researcher.
@@ -328,55 +741,98 @@ class PublicAPI(object):
 
     def _authenticate(self, user_id, password, redirect_uri, scope):
 
-        session = requests.session()
-        session.get('https://' + self._host + '/signout',
-                    timeout=self._timeout)
-        params = {
-            'client_id': self._key,
-            'response_type': 'code',
-            'scope': scope,
-            'redirect_uri': redirect_uri
-        }
-
-        response = session.get(self._login_or_register_endpoint,
-                               params=params,
-                               headers={'Host': self._host},
-                               timeout=self._timeout)
-
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html5lib')
-        csrf = soup.find(attrs={'name': '_csrf'}).attrs['content']
-        headers = {
-            'Host': self._host,
-            'Origin': 'https://' + self._host,
-            'Content-Type': 'application/json;charset=UTF-8',
-            'X-CSRF-TOKEN': csrf
-        }
+        session = self._transport.session()
+        try:
+            self._request('GET', self._signout_url, session=session)
+            params = {
+                'client_id': self._key,
+                'response_type': 'code',
+                'scope': scope,
+                'redirect_uri': redirect_uri
+            }
 
-        data = {
-            "userName": user_id,
-            "password": password,
-            "approved": True,
-            "persistentTokenEnabled": True,
-            "redirectUrl": None
-        }
+            response = self._request('GET', self._login_or_register_endpoint,
+                                     session=session, params=params,
+                                     headers={'Host': self._host})
 
-        response = session.post(
-            self._login_url,
-            data=json.dumps(data),
-            headers=headers
-        )
-        response.raise_for_status()
+            response.raise_for_status()
 
-        uri = json.loads(response.text)['redirectUrl']
-        authorization_code = uri[uri.rfind('=') + 1:]
+            if self._parser is None:
+                soup = BeautifulSoup(response.content, 'html5lib')
+            else:
+                soup = self._parser.parse_html(response.content)
+            csrf = soup.find(attrs={'name': '_csrf'}).attrs['content']
+            headers = {
+                'Host': self._host,
+                'Origin': 'https://' + self._host,
+                'Content-Type': 'application/json;charset=UTF-8',
+                'X-CSRF-TOKEN': csrf
+            }
+
+            data = {
+                "userName": user_id,
+                "password": password,
+                "approved": True,
+                "persistentTokenEnabled": True,
+                "redirectUrl": None
+            }
+
+            response = self._request('POST', self._login_url, session=session,
+                                     data=json.dumps(data), headers=headers)
+            response.raise_for_status()
+
+            uri = json.loads(response.text)['redirectUrl']
+            authorization_code = uri[uri.rfind('=') + 1:]
+        finally:
+            session.close()
 
         return self.get_token_from_authorization_code(authorization_code,
                                                       redirect_uri)
 
     def _get_info(self, orcid_id, function, request_type, token,
                   put_code=None, accept_type='application/orcid+json'):
+        timed(VALIDATE, self._check_arguments, orcid_id, request_type,
+              put_code)
+        # Member reads may contain limited data visible to the token.
+        scope = None if function == self._get_public_info else token
+        content = cache_key = None
+        if self._cache is not None:
+            cache_key = self._cache.key(orcid_id, self._endpoint,
+                                        request_type, put_code, accept_type,
+                                        scope)
+            content = self._cache.get(cache_key)
+        if content is None:
+            def fetch():
+                response = function(orcid_id, request_type, token,
+                                    put_code, accept_type)
+                response.raise_for_status()
+                if cache_key is not None:
+                    self._cache.set(cache_key, request_type,
+                                    response.content)
+                return response
+
+            if self._single_flight is None:
+                response = fetch()
+            else:
+                response = self._fetch_once(
+                    (self._endpoint, orcid_id, request_type,
+                     tuple(put_code) if isinstance(put_code, list)
+                     else put_code, accept_type, scope), fetch)
+            if self.do_store_raw_response:
+                self.raw_response = response
+            content = response.content
+        result = timed(DESERIALIZE, self._deserialize_by_content_type,
+                       content, accept_type)
+        if self._index is not None and isinstance(result, dict):
+            try:
+                self._index.add(orcid_id, request_type, result, put_code)
+            except Exception:
+                # The read succeeded, only the index misses the record.
+                _logger.exception('Could not index %s of %s', request_type,
+                                  orcid_id)
+        return result
+
+    def _check_arguments(self, orcid_id, request_type, put_code):
         if request_type in self.TYPES_WITH_PUTCODES and not put_code:
             raise ValueError("""In order to fetch specific record,
                                 please specify the 'put_code' argument.""")
@@ -389,48 +845,185 @@ class PublicAPI(object):
                 and put_code is not None and not isinstance(put_code, list):
             raise ValueError("""In order to fetch multiple records,
                                the 'put_code' should be a list.""")
-        response = function(orcid_id, request_type, token,
-                            put_code, accept_type)
-        response.raise_for_status()
-        if self.do_store_raw_response:
-            self.raw_response = response
-        return self._deserialize_by_content_type(response.content, accept_type)
+        # Malformed iDs and put-codes would only get a 404.
+        validate_identifiers(orcid_id, put_code)
+
+    def _fetch_once(self, key, fetch):
+        expires = getattr(self._local, 'deadline', None)
+        timeout = None if expires is None else max(expires - _now(), 0)
+        try:
+            return self._single_flight.do(key, fetch, timeout)
+        except FutureTimeoutError:
+            raise DeadlineExceeded('Deadline exceeded while waiting for a '
+                                   'concurrent read of %s' % key[1])
 
     def _get_public_info(self, orcid_id, request_type, access_token, put_code,
                          accept_type):
-        request_url = '%s/%s/%s' % (self._endpoint + VERSION,
-                                    orcid_id, request_type)
-        if put_code:
-            if request_type in self.TYPES_WITH_MULTIPLE_PUTCODES:
-                request_url += '/%s' % ','.join(put_code)
-            else:
-                request_url += '/%s' % put_code
-        headers = {'Accept': accept_type,
-                   'Authorization': 'Bearer %s' % access_token}
-        return requests.get(request_url, headers=headers,
-                            timeout=self._timeout)
-
+        builder = self._get_builder()
+        request_url = builder.record_url(
+            orcid_id, request_type, put_code,
+            request_type in self.TYPES_WITH_MULTIPLE_PUTCODES)
+        return self._request('GET', request_url,
+                             headers=builder.headers(accept_type,
+                                                     access_token))
+
+    @_call_scope
     def _search(self, query, method, start, rows, headers,
                 endpoint):
-        url = endpoint + SEARCH_VERSION + \
-                "/search/?defType=" + method + "&q=" + query
-        if start:
-            url += "&start=%s" % start
-        if rows:
-            url += "&rows=%s" % rows
+        builder = self._get_builder()
+        if endpoint != builder.endpoint:
+            builder = _RequestBuilder(endpoint)
+        url = builder.search_url(query, method, start, rows)
 
-        response = requests.get(url, headers=headers,
-                                timeout=self._timeout)
+        response = self._request('GET', url, headers=headers)
+        response.raise_for_status()
+        if self.do_store_raw_response:
+            self.raw_response = response
+        result = self._json(response)
+        if self._index is not None:
+            for item in result.get('result') or []:
+                self._index.add_search_result(item)
+        return result
+
+    def _get_builder(self):
+        # The builder follows the endpoint, which subclasses and tests may
+        # change after the initialization.
+        builder = self._builder
+        if builder is None or builder.endpoint != self._endpoint:
+            builder = self._builder = _RequestBuilder(self._endpoint)
+        return builder
+
+    def _request(self, method, url, session=None, **kwargs):
+        if self._scheduler is None:
+            return self._dispatch(method, url, session, kwargs)
+        expires = getattr(self._local, 'deadline', None)
+        if not timed(QUEUE, self._scheduler.acquire,
+                     getattr(self._local, 'priority', None),
+                     None if expires is None else max(expires - _now(), 0)):
+            raise DeadlineExceeded('Deadline exceeded while waiting to '
+                                   'request %s' % url)
+        try:
+            return self._dispatch(method, url, session, kwargs)
+        finally:
+            self._scheduler.release()
+
+    def _dispatch(self, method, url, session, kwargs):
+        timeout = self._timeout
+        expires = getattr(self._local, 'deadline', None)
+        if expires is not None:
+            remaining = expires - _now()
+            if remaining <= 0:
+                raise DeadlineExceeded('Deadline exceeded before requesting '
+                                       '%s' % url)
+            timeout = _clip_timeout(timeout, remaining)
+        if method == 'GET' and session is None and \
+                self._hedging is not None:
+            # The requests may be sent from the threads of the policy.
+            timing = current_timing()
+            priority = getattr(self._local, 'priority', None)
+
+            def primary():
+                return attempt(timing, self._send, method, url, session,
+                               timeout, expires, kwargs)
+
+            def hedge():
+                # The duplicate takes a slot of its own if one is free at
+                # once, and is given up otherwise.
+                if self._scheduler is None:
+                    return primary()
+                if not self._scheduler.acquire(priority, 0):
+                    return None
+                try:
+                    return primary()
+                finally:
+                    self._scheduler.release()
+
+            def send():
+                return self._hedging.run(primary, hedge)
+        else:
+            def send():
+                return self._send(method, url, session, timeout, expires,
+                                  kwargs)
+        if self._circuit_breaker is not None:
+            return self._circuit_breaker.call(url, send)
+        return send()
+
+    def _send(self, method, url, session, timeout, expires, kwargs):
+        stream = expires is not None or self._max_response_bytes is not None
+        timing = current_timing()
+        try:
+            if timing is None:
+                response = (session or self._transport).request(
+                    method, url, timeout=timeout, stream=stream, **kwargs)
+                if stream:
+                    self._read_body(response, expires)
+            else:
+                # Stream the body to time its download separately.
+                setup = timing.setup_time()
+                start = timer()
+                response = (session or self._transport).request(
+                    method, url, timeout=timeout, stream=True, **kwargs)
+                received = timer()
+                timing.add(WAIT, received - start -
+                           (timing.setup_time() - setup))
+                if stream:
+                    self._read_body(response, expires)
+                else:
+                    response.content
+                timing.add(DOWNLOAD, timer() - received)
+        except requests.exceptions.Timeout as error:
+            # A timeout shortened to fit the deadline means the deadline
+            # has passed.
+            if timeout != self._timeout and \
+                    not isinstance(error, DeadlineExceeded):
+                raise DeadlineExceeded('Deadline exceeded while requesting '
+                                       '%s' % url)
+            raise
+        return response
+
+    def _read_body(self, response, expires):
+        limit = self._max_response_bytes
+        length = response.headers.get('Content-Length')
+        if limit is not None and length and int(length) > limit:
+            response.close()
+            raise ResponseTooLarge('Response of %s bytes exceeds the limit '
+                                   'of %s bytes' % (length, limit),
+                                   response=response)
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(64 * 1024):
+            size += len(chunk)
+            if limit is not None and size > limit:
+                response.close()
+                raise ResponseTooLarge('Response exceeds the limit of %s '
+                                       'bytes' % limit, response=response)
+            if expires is not None and _now() > expires:
+                response.close()
+                raise DeadlineExceeded('Deadline exceeded while reading %s'
+                                       % response.url, response=response)
+            chunks.append(chunk)
+        response._content = b''.join(chunks)
+        response._content_consumed = True
+
+    def _expanded_search(self, url, headers):
+        response = self._request('GET', url, headers=headers)
         response.raise_for_status()
         if self.do_store_raw_response:
             self.raw_response = response
-        return response.json()
+        return response
+
+    def _json(self, response):
+        if self._parser is None:
+            return response.json()
+        return self._parser.loads(response.content)
 
     def _deserialize_by_content_type(self, data, content_type):
+        parser = self._parser
         if content_type == 'application/orcid+json':
-            return json.loads(data)
+            return json.loads(data) if parser is None else parser.loads(data)
         if content_type == 'application/orcid+xml':
-            return etree.XML(data)
+            return etree.XML(data) if parser is None else \
+                parser.parse_xml(data)
         raise NotImplementedError('No deserializer for content of type %s'
                                   % content_type)
 
@@ -439,7 +1032,12 @@ class MemberAPI(PublicAPI):
     """Member API."""
 
     def __init__(self, institution_key, institution_secret, sandbox=False,
-                 timeout=None, do_store_raw_response=False):
+                 timeout=None, do_store_raw_response=False, validator=None,
+                 deadline=None, max_response_bytes=None, hedging=None,
+                 index=None, transport=None, cache=None,
+                 single_flight=None, circuit_breaker=None,
+                 scheduler=None, token_store=None, profiler=None,
+                 delta_tracker=None, parser=None):
         """Initialize member API.
 
         Parameters
@@ -456,11 +1054,72 @@ class MemberAPI(PublicAPI):
             `requests documentation
             <http://docs.python-requests.org/en/master/user/advanced/#timeouts>`_
             for more information.
+        :param deadline: float
+            The maximum time in seconds a single method call may take,
+            including all the requests it makes. If None, only `timeout`
+            applies.
+        :param max_response_bytes: integer
+            The maximum size of a response body. If None, the size is not
+            limited.
+        :param hedging: orcid.hedging.HedgingPolicy
+            If given, slow record reads and searches are hedged with a
+            duplicate request according to the policy. With a `scheduler`,
+            a hedge is only sent if a slot is free at once.
+        :param index: orcid.index.RecordIndex
+            If given, the JSON records read and the search results are added
+            to the local index.
+        :param transport: orcid.transport.RequestsTransport |
+                          orcid.transport.HTTP2Transport
+            The transport sending the requests. If None, a new
+            `RequestsTransport` is used.
+        :param cache: orcid.cache.LMDBCache
+            If given, the records read are cached, and cached records are
+            returned without a request. Writes invalidate the cached reads
+            of the record.
+        :param single_flight: orcid.singleflight.SingleFlight
+            If given, concurrent reads of the same record with the same
+            token share one request.
+        :param circuit_breaker: orcid.circuit.CircuitBreaker
+            If given, requests to an endpoint that keeps failing raise
+            `orcid.exceptions.CircuitOpen` without being sent.
+        :param scheduler: orcid.scheduler.RequestScheduler
+            If given, the requests wait for a slot of the scheduler, which
+            serves the priority classes set with `priority`.
+        :param token_store: orcid.tokens.TokenStore
+            If given, the tokens obtained with
+            `get_token_from_authorization_code` are stored by iD, and the
+            methods taking a token look it up when None is passed.
+        :param profiler: orcid.profiling.Profiler
+            If given, a sample of the calls is timed phase by phase. The
+            timing of the last sampled call is available as `last_timing`.
+        :param delta_tracker: orcid.delta.DeltaTracker
+            If given, `update_record` skips the updates that would not change
+            the record, according to the hashes of the records written.
+        :param parser: orcid.xmlutils.TunedParser
+            If given, the responses are parsed with it: `TunedParser` parses
+            XML faster, and `orcid.cooperative.CooperativeParser` does not
+            block the other greenlets under gevent or eventlet.
+        :param validator: orcid.validation.SchemaValidator
+            If given, the records passed to `add_record` and `update_record`
+            are validated locally and `orcid.exceptions.ValidationError` is
+            raised before any request is sent.
         """
         super(MemberAPI, self).__init__(institution_key,
-                                        institution_secret, sandbox, timeout)
+                                        institution_secret, sandbox, timeout,
+                                        deadline=deadline,
+                                        max_response_bytes=max_response_bytes,
+                                        hedging=hedging, index=index,
+                                        transport=transport, cache=cache,
+                                        single_flight=single_flight,
+                                        circuit_breaker=circuit_breaker,
+                                        scheduler=scheduler,
+                                        profiler=profiler, parser=parser)
         self.raw_response = None
         self.do_store_raw_response = do_store_raw_response
+        self._validator = validator
+        self._token_store = token_store
+        self._delta_tracker = delta_tracker
+        self._refresh_flight = SingleFlight()
         if sandbox:
             self._endpoint = "https://api.sandbox.orcid.org"
             self._auth_url = 'https://sandbox.orcid.org/signin/auth.json'
@@ -472,6 +1131,7 @@ class MemberAPI(PublicAPI):
             self._authorize_url = \
                 'https://orcid.org/oauth/custom/authorize.json'
 
+    @_call_scope
     def add_record(self, orcid_id, token, request_type, data,
                    content_type='application/orcid+json'):
         """Add a record to a profile.
@@ -481,7 +1141,8 @@ class MemberAPI(PublicAPI):
         :param orcid_id: string
             Id of the author.
         :param token: string
-            Token received from OAuth 2 3-legged authorization.
+            Token received from OAuth 2 3-legged authorization. If None, the
+            token of the iD is taken from the token store.
         :param request_type: string
             One of 'activities', 'education', 'employment', 'funding',
             'peer-review', 'work'.
@@ -497,10 +1158,11 @@ class MemberAPI(PublicAPI):
         :returns: string
             Put-code of the new work.
         """
-        return self._update_activities(orcid_id, token, requests.post,
+        return self._update_activities(orcid_id, token, 'POST',
                                        request_type, data,
                                        content_type=content_type)
 
+    @_call_scope
     def get_token(self, user_id, password, redirect_uri,
                   scope='/activities/update'):
         """Get the token.
@@ -526,6 +1188,21 @@ class MemberAPI(PublicAPI):
         return super(MemberAPI, self).get_token(user_id, password,
                                                 redirect_uri, scope)
 
+    @_call_scope
+    def get_token_from_authorization_code(self,
+                                          authorization_code, redirect_uri):
+        """Like `get_token`, but using an OAuth 2 authorization code.
+
+        See `PublicAPI.get_token_from_authorization_code`. With a token
+        store, the token is stored under the iD of the researcher.
+        """
+        token = super(MemberAPI, self).get_token_from_authorization_code(
+            authorization_code, redirect_uri)
+        if self._token_store is not None and token.get('orcid'):
+            token = self._token_store.set(token['orcid'], token)
+        return token
+
+    @_call_scope
     def get_user_orcid(self, user_id, password, redirect_uri):
         """Get the user orcid from authentication process.
 
@@ -548,7 +1225,9 @@ class MemberAPI(PublicAPI):
 
         return response['orcid']
 
-    def read_record_member(self, orcid_id, request_type, token, put_code=None,
+    @_call_scope
+    def read_record_member(self, orcid_id, request_type, token=None,
+                           put_code=None,
                            accept_type='application/orcid+json'):
         """Get the member info about the researcher.
 
@@ -563,7 +1242,8 @@ class MemberAPI(PublicAPI):
         :param response_format: string
             One of json, xml.
         :param token: string
-            Token received from OAuth 2 3-legged authorization.
+            Token received from OAuth 2 3-legged authorization. If None, the
+            token of the iD is taken from the token store.
         :param put_code: string | list of strings
             The id of the queried work. In case of 'works' request_type
             might be a list of strings
@@ -576,8 +1256,10 @@ class MemberAPI(PublicAPI):
             in XML E-tree, depending on accept_type specified.
         """
         return self._get_info(orcid_id, self._get_member_info, request_type,
-                              token, put_code, accept_type)
+                              self._resolve_token(orcid_id, token), put_code,
+                              accept_type)
 
+    @_call_scope
     def remove_record(self, orcid_id, token, request_type, put_code):
         """Add a record to a profile.
 
@@ -586,7 +1268,8 @@ class MemberAPI(PublicAPI):
         :param orcid_id: string
             Id of the author.
         :param token: string
-            Token received from OAuth 2 3-legged authorization.
+            Token received from OAuth 2 3-legged authorization. If None, the
+            token of the iD is taken from the token store.
         :param request_type: string
             One of 'activities', 'education', 'employment', 'funding',
             'peer-review', 'work'.
@@ -594,17 +1277,19 @@ class MemberAPI(PublicAPI):
             The id of the record. Can be retrieved using read_record_* method.
             In the result of it, it will be called 'put-code'.
         """
-        self._update_activities(orcid_id, token, requests.delete, request_type,
+        self._update_activities(orcid_id, token, 'DELETE', request_type,
                                 put_code=put_code)
 
+    @_call_scope
     def search(self, query, method="lucene", start=None, rows=None,
                access_token=None):
         """Search the ORCID database.
 
         Parameters
         ----------
-        :param query: string
-            Query in line with the chosen method.
+        :param query: string or orcid.query.Query
+            Query in line with the chosen method. It is URL-encoded before
+            it is sent.
         :param method: string
             One of 'lucene', 'edismax', 'dismax'
         :param start: string
@@ -627,8 +1312,8 @@ class MemberAPI(PublicAPI):
             access_token = self. \
                 get_search_token_from_orcid()
 
-        headers = {'Accept': 'application/orcid+json',
-                   'Authorization': 'Bearer %s' % access_token}
+        headers = self._get_builder().headers('application/orcid+json',
+                                              access_token)
 
         return self._search(query, method, start, rows, headers,
                             self._endpoint)
@@ -641,8 +1326,9 @@ class MemberAPI(PublicAPI):
 
         Parameters
         ----------
-        :param query: string
-            Query in line with the chosen method.
+        :param query: string or orcid.query.Query
+            Query in line with the chosen method. It is URL-encoded before
+            it is sent.
         :param method: string
             One of 'lucene', 'edismax', 'dismax'
         :param pagination: integer
@@ -656,8 +1342,8 @@ class MemberAPI(PublicAPI):
             access_token = self. \
                 get_search_token_from_orcid()
 
-        headers = {'Accept': 'application/orcid+json',
-                   'Authorization': 'Bearer %s' % access_token}
+        headers = self._get_builder().headers('application/orcid+json',
+                                              access_token)
 
         index = 0
 
@@ -671,16 +1357,21 @@ class MemberAPI(PublicAPI):
                 yield result
             index += pagination
 
+    @_call_scope
     def update_record(self, orcid_id, token, request_type, data, put_code,
                       content_type='application/orcid+json'):
         """Add a record to a profile.
 
+        If the API has a delta tracker and the record is unchanged since it
+        was last written, no request is sent.
+
         Parameters
         ----------
         :param orcid_id: string
             Id of the author.
         :param token: string
-            Token received from OAuth 2 3-legged authorization.
+            Token received from OAuth 2 3-legged authorization. If None, the
+            token of the iD is taken from the token store.
         :param request_type: string
             One of 'activities', 'education', 'employment', 'funding',
             'peer-review', 'work'.
@@ -694,52 +1385,115 @@ class MemberAPI(PublicAPI):
         :param content_type: string
             MIME type of the data being sent.
         """
-        self._update_activities(orcid_id, token, requests.put, request_type,
+        self._update_activities(orcid_id, token, 'PUT', request_type,
                                 data, put_code, content_type)
 
+    def _resolve_token(self, orcid_id, token):
+        if token is not None:
+            return token
+        if self._token_store is None:
+            raise ValueError("A token is needed, unless the API has a "
+                             "token store.")
+        stored = self._token_store.get(orcid_id)
+        if stored is None:
+            raise TokenNotFound('No token stored for %s' % orcid_id)
+        expires_at = stored.get('expires_at')
+        if expires_at and expires_at - TOKEN_REFRESH_MARGIN < time.time():
+            if not stored.get('refresh_token'):
+                raise TokenNotFound('The token of %s expired' % orcid_id)
+            # Concurrent calls for the iD share a single refresh.
+            stored = self._refresh_flight.do(
+                orcid_id, lambda: self._refresh_stored(orcid_id, stored))
+        return stored['access_token']
+
+    def _refresh_stored(self, orcid_id, stored):
+        token = self.refresh_token(stored['refresh_token'])
+        token.setdefault('orcid', orcid_id)
+        return self._token_store.set(orcid_id, token)
+
     def _get_member_info(self, orcid_id, request_type, access_token, put_code,
                          accept_type):
-        request_url = '%s/%s/%s' % (self._endpoint + VERSION,
-                                    orcid_id, request_type)
-        if put_code:
-            if request_type in self.TYPES_WITH_MULTIPLE_PUTCODES:
-                request_url += '/%s' % ','.join(put_code)
-            else:
-                request_url += '/%s' % put_code
-        headers = {'Accept': accept_type,
-                   'Authorization': 'Bearer %s' % access_token}
-        return requests.get(request_url, headers=headers,
-                            timeout=self._timeout)
+        builder = self._get_builder()
+        request_url = builder.record_url(
+            orcid_id, request_type, put_code,
+            request_type in self.TYPES_WITH_MULTIPLE_PUTCODES)
+        return self._request('GET', request_url,
+                             headers=builder.headers(accept_type,
+                                                     access_token))
 
     def _update_activities(self, orcid_id, token, method, request_type,
                            data=None, put_code=None,
                            content_type='application/orcid+json'):
-        url = "%s/%s/%s" % (self._endpoint + VERSION, orcid_id,
-                            request_type)
-
-        if put_code:
-            url += ('/%s' % put_code)
-            if data is not None:
-                self._add_put_code_by_content_type(content_type, data,
-                                                   put_code)
-
-        headers = {'Accept': 'application/orcid+json',
-                   'Content-Type': content_type,
-                   'Authorization': 'Bearer ' + token}
-
-        if method == requests.delete:
-            response = method(url, headers=headers, timeout=self._timeout)
+        timed(VALIDATE, validate_identifiers, orcid_id, put_code)
+        if data is not None and self._validator is not None:
+            timed(VALIDATE, self._validator.validate, request_type, data,
+                  content_type)
+        token = self._resolve_token(orcid_id, token)
+
+        tracker = self._delta_tracker
+        new_digest = None
+        if tracker is not None and data is not None:
+            new_digest = digest(data, content_type)
+            if method == 'PUT':
+                if self._unchanged(orcid_id, token, request_type, put_code,
+                                   new_digest, content_type):
+                    tracker.count('suppressed')
+                    return None
+
+        builder = self._get_builder()
+        url = builder.record_url(orcid_id, request_type, put_code)
+
+        if put_code and data is not None:
+            self._add_put_code_by_content_type(content_type, data,
+                                               put_code)
+
+        headers = builder.headers('application/orcid+json', token,
+                                  content_type)
+
+        if method == 'DELETE':
+            response = self._request(method, url, headers=headers)
         else:
-            xml = self._serialize_by_content_type(data, content_type)
-            response = method(url, xml, headers=headers, timeout=self._timeout)
+            xml = timed(SERIALIZE, self._serialize_by_content_type, data,
+                        content_type)
+            response = self._request(method, url, data=xml, headers=headers)
 
         response.raise_for_status()
         if self.do_store_raw_response:
             self.raw_response = response
+        if self._cache is not None:
+            self._cache.invalidate(orcid_id)
+
+        if 'location' in response.headers:
+            put_code = response.headers['location'].split('/')[-1]
+        if tracker is not None and method == 'PUT' and \
+                new_digest is not None:
+            tracker.count('sent')
+        if tracker is not None and put_code is not None:
+            if new_digest is None:
+                tracker.forget(orcid_id, request_type, put_code)
+            else:
+                tracker.set(orcid_id, request_type, put_code, new_digest)
 
         if 'location' in response.headers:
             # Return the new put-code
-            return response.headers['location'].split('/')[-1]
+            return put_code
+
+    def _unchanged(self, orcid_id, token, request_type, put_code,
+                   new_digest, content_type):
+        tracker = self._delta_tracker
+        old_digest = tracker.get(orcid_id, request_type, put_code)
+        if old_digest is None and tracker.fetch_missing:
+            try:
+                current = self._get_info(orcid_id, self._get_member_info,
+                                         request_type, token, put_code,
+                                         content_type)
+            except requests.HTTPError:
+                # The update will report the problem, if any.
+                return False
+            tracker.count('fetched')
+            old_digest = digest(current, content_type)
+            tracker.set(orcid_id, request_type, put_code, old_digest)
+        return old_digest == new_digest
 
     def _add_put_code_by_content_type(self, content_type, data, put_code):
         if content_type == 'application/orcid+json':
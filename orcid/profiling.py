@@ -0,0 +1,192 @@
+"""Breakdown of the time taken by API calls into phases."""
+
+from collections import OrderedDict
+import random
+import threading
+import time
+
+QUEUE = 'queue'
+VALIDATE = 'validate'
+SERIALIZE = 'serialize'
+DNS = 'dns'
+CONNECT = 'connect'
+TLS = 'tls'
+WAIT = 'wait'
+DOWNLOAD = 'download'
+DESERIALIZE = 'deserialize'
+
+_SETUP = (DNS, CONNECT, TLS)
+
+timer = getattr(time, 'perf_counter', time.time)
+
+_state = threading.local()
+
+# Guards the phases added from other threads against the end of the call.
+_merge_lock = threading.Lock()
+
+
+class CallTiming(object):
+    """The phases of an API call.
+
+    ``phases`` maps the phase names to the seconds spent in them, in the
+    order they were first entered:
+
+    - 'queue': waiting for a slot of the request scheduler.
+    - 'validate': checking the arguments or the record sent.
+    - 'serialize': encoding the record sent.
+    - 'dns', 'connect' and 'tls': opening a new connection. The HTTP/2
+      transport counts the name resolution in 'connect'.
+    - 'wait': sending the request and waiting for the response headers.
+    - 'download': receiving and decompressing the response body.
+    - 'deserialize': decoding the response body.
+
+    The phases of all the requests of the call are summed, including the
+    hedges of a read that complete before the call. ``total`` is the
+    duration of the whole call and ``error`` the exception it raised, if
+    any.
+    """
+
+    __slots__ = ('name', 'phases', 'total', 'error', '_start')
+
+    def __init__(self, name):
+        """Start the timing of a call."""
+        self.name = name
+        self.phases = OrderedDict()
+        self.total = None
+        self.error = None
+        self._start = timer()
+
+    def add(self, phase, seconds):
+        """Add seconds to a phase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def setup_time(self):
+        """Return the seconds spent opening connections so far."""
+        phases = self.phases
+        return sum(phases.get(phase, 0.0) for phase in _SETUP)
+
+    def __repr__(self):
+        """Return the phases in milliseconds."""
+        phases = ', '.join('%s=%.1fms' % (phase, seconds * 1000)
+                           for phase, seconds in self.phases.items())
+        return '<CallTiming %s total=%s (%s)>' % (
+            self.name,
+            'running' if self.total is None else '%.1fms' % (
+                self.total * 1000),
+            phases)
+
+
+class Profiler(object):
+    """Times a sample of the API calls phase by phase.
+
+    The timing of the last sampled call of a thread is available as
+    ``last_timing`` on the API. Calls that are not sampled cost a random
+    draw, so a low sample rate can be left on in production.
+    """
+
+    def __init__(self, sample_rate=1.0, callback=None):
+        """Initialize the profiler.
+
+        Parameters
+        ----------
+        :param sample_rate: float
+            The fraction of the calls timed, between 0 and 1.
+        :param callback: callable
+            If given, called with the `CallTiming` of every sampled call
+            when it ends.
+        """
+        if not 0 <= sample_rate <= 1:
+            raise ValueError('The sample rate must be between 0 and 1.')
+        self._sample_rate = sample_rate
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def start(self, name):
+        """Start timing a call, if it is sampled.
+
+        Returns
+        -------
+        :returns: CallTiming
+            The timing of the call, or None if it is not sampled.
+        """
+        if self._sample_rate < 1 and random.random() >= self._sample_rate:
+            return None
+        timing = _state.timing = CallTiming(name)
+        return timing
+
+    def finish(self, timing, error=None):
+        """End the timing of a call started with `start`."""
+        _state.timing = None
+        with _merge_lock:
+            timing.total = timer() - timing._start
+        timing.error = error
+        with self._lock:
+            totals = self._totals.get(timing.name)
+            if totals is None:
+                totals = self._totals[timing.name] = {
+                    'calls': 0, 'errors': 0, 'total': 0.0}
+            totals['calls'] += 1
+            totals['errors'] += error is not None
+            totals['total'] += timing.total
+            for phase, seconds in timing.phases.items():
+                totals[phase] = totals.get(phase, 0.0) + seconds
+        if self._callback is not None:
+            self._callback(timing)
+
+    def summary(self):
+        """Return the mean seconds per phase of the sampled calls.
+
+        Returns
+        -------
+        :returns: dict
+            The calls by name, each with the number of ``calls`` and
+            ``errors`` sampled, the mean ``total`` and the mean of every
+            phase.
+        """
+        summary = {}
+        with self._lock:
+            for name, totals in self._totals.items():
+                calls = totals['calls']
+                summary[name] = dict(
+                    (key, value if key in ('calls', 'errors')
+                     else value / calls) for key, value in totals.items())
+        return summary
+
+
+def current():
+    """Return the timing of the call running in this thread, or None."""
+    return getattr(_state, 'timing', None)
+
+
+def timed(phase, function, *args, **kwargs):
+    """Call a function, adding its duration to a phase of the current call."""
+    timing = getattr(_state, 'timing', None)
+    if timing is None:
+        return function(*args, **kwargs)
+    start = timer()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        timing.add(phase, timer() - start)
+
+
+def attempt(timing, function, *args, **kwargs):
+    """Call a function on behalf of a call, possibly from another thread.
+
+    The phases of the function are added to `timing` when it returns,
+    unless the call has ended meanwhile, as it does for the hedge of a read
+    that lost the race.
+    """
+    if timing is None:
+        return function(*args, **kwargs)
+    previous = getattr(_state, 'timing', None)
+    own = _state.timing = CallTiming(timing.name)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _state.timing = previous
+        with _merge_lock:
+            if timing.total is None:
+                for phase, seconds in own.phases.items():
+                    timing.add(phase, seconds)
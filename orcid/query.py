@@ -0,0 +1,121 @@
+"""Building search queries for the ORCID search API."""
+
+import re
+
+# Fields of the ORCID search index. Fields of the form '<id-type>-self',
+# for example 'doi-self' or 'pmid-self', are accepted as well.
+FIELDS = set(['affiliation-org-name',
+              'credit-name',
+              'digital-object-ids',
+              'email',
+              'external-id-reference',
+              'family-name',
+              'funding-titles',
+              'given-and-family-names',
+              'given-names',
+              'grant-numbers',
+              'grid-org-id',
+              'keyword',
+              'orcid',
+              'other-names',
+              'profile-submission-date',
+              'profile-last-modified-date',
+              'ringgold-org-id',
+              'text',
+              'work-titles'])
+
+_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def escape(value):
+    """Escape the characters that have a meaning in Lucene queries.
+
+    Parameters
+    ----------
+    :param value: string
+        The value to search for.
+
+    Returns
+    -------
+    :returns: string
+        The value, safe to use in a query.
+    """
+    return _SPECIAL.sub(r'\\\1', value)
+
+
+class Query(object):
+    """A Lucene query for `PublicAPI.search` and the expanded search.
+
+    Queries are built from fields and combined with ``&`` (AND), ``|`` (OR)
+    and ``~`` (NOT):
+
+    .. code-block:: python
+
+        query = (Query.field('family-name', 'Sanchez') &
+                 ~Query.field('affiliation-org-name', 'CERN'))
+    """
+
+    def __init__(self, text):
+        """Initialize a query from raw Lucene syntax."""
+        self.text = text
+
+    @classmethod
+    def field(cls, name, value):
+        """Return a query matching a field.
+
+        Parameters
+        ----------
+        :param name: string
+            One of `FIELDS`, or '<id-type>-self'. Underscores are accepted
+            in place of dashes.
+        :param value: string
+            The value to search for. Values containing spaces are searched
+            for as phrases.
+
+        Returns
+        -------
+        :returns: Query
+            The query.
+        """
+        name = name.replace('_', '-')
+        if name not in FIELDS and not name.endswith('-self'):
+            raise ValueError("Unknown search field '%s'." % name)
+        value = escape('%s' % value)
+        if ' ' in value:
+            value = '"%s"' % value
+        return cls('%s:%s' % (name, value))
+
+    @classmethod
+    def all(cls, **fields):
+        """Return a query matching all the given fields.
+
+        For example ``Query.all(family_name='Sanchez', given_names='Ana')``.
+        """
+        if not fields:
+            raise ValueError('At least one search field is required.')
+        queries = [cls.field(name, value)
+                   for name, value in sorted(fields.items())]
+        query = queries[0]
+        for other in queries[1:]:
+            query &= other
+        return query
+
+    def __and__(self, other):
+        """Combine the queries with AND."""
+        return Query('(%s) AND (%s)' % (self.text, other.text))
+
+    def __or__(self, other):
+        """Combine the queries with OR."""
+        return Query('(%s) OR (%s)' % (self.text, other.text))
+
+    def __invert__(self):
+        """Negate the query."""
+        return Query('*:* NOT (%s)' % self.text)
+
+    def __str__(self):
+        """Return the Lucene syntax of the query."""
+        return self.text
+
+    def __repr__(self):
+        """Return a representation of the query."""
+        return 'Query(%r)' % self.text
@@ -0,0 +1,129 @@
+"""Clients of several institutions sharing their resources."""
+
+import threading
+
+from .orcid import MemberAPI, _RequestBuilder
+from .transport import RequestsTransport
+
+# Options holding per-institution state, which must not be shared.
+_PER_TENANT = ('token_store', 'scheduler')
+
+
+class ClientRegistry(object):
+    """MemberAPI clients by tenant, sharing their connections.
+
+    Every tenant is an institution with its own key and secret. The
+    clients of all the tenants share a transport, with its pool of
+    connections, the request builder and the other options given to the
+    registry, such as a cache, a validator or a circuit breaker. Token
+    stores and schedulers hold per-institution state: they are created per
+    tenant by the factories given.
+
+    Clients are created on first use and kept.
+    """
+
+    def __init__(self, sandbox=False, transport=None,
+                 token_store_factory=None, scheduler_factory=None,
+                 **options):
+        """Initialize the registry.
+
+        Parameters
+        ----------
+        :param sandbox: boolean
+            Should the sandbox be used.
+        :param transport: orcid.transport.RequestsTransport |
+                          orcid.transport.HTTP2Transport
+            The transport shared by the clients. If None, a new
+            `RequestsTransport` is used. Size its pool for the number of
+            threads sending requests, whatever their tenants.
+        :param token_store_factory: callable
+            Called with the tenant id, returns the `orcid.tokens.TokenStore`
+            of the tenant.
+        :param scheduler_factory: callable
+            Called with the tenant id, returns the
+            `orcid.scheduler.RequestScheduler` of the tenant, which holds its
+            rate budget.
+        :param options:
+            Other arguments of `MemberAPI`, shared by all the clients.
+        """
+        for name in _PER_TENANT:
+            if name in options:
+                raise ValueError('%s is per tenant, pass %s_factory '
+                                 'instead.' % (name, name))
+        self._sandbox = sandbox
+        self.transport = transport or RequestsTransport()
+        self._token_store_factory = token_store_factory
+        self._scheduler_factory = scheduler_factory
+        self._options = options
+        self._credentials = {}
+        self._clients = {}
+        self._builder = None
+        self._lock = threading.Lock()
+
+    def register(self, tenant_id, institution_key, institution_secret):
+        """Add a tenant, or change its credentials.
+
+        Parameters
+        ----------
+        :param tenant_id: string
+            The id the client of the tenant is looked up with.
+        :param institution_key: string
+            The ORCID key given to the institution.
+        :param institution_secret: string
+            The ORCID secret given to the institution.
+        """
+        with self._lock:
+            self._credentials[tenant_id] = (institution_key,
+                                            institution_secret)
+            self._clients.pop(tenant_id, None)
+
+    def unregister(self, tenant_id):
+        """Remove a tenant and its client."""
+        with self._lock:
+            del self._credentials[tenant_id]
+            self._clients.pop(tenant_id, None)
+
+    def get(self, tenant_id):
+        """Return the client of a tenant.
+
+        Raises
+        ------
+        :raises: KeyError
+            If the tenant is not registered.
+        """
+        client = self._clients.get(tenant_id)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(tenant_id)
+            if client is None:
+                client = self._clients[tenant_id] = self._create(tenant_id)
+        return client
+
+    def tenants(self):
+        """Return the ids of the registered tenants."""
+        with self._lock:
+            return list(self._credentials)
+
+    def close(self):
+        """Close the shared transport."""
+        self.transport.close()
+
+    def __contains__(self, tenant_id):
+        """Return whether a tenant is registered."""
+        return tenant_id in self._credentials
+
+    def _create(self, tenant_id):
+        key, secret = self._credentials[tenant_id]
+        client = MemberAPI(
+            key, secret, sandbox=self._sandbox, transport=self.transport,
+            token_store=self._token_store_factory(tenant_id)
+            if self._token_store_factory is not None else None,
+            scheduler=self._scheduler_factory(tenant_id)
+            if self._scheduler_factory is not None else None,
+            **self._options)
+        if self._builder is None or \
+                self._builder.endpoint != client._endpoint:
+            self._builder = _RequestBuilder(client._endpoint)
+        client._builder = self._builder
+        return client
@@ -0,0 +1,189 @@
+"""Scheduling of requests from several priority classes."""
+
+from collections import deque
+import threading
+import time
+
+_now = getattr(time, 'monotonic', time.time)
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+
+class _Class(object):
+
+    def __init__(self, weight):
+        self.stride = 1.0 / weight
+        self.finish = 0.0
+        self.waiters = deque()
+        self.dispatched = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class _Waiter(object):
+
+    def __init__(self):
+        self.enqueued = _now()
+        self.granted = False
+
+
+class RequestScheduler(object):
+    """Share a rate limit and a concurrency limit between priority classes.
+
+    Requests wait in one queue per class. When capacity is available, the
+    classes with waiting requests are served by weighted fair queuing: with
+    the default weights, interactive requests get ten slots for every batch
+    request while both are queued, and batch requests use all the capacity
+    interactive ones leave.
+
+    Share one scheduler between the API instances using the same
+    credentials, and select the class of the requests of a thread with
+    ``api.priority('batch')``.
+    """
+
+    def __init__(self, rate=None, burst=1, max_concurrent=None,
+                 weights=None, default=INTERACTIVE):
+        """Initialize the scheduler.
+
+        Parameters
+        ----------
+        :param rate: float
+            The maximum number of requests per second. If None, the rate is
+            not limited.
+        :param burst: integer
+            The number of requests that may be sent at once after an idle
+            period, within the rate.
+        :param max_concurrent: integer
+            The maximum number of requests in flight. If None, it is not
+            limited.
+        :param weights: dict
+            Maps the class names to their weights. By default
+            ``{'interactive': 10, 'batch': 1}``.
+        :param default: string
+            The class of the requests sent without ``api.priority``.
+        """
+        if weights is None:
+            weights = {INTERACTIVE: 10, BATCH: 1}
+        if default not in weights:
+            raise ValueError("Unknown default class '%s'." % default)
+        self._classes = dict((name, _Class(weight))
+                             for name, weight in weights.items())
+        self._default = default
+        self._interval = 1.0 / rate if rate else 0
+        self._burst = burst
+        self._tokens = float(burst)
+        self._refilled = _now()
+        self._max_concurrent = max_concurrent
+        self._in_flight = 0
+        self._virtual_time = 0.0
+        self._condition = threading.Condition(threading.Lock())
+
+    def acquire(self, priority=None, timeout=None):
+        """Wait for a slot to send a request.
+
+        Parameters
+        ----------
+        :param priority: string
+            The class of the request. If None, the default class.
+        :param timeout: float
+            The maximum time in seconds to wait. If None, wait until a slot
+            is available.
+
+        Returns
+        -------
+        :returns: boolean
+            True if a slot was granted, False if the timeout passed first.
+            Every granted slot must be given back with `release`.
+        """
+        request_class = self._class(priority)
+        waiter = _Waiter()
+        expires = None if timeout is None else waiter.enqueued + timeout
+        with self._condition:
+            if not request_class.waiters:
+                # An idle class does not accumulate credit.
+                request_class.finish = max(request_class.finish,
+                                           self._virtual_time)
+            request_class.waiters.append(waiter)
+            while True:
+                delay = self._dispatch()
+                if waiter.granted:
+                    return True
+                if expires is not None:
+                    remaining = expires - _now()
+                    if remaining <= 0:
+                        request_class.waiters.remove(waiter)
+                        return False
+                    if delay is None or remaining < delay:
+                        delay = remaining
+                self._condition.wait(delay)
+
+    def release(self):
+        """Give back a slot granted by `acquire`."""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def metrics(self):
+        """Return the counters of every class.
+
+        Returns
+        -------
+        :returns: dict
+            Maps the class names to dictionaries with the keys 'queued',
+            the number of waiting requests, 'dispatched', 'mean_wait' and
+            'max_wait', the waiting times in seconds.
+        """
+        with self._condition:
+            return dict((name, {
+                'queued': len(request_class.waiters),
+                'dispatched': request_class.dispatched,
+                'mean_wait': request_class.total_wait /
+                request_class.dispatched if request_class.dispatched else 0.0,
+                'max_wait': request_class.max_wait})
+                for name, request_class in self._classes.items())
+
+    def _class(self, priority):
+        try:
+            return self._classes[priority or self._default]
+        except KeyError:
+            raise ValueError("Unknown priority class '%s'." % priority)
+
+    def _dispatch(self):
+        # Grants slots to the waiters while there is capacity. Returns the
+        # time until a rate token is available, if the rate is the limit.
+        granted = False
+        delay = None
+        while True:
+            ready = [request_class for request_class in self._classes.values()
+                     if request_class.waiters]
+            if not ready:
+                break
+            if self._max_concurrent is not None and \
+                    self._in_flight >= self._max_concurrent:
+                break
+            if self._interval:
+                now = _now()
+                self._tokens = min(self._burst, self._tokens +
+                                   (now - self._refilled) / self._interval)
+                self._refilled = now
+                if self._tokens < 1:
+                    delay = (1 - self._tokens) * self._interval
+                    break
+                self._tokens -= 1
+            # The class whose next request finishes first in virtual time.
+            request_class = min(ready, key=lambda ready_class:
+                                ready_class.finish + ready_class.stride)
+            request_class.finish += request_class.stride
+            self._virtual_time = request_class.finish
+            waiter = request_class.waiters.popleft()
+            waited = _now() - waiter.enqueued
+            request_class.dispatched += 1
+            request_class.total_wait += waited
+            request_class.max_wait = max(request_class.max_wait, waited)
+            waiter.granted = True
+            self._in_flight += 1
+            granted = True
+        if granted:
+            self._condition.notify_all()
+        return delay
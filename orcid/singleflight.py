@@ -0,0 +1,76 @@
+"""Coalescing of concurrent identical reads."""
+
+from concurrent.futures import Future
+import threading
+
+
+class SingleFlight(object):
+    """Share one in-flight request between concurrent identical calls.
+
+    The first caller of a key runs the request. The callers arriving while
+    it is in flight wait for it and receive its result, or its exception,
+    instead of sending a request of their own.
+
+    The counter ``calls`` counts all the calls and ``shared`` the calls
+    answered by another caller's request, that is the requests saved.
+    """
+
+    def __init__(self):
+        """Initialize the group of in-flight calls."""
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, function, timeout=None):
+        """Call `function`, unless a call with the same key is in flight.
+
+        Parameters
+        ----------
+        :param key: hashable
+            Identifies identical calls.
+        :param function: callable
+            Runs the request and returns its result.
+        :param timeout: float
+            The maximum time in seconds to wait for another caller's
+            request. If None, wait until it completes.
+
+        Returns
+        -------
+        :returns: object
+            The result of `function`, whichever caller ran it.
+
+        Raises
+        ------
+        :raises: concurrent.futures.TimeoutError
+            If the other caller's request did not complete within
+            `timeout`.
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+            else:
+                self.shared += 1
+        if leader:
+            return self._run(key, future, function)
+        return future.result(timeout)
+
+    def _run(self, key, future, function):
+        try:
+            result = function()
+        except BaseException as error:
+            self._land(key)
+            future.set_exception(error)
+            raise
+        self._land(key)
+        future.set_result(result)
+        return result
+
+    def _land(self, key):
+        # Later calls start a new request rather than reuse a result that
+        # may already be stale.
+        with self._lock:
+            del self._flights[key]
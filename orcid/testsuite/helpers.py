@@ -50,3 +50,70 @@ exemplary_work_xml = XML("""
     </common:external-ids>
 </work:work>
 """)
+
+
+class StubServer(object):
+    """Local HTTP server answering with canned responses.
+
+    ``routes`` maps a path to a ``(status, headers, body)`` tuple, or to a
+    callable taking the request handler and returning such a tuple, or None
+    if it wrote the response itself. The requests received are recorded in
+    ``requests`` as ``(method, path, headers, body)`` tuples.
+    """
+
+    def __init__(self, routes=None):
+        """Start the server in a background thread."""
+        import threading
+        try:
+            from http.server import BaseHTTPRequestHandler, HTTPServer
+            from socketserver import ThreadingMixIn
+        except ImportError:
+            from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+            from SocketServer import ThreadingMixIn
+
+        stub = self
+        self.routes = dict(routes or {})
+        self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # The headers and the body are written separately.
+            disable_nagle_algorithm = True
+
+            def _respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                path = self.path.split('?')[0]
+                stub.requests.append((self.command, self.path,
+                                      dict(self.headers), body))
+                route = stub.routes.get(path, (404, {}, b''))
+                if callable(route):
+                    route = route(self)
+                    if route is None:
+                        return
+                status, headers, content = route
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d' % self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
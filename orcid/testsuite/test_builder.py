@@ -0,0 +1,57 @@
+"""Tests for the construction of requests."""
+
+import simplejson as json
+
+from orcid import MemberAPI, PublicAPI
+
+from .helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+def test_urls_and_headers():
+    """Test that URLs and headers are built once per endpoint and token."""
+    api = MemberAPI('key', 'secret', sandbox=True)
+    builder = api._get_builder()
+    assert builder.record_url(ORCID_ID, 'work', 12) == \
+        'https://api.sandbox.orcid.org/v2.0/%s/work/12' % ORCID_ID
+    assert builder.record_url(ORCID_ID, 'works', ['1', '2'], True) == \
+        'https://api.sandbox.orcid.org/v2.0/%s/works/1,2' % ORCID_ID
+    headers = builder.headers('application/orcid+json', 'token')
+    assert headers == {'Accept': 'application/orcid+json',
+                       'Authorization': 'Bearer token'}
+    assert builder.headers('application/orcid+json', 'token') is headers
+    assert api._get_builder() is builder
+
+    api._endpoint = 'http://localhost'
+    assert api._get_builder().record_url(ORCID_ID, 'record') == \
+        'http://localhost/v2.0/%s/record' % ORCID_ID
+
+
+def test_header_cache_is_bounded():
+    """Test that the header cache is emptied when it is full."""
+    builder = PublicAPI('key', 'secret')._get_builder()
+    builder._max_headers = 2
+    first = builder.headers('application/orcid+json', 'first')
+    builder.headers('application/orcid+json', 'second')
+    assert builder.headers('application/orcid+json', 'first') is first
+    third = builder.headers('application/orcid+json', 'third')
+    assert list(builder._headers) == [('third', 'application/orcid+json',
+                                       None)]
+    assert builder.headers('application/orcid+json', 'third') is third
+
+
+def test_search_query_is_encoded():
+    """Test that search queries are URL-encoded."""
+    server = StubServer({'/v2.0/search/': (
+        200, {}, json.dumps({'result': [], 'num-found': 0}).encode())})
+    api = PublicAPI('key', 'secret')
+    api._endpoint = server.url
+    try:
+        api.search(u'text:"A&B" +C M\xf6\xdfbauer', start=10, rows=5,
+                   access_token='token')
+    finally:
+        server.close()
+    assert server.requests[0][1] == (
+        '/v2.0/search/?defType=lucene&q=text%3A%22A%26B%22+%2BC+'
+        'M%C3%B6%C3%9Fbauer&start=10&rows=5')
@@ -0,0 +1,77 @@
+"""Tests for the shared record cache."""
+
+import os
+import time
+
+import pytest
+
+from orcid import MemberAPI, PublicAPI
+
+from .helpers import StubServer
+
+lmdb = pytest.importorskip('lmdb')
+from orcid.cache import LMDBCache  # noqa: E402
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+@pytest.fixture
+def server():
+    """Get a stub ORCID server."""
+    server = StubServer({
+        '/v2.0/%s/record' % ORCID_ID: (200, {}, b'{"path": "x"}'),
+        '/v2.0/%s/works' % ORCID_ID: (200, {}, b'[1]'),
+        '/v2.0/%s/work' % ORCID_ID: (
+            201, {'Location': '/v2.0/%s/work/7' % ORCID_ID}, b''),
+    })
+    yield server
+    server.close()
+
+
+@pytest.fixture(params=[False, True])
+def cache(request, tmpdir):
+    """Get an empty cache, with and without compression."""
+    cache = LMDBCache(str(tmpdir), map_size=2 ** 20,
+                      ttl={'record': 60, 'works': 0},
+                      compress=request.param)
+    yield cache
+    cache.close()
+
+
+def test_reads_are_cached(server, cache):
+    """Test that cached records are read without requests."""
+    api = PublicAPI('key', 'secret', cache=cache)
+    api._endpoint = server.url
+    for _ in range(3):
+        assert api.read_record_public(ORCID_ID, 'record', 'token') == \
+            {'path': 'x'}
+        assert api.read_record_public(ORCID_ID, 'works', 'token') == [1]
+    assert len(server.requests) == 4
+    assert cache.hits == 2
+
+
+def test_writes_invalidate(server, cache):
+    """Test that writing to a record drops its cached reads."""
+    api = MemberAPI('key', 'secret', cache=cache)
+    api._endpoint = server.url
+    api.read_record_member(ORCID_ID, 'record', 'token')
+    api.read_record_member(ORCID_ID, 'record', 'other-token')
+    api.read_record_member(ORCID_ID, 'record', 'token')
+    assert len(server.requests) == 2
+    assert api.add_record(ORCID_ID, 'token', 'work', {}) == '7'
+    api.read_record_member(ORCID_ID, 'record', 'token')
+    assert len(server.requests) == 4
+
+
+def test_expiry_and_eviction(cache):
+    """Test that old entries expire and a full cache evicts entries."""
+    cache._ttl['short'] = 0.01
+    cache.set(b'a', 'short', b'payload')
+    time.sleep(0.02)
+    assert cache.get(b'a') is None
+
+    payload = os.urandom(50000)
+    for index in range(100):
+        cache.set(b'key-%d' % index, 'record', payload)
+    assert cache.get(b'key-99') == payload
+    assert cache.get(b'key-0') is None
@@ -0,0 +1,177 @@
+"""Tests for the circuit breaker."""
+
+import time
+
+import pytest
+import requests
+
+from orcid import PublicAPI
+from orcid.circuit import CircuitBreaker
+from orcid.exceptions import CircuitOpen, DeadlineExceeded
+
+from .helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+def _read(api):
+    try:
+        api.read_record_public(ORCID_ID, 'record', 'token')
+    except requests.exceptions.HTTPError:
+        pass
+
+
+def test_circuit_opens_and_recovers():
+    """Test that failures open the circuit until trial requests succeed."""
+    statuses = {'status': 503}
+    server = StubServer({'/v2.0/%s/record' % ORCID_ID: lambda handler: (
+        statuses['status'], {}, b'{}')})
+    changes = []
+    breaker = CircuitBreaker(window=4, min_calls=4, open_duration=0.2,
+                             half_open_calls=2,
+                             on_state_change=lambda *change:
+                             changes.append(change))
+    api = PublicAPI('key', 'secret', circuit_breaker=breaker)
+    api._endpoint = server.url
+    try:
+        for _ in range(4):
+            _read(api)
+        assert breaker.state(server.url) == 'open'
+        with pytest.raises(CircuitOpen) as error:
+            api.read_record_public(ORCID_ID, 'record', 'token')
+        assert error.value.endpoint == server.url
+        assert len(server.requests) == 4
+
+        time.sleep(0.25)
+        assert breaker.state(server.url) == 'half-open'
+        statuses['status'] = 200
+        for _ in range(2):
+            api.read_record_public(ORCID_ID, 'record', 'token')
+        assert breaker.state(server.url) == 'closed'
+    finally:
+        server.close()
+    assert changes == [(server.url, 'closed', 'open'),
+                       (server.url, 'open', 'half-open'),
+                       (server.url, 'half-open', 'closed')]
+    metrics = breaker.metrics()[server.url]
+    assert metrics == {'state': 'closed', 'calls': 6, 'failures': 4,
+                       'slow_calls': 0, 'rejected': 1}
+
+
+def test_failed_trial_reopens_the_circuit():
+    """Test that a failing trial request opens the circuit again."""
+    server = StubServer({'/v2.0/%s/record' % ORCID_ID: (503, {}, b'')})
+    breaker = CircuitBreaker(window=2, min_calls=2, open_duration=0.1)
+    api = PublicAPI('key', 'secret', circuit_breaker=breaker)
+    api._endpoint = server.url
+    try:
+        _read(api)
+        _read(api)
+        time.sleep(0.15)
+        _read(api)
+        assert breaker.state(server.url) == 'open'
+    finally:
+        server.close()
+    assert len(server.requests) == 3
+
+
+def test_client_errors_and_slow_calls():
+    """Test that client errors do not count and slow calls do."""
+    server = StubServer({'/v2.0/%s/record' % ORCID_ID: (404, {}, b'')})
+    breaker = CircuitBreaker(window=3, min_calls=3)
+    api = PublicAPI('key', 'secret', circuit_breaker=breaker)
+    api._endpoint = server.url
+    slow_breaker = CircuitBreaker(window=3, min_calls=3,
+                                  slow_call_duration=0)
+    slow_api = PublicAPI('key', 'secret', circuit_breaker=slow_breaker)
+    slow_api._endpoint = server.url
+    try:
+        for _ in range(3):
+            _read(api)
+            _read(slow_api)
+    finally:
+        server.close()
+    assert breaker.state(server.url) == 'closed'
+    assert slow_breaker.state(server.url) == 'open'
+    assert slow_breaker.metrics()[server.url]['slow_calls'] == 3
+
+
+def test_connection_errors_count():
+    """Test that unreachable endpoints open the circuit."""
+    server = StubServer()
+    url = server.url
+    server.close()
+    breaker = CircuitBreaker(window=2, min_calls=2)
+    api = PublicAPI('key', 'secret', circuit_breaker=breaker)
+    api._endpoint = url
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            api.read_record_public(ORCID_ID, 'record', 'token')
+    with pytest.raises(CircuitOpen):
+        api.read_record_public(ORCID_ID, 'record', 'token')
+
+
+def test_truncated_bodies_count():
+    """Test that responses cut short open the circuit."""
+    def truncated(handler):
+        handler.send_response(200)
+        handler.send_header('Content-Length', '100')
+        handler.end_headers()
+        handler.wfile.write(b'{"path"')
+        handler.close_connection = True
+
+    server = StubServer({'/v2.0/%s/record' % ORCID_ID: truncated})
+    breaker = CircuitBreaker(window=2, min_calls=2)
+    api = PublicAPI('key', 'secret', circuit_breaker=breaker)
+    api._endpoint = server.url
+    try:
+        for _ in range(2):
+            with pytest.raises(requests.exceptions.ChunkedEncodingError):
+                api.read_record_public(ORCID_ID, 'record', 'token')
+        with pytest.raises(CircuitOpen):
+            api.read_record_public(ORCID_ID, 'record', 'token')
+    finally:
+        server.close()
+
+
+def test_deadlines_running_out_count_as_slow():
+    """Test that requests waiting until the deadline runs out are slow."""
+    def hung(handler):
+        time.sleep(0.6)
+        return 200, {}, b'{}'
+
+    server = StubServer({'/v2.0/%s/record' % ORCID_ID: hung})
+    breaker = CircuitBreaker(window=4, min_calls=4)
+    api = PublicAPI('key', 'secret', circuit_breaker=breaker, deadline=0.2)
+    api._endpoint = server.url
+    try:
+        for _ in range(4):
+            with pytest.raises(DeadlineExceeded):
+                api.read_record_public(ORCID_ID, 'record', 'token')
+        with pytest.raises(CircuitOpen):
+            api.read_record_public(ORCID_ID, 'record', 'token')
+    finally:
+        server.close()
+    metrics = breaker.metrics()[server.url]
+    assert metrics['state'] == 'open'
+    assert metrics['calls'] == 4
+    assert metrics['slow_calls'] == 4
+    assert metrics['failures'] == 0
+
+
+def test_spent_deadlines_do_not_count():
+    """Test that deadlines spent before sending a request do not count."""
+    server = StubServer({'/v2.0/%s/record' % ORCID_ID: (200, {}, b'{}')})
+    breaker = CircuitBreaker(window=2, min_calls=2)
+    api = PublicAPI('key', 'secret', circuit_breaker=breaker, timeout=5)
+    api._endpoint = server.url
+    try:
+        for _ in range(3):
+            with pytest.raises(DeadlineExceeded), api.deadline(0.01):
+                time.sleep(0.02)
+                api.read_record_public(ORCID_ID, 'record', 'token')
+        assert breaker.state(server.url) == 'closed'
+        assert breaker.metrics() == {}
+    finally:
+        server.close()
+    assert server.requests == []
@@ -0,0 +1,102 @@
+"""Tests for the command-line harvester."""
+
+import simplejson as json
+
+from orcid.cli import main
+
+from .helpers import StubServer
+
+IDS = ['0000-0002-1825-0097', '0000-0001-5109-3700', '0000-0002-1694-233X']
+
+
+def _json(data):
+    return 200, {'Content-Type': 'application/orcid+json'}, \
+        json.dumps(data).encode()
+
+
+def _server():
+    pages = [{'expanded-result': [{'orcid-id': orcid_id}
+                                  for orcid_id in IDS]},
+             {'expanded-result': []}]
+    routes = {'/v3.0/expanded-search/': lambda handler: _json(pages.pop(0)),
+              '/v2.0/%s/record' % IDS[1]: (500, {}, b'')}
+    for orcid_id in IDS:
+        routes.setdefault('/v2.0/%s/record' % orcid_id,
+                          _json({'path': orcid_id}))
+        routes['/v2.0/%s/works' % orcid_id] = _json(
+            {'group': [{'work-summary': [{'put-code': 1}]},
+                       {'work-summary': [{'put-code': 2}]}]})
+        routes['/v2.0/%s/works/1,2' % orcid_id] = _json(
+            {'bulk': [{'work': {'put-code': 1}}, {'work': {'put-code': 2}},
+                      {'error': {}}]})
+    return StubServer(routes)
+
+
+def _rows(path):
+    with open(path) as output:
+        return [json.loads(line) for line in output]
+
+
+def test_search_fetch_and_resume(tmpdir):
+    """Test that searched iDs are fetched and failures retried on resume."""
+    server = _server()
+    options = ['--endpoint', server.url, '--token', 'token', '-q']
+    ids = str(tmpdir.join('ids.jsonl'))
+    records = str(tmpdir.join('records.jsonl'))
+    try:
+        assert main(options + ['-o', ids, 'search', 'text:x']) == 0
+        assert main(options + ['-o', records, '-c', '2', 'fetch', ids]) == 1
+        assert sorted(row['orcid-id'] for row in _rows(records)) == \
+            sorted([IDS[0], IDS[2]])
+
+        server.routes['/v2.0/%s/record' % IDS[1]] = _json({'path': IDS[1]})
+        requests_sent = len(server.requests)
+        assert main(options + ['-o', records, '--resume', 'fetch',
+                               ids]) == 0
+    finally:
+        server.close()
+    assert [row['orcid-id'] for row in _rows(ids)] == IDS
+    assert len(server.requests) == requests_sent + 1
+    assert sorted(row['orcid-id'] for row in _rows(records)) == sorted(IDS)
+    assert all(row['record'] == {'path': row['orcid-id']}
+               for row in _rows(records))
+
+
+def test_works(tmpdir):
+    """Test that the works are read in bulk, one row per work."""
+    server = _server()
+    ids = tmpdir.join('ids.txt')
+    ids.write('\n'.join(IDS[:2]) + '\n')
+    works = str(tmpdir.join('works.jsonl'))
+    try:
+        assert main(['--endpoint', server.url, '--token', 'token', '-q',
+                     '--rate', '100', '-o', works, 'works', str(ids)]) == 0
+    finally:
+        server.close()
+    rows = sorted((row['orcid-id'], row['put-code']) for row in _rows(works))
+    assert rows == [(IDS[1], 1), (IDS[1], 2), (IDS[0], 1), (IDS[0], 2)]
+
+
+def test_works_resume(tmpdir):
+    """Test that resumed runs skip finished iDs and redo interrupted ones."""
+    server = _server()
+    server.routes['/v2.0/%s/works' % IDS[0]] = _json({'group': []})
+    ids = tmpdir.join('ids.txt')
+    ids.write('\n'.join(IDS[:2]) + '\n')
+    works = str(tmpdir.join('works.jsonl'))
+    options = ['--endpoint', server.url, '--token', 'token', '-q',
+               '-o', works]
+    try:
+        assert main(options + ['works', str(ids)]) == 0
+        requests_sent = len(server.requests)
+        # A row of an iD whose other rows were never written.
+        with open(works, 'a') as output:
+            output.write(json.dumps({'orcid-id': IDS[2], 'put-code': 1,
+                                     'work': {}}) + '\n')
+        ids.write('\n'.join(IDS) + '\n')
+        assert main(options + ['--resume', 'works', str(ids)]) == 0
+    finally:
+        server.close()
+    assert len(server.requests) == requests_sent + 2
+    rows = sorted((row['orcid-id'], row['put-code']) for row in _rows(works))
+    assert rows == [(IDS[1], 1), (IDS[1], 2), (IDS[2], 1), (IDS[2], 2)]
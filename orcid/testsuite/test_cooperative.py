@@ -0,0 +1,144 @@
+"""Tests for the parsing of responses under gevent."""
+
+from multiprocessing.pool import ThreadPool
+import os
+import subprocess
+import sys
+
+from lxml import etree
+import pytest
+import simplejson as json
+
+from orcid.cooperative import CooperativeParser
+from orcid.xmlutils import parse_xml
+
+from .helpers import exemplary_work, exemplary_work_xml
+
+# Run in a new interpreter, since gevent has to patch the standard library
+# before anything else is imported.
+GEVENT_SCRIPT = """
+from gevent import monkey
+monkey.patch_all()
+
+import gc
+import time
+
+import gevent
+import simplejson as json
+
+from orcid import PublicAPI
+from orcid.cooperative import CooperativeParser
+from orcid.exceptions import DeadlineExceeded
+from orcid.scheduler import RequestScheduler
+from orcid.testsuite.helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+WORKS = {'group': [{'work-summary': [{'put-code': index,
+                                      'title': {'value': 'Work %d' % index}}
+                                     for index in range(10)]}
+                   for index in range(20000)]}
+
+
+def worst_stall(function, *args):
+    stalls = [0]
+    done = []
+
+    def ticker():
+        last = time.time()
+        while not done:
+            gevent.sleep(0.001)
+            now = time.time()
+            stalls[0] = max(stalls[0], now - last)
+            last = now
+
+    greenlet = gevent.spawn(ticker)
+    gevent.sleep(0.01)
+    result = function(*args)
+    done.append(True)
+    greenlet.join()
+    return stalls[0], result
+
+
+server = StubServer({'/v2.0/%s/works' % ORCID_ID: (
+    200, {}, json.dumps(WORKS).encode())})
+scheduler = RequestScheduler()
+api = PublicAPI('key', 'secret', scheduler=scheduler,
+                parser=CooperativeParser())
+api._endpoint = server.url
+
+
+def read(priority, deadline):
+    with api.priority(priority), api.deadline(deadline):
+        try:
+            return api.read_record_public(ORCID_ID, 'works', 'token')
+        except DeadlineExceeded:
+            return None
+
+
+greenlets = [gevent.spawn(read, priority, deadline) for priority, deadline
+             in [('batch', 30), ('interactive', 30), ('batch', 30),
+                 ('interactive', 0.000001)]]
+gevent.joinall(greenlets, raise_error=True)
+results = [greenlet.value for greenlet in greenlets]
+assert results[:3] == [WORKS] * 3, 'wrong results'
+assert results[3] is None, 'deadline not applied'
+metrics = scheduler.metrics()
+assert metrics['batch']['dispatched'] == 2, metrics
+assert metrics['interactive']['dispatched'] == 2, metrics
+
+server.close()
+
+# Garbage collection pauses both parsers alike.
+content = json.dumps(WORKS)
+gc.disable()
+inline, _ = worst_stall(json.loads, content)
+cooperative, result = worst_stall(CooperativeParser().loads, content)
+gc.enable()
+assert result == WORKS
+print('%.3f %.3f' % (inline, cooperative))
+"""
+
+
+def test_sliced_json():
+    """Test that JSON decoded in slices matches the C decoder."""
+    pauses = []
+    parser = CooperativeParser(threshold=0, time_slice=0,
+                               pause=lambda: pauses.append(1))
+    documents = [{'bulk': [{'work': exemplary_work}] * 3, 'empty': {},
+                  'list': [], 'text': u'\xe9'}, [1, [2, [3, [4]]]], 'text', 7]
+    for document in documents:
+        for separators in [(',', ':'), (', ', ': ')]:
+            data = json.dumps(document, separators=separators)
+            assert parser.loads(' %s\n' % data) == document
+            assert parser.loads(data.encode('utf-8')) == document
+    assert pauses
+    for data in ['{"a": [1, 2', '{"a" 1}', '[1] x', '{"a": [1,]}', '']:
+        with pytest.raises(json.JSONDecodeError):
+            parser.loads(data)
+
+
+def test_thread_pool_parsing():
+    """Test that XML and HTML are parsed in the thread pool."""
+    pool = ThreadPool(1)
+    parser = CooperativeParser(threadpool=pool, threshold=0)
+    xml = etree.tostring(exemplary_work_xml)
+    assert etree.tostring(parser.parse_xml(xml)) == xml
+    parser = CooperativeParser(threadpool=pool, threshold=0,
+                               xml_parser=parse_xml)
+    assert etree.tostring(parser.parse_xml(xml)) == \
+        etree.tostring(parse_xml(xml))
+    soup = parser.parse_html(b'<meta name="_csrf" content="token">')
+    assert soup.find(attrs={'name': '_csrf'}).attrs['content'] == 'token'
+    pool.close()
+
+
+def test_shared_api_under_gevent():
+    """Test that greenlets share an API safely and are not blocked."""
+    pytest.importorskip('gevent')
+    root = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=root)
+    output = subprocess.check_output([sys.executable, '-c', GEVENT_SCRIPT],
+                                     env=env)
+    inline, cooperative = map(float, output.split())
+    assert cooperative < inline / 2
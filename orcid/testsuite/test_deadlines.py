@@ -0,0 +1,65 @@
+"""Tests for deadlines and response size limits."""
+
+import time
+
+import pytest
+
+from orcid import PublicAPI
+from orcid.exceptions import DeadlineExceeded, ResponseTooLarge
+
+from .helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+def slow(delay, body=b'{}'):
+    """Return a route answering after `delay` seconds."""
+    def route(handler):
+        time.sleep(delay)
+        return 200, {'Content-Type': 'application/json'}, body
+    return route
+
+
+@pytest.fixture
+def server():
+    """Get a stub ORCID server."""
+    server = StubServer({
+        '/v2.0/%s/record' % ORCID_ID: slow(0),
+        '/v2.0/%s/works' % ORCID_ID: slow(0, b'[' + b'1, ' * 1000 + b'1]'),
+        '/v2.0/%s/activities' % ORCID_ID: slow(0.5),
+    })
+    yield server
+    server.close()
+
+
+def make_api(server, **kwargs):
+    """Get a PublicAPI talking to the stub server."""
+    api = PublicAPI('key', 'secret', **kwargs)
+    api._endpoint = server.url
+    return api
+
+
+def test_per_call_deadline(server):
+    """Test that a slow call fails once its deadline passes."""
+    api = make_api(server, deadline=0.2)
+    assert api.read_record_public(ORCID_ID, 'record', 'token') == {}
+    with pytest.raises(DeadlineExceeded):
+        api.read_record_public(ORCID_ID, 'activities', 'token')
+
+
+def test_operation_deadline(server):
+    """Test that a deadline spans every request made in a block."""
+    api = make_api(server, timeout=10)
+    with pytest.raises(DeadlineExceeded):
+        with api.deadline(0.1):
+            time.sleep(0.1)
+            api.read_record_public(ORCID_ID, 'record', 'token')
+    assert api.read_record_public(ORCID_ID, 'record', 'token') == {}
+
+
+def test_max_response_bytes(server):
+    """Test that oversized responses are rejected."""
+    api = make_api(server, max_response_bytes=1000)
+    assert api.read_record_public(ORCID_ID, 'record', 'token') == {}
+    with pytest.raises(ResponseTooLarge):
+        api.read_record_public(ORCID_ID, 'works', 'token')
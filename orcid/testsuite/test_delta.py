@@ -0,0 +1,120 @@
+"""Tests for the skipping of unchanged record updates."""
+
+import copy
+
+from lxml import etree
+import pytest
+import requests
+import simplejson as json
+
+from orcid import MemberAPI
+from orcid.delta import DeltaTracker, digest
+
+from .helpers import StubServer, exemplary_work, exemplary_work_xml
+
+ORCID_ID = '0000-0002-1825-0097'
+WORK_PATH = '/v2.0/%s/work/123' % ORCID_ID
+
+
+def _server(stored=None):
+    routes = {
+        '/v2.0/%s/work' % ORCID_ID: (201, {
+            'Location': 'http://localhost/v2.0/%s/work/123' % ORCID_ID},
+            b''),
+        WORK_PATH: lambda handler: (
+            (200, {}, json.dumps(stored).encode())
+            if handler.command == 'GET' and stored is not None
+            else (404, {}, b'') if handler.command == 'GET'
+            else (200, {}, b''))}
+    return StubServer(routes)
+
+
+def test_digest_normalization():
+    """Test that the fields set by ORCID do not change the hash."""
+    work = copy.deepcopy(exemplary_work)
+    read = copy.deepcopy(exemplary_work)
+    read.update({'put-code': 123, 'path': '/%s/work/123' % ORCID_ID,
+                 'created-date': {'value': 1500000000000},
+                 'source': {'source-orcid': None}, 'visibility': 'PUBLIC',
+                 'url': None, 'contributors': {'contributor': []}})
+    assert digest(work) == digest(read)
+    read['title']['title']['value'] = 'Other title'
+    assert digest(work) != digest(read)
+
+    xml = etree.tostring(exemplary_work_xml).replace(b'common:', b'c:') \
+        .replace(b'xmlns:common', b'xmlns:c')
+    reformatted = etree.fromstring(xml, etree.XMLParser(
+        remove_blank_text=True))
+    reformatted.set('put-code', '123')
+    assert digest(exemplary_work_xml, 'application/orcid+xml') == \
+        digest(reformatted, 'application/orcid+xml')
+
+
+def test_nested_fields_named_like_server_fields():
+    """Test that nested fields named like the server's ones are hashed."""
+    work = copy.deepcopy(exemplary_work)
+    work['contributors'] = {'contributor': [{'contributor-orcid': {
+        'path': '0000-0002-1825-0097', 'host': 'orcid.org'}}]}
+    changed = copy.deepcopy(work)
+    changed['contributors']['contributor'][0]['contributor-orcid'][
+        'path'] = '0000-0001-5109-3700'
+    assert digest(work) != digest(changed)
+
+
+def test_unchanged_updates_are_skipped():
+    """Test that only the updates changing the record are sent."""
+    server = _server()
+    tracker = DeltaTracker()
+    api = MemberAPI('key', 'secret', delta_tracker=tracker)
+    api._endpoint = server.url
+    work = copy.deepcopy(exemplary_work)
+    try:
+        put_code = api.add_record(ORCID_ID, 'token', 'work', work)
+        api.update_record(ORCID_ID, 'token', 'work', work, put_code)
+        work['journal-title']['value'] = 'journal # 3'
+        api.update_record(ORCID_ID, 'token', 'work', work, put_code)
+        api.update_record(ORCID_ID, 'token', 'work', work, put_code)
+        api.remove_record(ORCID_ID, 'token', 'work', put_code)
+        api.update_record(ORCID_ID, 'token', 'work', work, put_code)
+    finally:
+        server.close()
+    assert [request[0] for request in server.requests] == \
+        ['POST', 'PUT', 'DELETE', 'PUT']
+    assert (tracker.sent, tracker.suppressed, tracker.fetched) == (2, 2, 0)
+
+
+def test_fetch_missing():
+    """Test that the server copy is compared when no hash is known."""
+    stored = copy.deepcopy(exemplary_work)
+    stored.update({'put-code': 123, 'visibility': 'PUBLIC',
+                   'last-modified-date': {'value': 1500000000000}})
+    server = _server(stored)
+    tracker = DeltaTracker(fetch_missing=True)
+    api = MemberAPI('key', 'secret', delta_tracker=tracker)
+    api._endpoint = server.url
+    try:
+        api.update_record(ORCID_ID, 'token', 'work',
+                          copy.deepcopy(exemplary_work), '123')
+        api.update_record(ORCID_ID, 'token', 'work',
+                          copy.deepcopy(exemplary_work), '123')
+    finally:
+        server.close()
+    assert [request[0] for request in server.requests] == ['GET']
+    assert (tracker.sent, tracker.suppressed, tracker.fetched) == (0, 2, 1)
+
+
+def test_failed_updates_are_not_sent():
+    """Test that rejected updates are neither counted nor remembered."""
+    server = StubServer({WORK_PATH: (409, {}, b'')})
+    tracker = DeltaTracker()
+    api = MemberAPI('key', 'secret', delta_tracker=tracker)
+    api._endpoint = server.url
+    try:
+        for _ in range(2):
+            with pytest.raises(requests.HTTPError):
+                api.update_record(ORCID_ID, 'token', 'work',
+                                  copy.deepcopy(exemplary_work), '123')
+    finally:
+        server.close()
+    assert len(server.requests) == 2
+    assert (tracker.sent, tracker.suppressed) == (0, 0)
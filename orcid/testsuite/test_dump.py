@@ -0,0 +1,119 @@
+"""Tests for the reading of public data files."""
+
+import io
+import tarfile
+
+import pytest
+from lxml import etree
+
+from orcid.dump import changed_ids, read_dump
+from orcid.xmlutils import parse_xml
+
+from .helpers import exemplary_work_xml
+
+IDS = ['0000-0002-1825-0097', '0000-0001-5109-3700', '0000-0002-1694-233X']
+
+RECORD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<record:record xmlns:record="http://www.orcid.org/ns/record"
+        xmlns:common="http://www.orcid.org/ns/common"
+        path="/%s">
+    <common:orcid-identifier>
+        <common:path>%s</common:path>
+    </common:orcid-identifier>
+</record:record>
+"""
+
+
+def _work(put_code):
+    work = etree.fromstring(etree.tostring(exemplary_work_xml))
+    work.set('put-code', str(put_code))
+    return etree.tostring(work)
+
+
+def _archive(path, files):
+    with tarfile.open(path, 'w:gz') as archive:
+        for name, content in files:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+
+
+@pytest.fixture
+def dump(tmpdir):
+    """Return the path of an archive with summaries and works."""
+    path = str(tmpdir.join('dump.tar.gz'))
+    files = [('summaries/README', b'Not a record')]
+    for orcid_id in IDS:
+        files.append(('summaries/%s/%s.xml' % (orcid_id[-3:], orcid_id),
+                      RECORD % (orcid_id.encode(), orcid_id.encode())))
+    files.append(('activities/097/%s/works/%s_works_7.xml'
+                  % (IDS[0], IDS[0]), _work(7)))
+    _archive(path, files)
+    return path
+
+
+def test_read_dump(dump):
+    """Test that the records are parsed like API responses."""
+    items = list(read_dump(dump))
+    assert [(item.orcid_id, item.request_type, item.put_code)
+            for item in items] == [(IDS[0], 'record', None),
+                                   (IDS[1], 'record', None),
+                                   (IDS[2], 'record', None),
+                                   (IDS[0], 'work', 7)]
+    expected = parse_xml(RECORD % (IDS[0].encode(), IDS[0].encode()))
+    assert etree.tostring(items[0].data) == etree.tostring(expected)
+
+
+def test_filters(dump):
+    """Test that only the selected iDs and types are returned."""
+    with open(dump, 'rb') as source:
+        items = list(read_dump(source, [IDS[0], IDS[2]]))
+    assert [item.orcid_id for item in items] == [IDS[0], IDS[2], IDS[0]]
+    items = list(read_dump(dump, request_types={'work'}))
+    assert [item.put_code for item in items] == [7]
+    assert items[0].data.findtext(
+        '{http://www.orcid.org/ns/work}journal-title') == 'journal # 2'
+    with pytest.raises(NotImplementedError):
+        list(read_dump(dump, accept_type='application/orcid+json'))
+
+
+def test_changed_ids(tmpdir):
+    """Test that the list of changed records is filtered by date."""
+    content = ('orcid,claimed,deactivated,locked,profile_deactivated,'
+               'last_modified\n'
+               '%s,true,,,,2019-05-01 10:00:00.000\n'
+               '%s,true,,,,2019-06-02 10:00:00.000\n' % tuple(IDS[:2]))
+    path = str(tmpdir.join('last_modified.csv.tar'))
+    with tarfile.open(path, 'w') as archive:
+        info = tarfile.TarInfo('last_modified.csv')
+        info.size = len(content)
+        archive.addfile(info, io.BytesIO(content.encode()))
+    assert list(changed_ids(path)) == IDS[:2]
+    assert list(changed_ids(path, since='2019-06-01T00:00:00')) == [IDS[1]]
+    plain = tmpdir.join('last_modified.csv')
+    plain.write(content)
+    assert list(changed_ids(str(plain), since='2019-05-01')) == IDS[:2]
+
+
+def test_changes_archive_closed(tmpdir, monkeypatch):
+    """Test that the archive of the list of changes is closed."""
+    content = b'orcid,last_modified\n%s,2019-05-01\n' % IDS[0].encode()
+    path = str(tmpdir.join('last_modified.csv.tar'))
+    empty = str(tmpdir.join('empty.tar'))
+    with tarfile.open(path, 'w') as archive:
+        info = tarfile.TarInfo('last_modified.csv')
+        info.size = len(content)
+        archive.addfile(info, io.BytesIO(content))
+    with tarfile.open(empty, 'w') as archive:
+        archive.add(str(tmpdir.join('empty').ensure()), 'empty')
+    archives = []
+
+    def open_archive(*args, **kwargs):
+        archives.append(tarfile.TarFile.open(*args, **kwargs))
+        return archives[-1]
+
+    monkeypatch.setattr(tarfile, 'open', open_archive)
+    assert list(changed_ids(path)) == IDS[:1]
+    with pytest.raises(ValueError):
+        list(changed_ids(empty))
+    assert archives and all(archive.closed for archive in archives)
@@ -0,0 +1,118 @@
+"""Tests for hedged requests."""
+
+import threading
+import time
+
+import pytest
+
+from orcid import PublicAPI
+from orcid.hedging import HedgingPolicy
+from orcid.scheduler import RequestScheduler
+
+from .helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+@pytest.fixture
+def server():
+    """Get a stub server where the request after `stall.set()` stalls."""
+    lock = threading.Lock()
+    stall = threading.Event()
+
+    def route(handler):
+        with lock:
+            stalled = stall.is_set()
+            stall.clear()
+        if stalled:
+            time.sleep(1)
+        return 200, {}, b'{"path": "%s"}' % ORCID_ID.encode('ascii')
+
+    server = StubServer({'/v2.0/%s/record' % ORCID_ID: route})
+    server.stall = stall
+    yield server
+    server.close()
+
+
+def test_hedge_wins_over_stalled_request(server):
+    """Test that a stalled read is answered by its hedge."""
+    policy = HedgingPolicy(percentile=90, budget=0.5, min_samples=5)
+    api = PublicAPI('key', 'secret', hedging=policy)
+    api._endpoint = server.url
+
+    for _ in range(9):
+        api.read_record_public(ORCID_ID, 'record', 'token')
+    server.stall.set()
+    start = time.time()
+    record = api.read_record_public(ORCID_ID, 'record', 'token')
+    assert record == {'path': ORCID_ID}
+    assert time.time() - start < 1
+    assert policy.requests == 10
+    assert policy.hedge_wins >= 1
+    assert policy.hedges <= 0.5 * policy.requests
+    policy.shutdown()
+
+
+def test_budget_limits_hedges():
+    """Test that no hedge is sent when the budget is used up."""
+    policy = HedgingPolicy(budget=0, min_samples=1)
+    policy.run(lambda: time.sleep(0.01))
+    policy.run(lambda: time.sleep(0.05))
+    assert policy.hedges == 0
+    policy.shutdown()
+
+
+def test_requests_are_not_queued():
+    """Test that the worker threads do not limit concurrent requests."""
+    policy = HedgingPolicy(budget=1, min_samples=1, max_workers=1)
+    policy.run(lambda: time.sleep(0.5))
+    threads = [threading.Thread(target=policy.run,
+                                args=(lambda: time.sleep(0.2),))
+               for _ in range(4)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.time() - start < 0.5
+    assert policy.hedges == 0
+    policy.shutdown()
+
+
+def test_busy_primary_threads():
+    """Test that reads beyond the primary threads are sent directly."""
+    policy = HedgingPolicy(budget=1, min_samples=1, max_primaries=1)
+    policy.run(lambda: time.sleep(0.5))
+    names = []
+
+    def send():
+        names.append(threading.current_thread().name)
+        time.sleep(0.2)
+
+    threads = [threading.Thread(target=policy.run, args=(send,),
+                                name='caller-%s' % index)
+               for index in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    policy.shutdown()
+    assert len([name for name in names if name.startswith('caller-')]) == 2
+
+
+def test_hedges_take_scheduler_slots(server):
+    """Test that hedges are given up when the scheduler has no free slot."""
+    policy = HedgingPolicy(percentile=90, budget=1, min_samples=5)
+    scheduler = RequestScheduler(max_concurrent=1)
+    api = PublicAPI('key', 'secret', hedging=policy, scheduler=scheduler)
+    api._endpoint = server.url
+    for _ in range(9):
+        api.read_record_public(ORCID_ID, 'record', 'token')
+    server.stall.set()
+    start = time.time()
+    assert api.read_record_public(ORCID_ID, 'record', 'token') == \
+        {'path': ORCID_ID}
+    assert time.time() - start >= 1
+    assert policy.hedges == 0
+    assert len(server.requests) == 10
+    policy.shutdown()
@@ -0,0 +1,177 @@
+"""Tests for the local record index."""
+
+import pytest
+import simplejson as json
+
+from orcid import PublicAPI
+from orcid.index import RecordIndex
+
+from .helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+
+record = {
+    'orcid-identifier': {'path': ORCID_ID},
+    'person': {
+        'name': {'given-names': {'value': 'Josiah'},
+                 'family-name': {'value': 'Carberry'},
+                 'credit-name': None},
+        'external-identifiers': {'external-identifier': [{
+            'external-id-type': 'Scopus Author ID',
+            'external-id-value': '7007156898',
+            'put-code': 1}]},
+    },
+    'activities-summary': {
+        'employments': {'employment-summary': [{
+            'put-code': 11,
+            'organization': {'name': 'Brown University'}}]},
+        'works': {'group': [{
+            'external-ids': {'external-id': [{
+                'external-id-type': 'doi',
+                'external-id-value': '10.1000/XYZ123'}]},
+            'work-summary': [{
+                'put-code': 21,
+                'external-ids': {'external-id': [{
+                    'external-id-type': 'doi',
+                    'external-id-value': '10.1000/xyz123'}]}}]}]},
+    },
+}
+
+
+class SearchingAPI(object):
+    """Stand-in for PublicAPI answering every search with one iD."""
+
+    def __init__(self):
+        self.queries = []
+
+    def search_generator(self, query, pagination=10, access_token=None):
+        self.queries.append(query)
+        yield {'orcid-identifier': {'path': '0000-0001-5109-3700'}}
+
+
+@pytest.fixture
+def index():
+    """Get an index containing the sample record."""
+    index = RecordIndex()
+    index.add(ORCID_ID, 'record', record)
+    return index
+
+
+def test_lookups(index):
+    """Test the local queries."""
+    assert ORCID_ID in index
+    assert index.find_by_doi('10.1000/xyz123') == [ORCID_ID]
+    assert index.find_by_external_id('Scopus Author ID',
+                                     '7007156898') == [ORCID_ID]
+    assert index.find_by_affiliation('brown university') == [ORCID_ID]
+    assert index.find_by_name('carberry') == [ORCID_ID]
+    assert index.find_by_name('josiah carberry') == [ORCID_ID]
+    assert index.find_by_name('josiah smith') == []
+    assert index.find_by_put_code(21) == (ORCID_ID, 'work')
+    assert index.find_by_put_code(11) == (ORCID_ID, 'employment')
+
+
+def test_fallback_on_miss(index):
+    """Test that misses are searched on ORCID."""
+    api = SearchingAPI()
+    assert index.find_by_doi('10.1000/xyz123', api=api) == [ORCID_ID]
+    assert api.queries == []
+    assert index.find_by_doi('10.1000/"abc"', api=api) == \
+        ['0000-0001-5109-3700']
+    assert api.queries == ['doi-self:"10.1000/\\"abc\\""']
+
+
+def test_unsearchable_id_types(index):
+    """Test that id types without a search field are not searched."""
+    api = SearchingAPI()
+    assert index.find_by_external_id('Scopus Author ID', '1', api=api) == []
+    assert api.queries == []
+
+
+def test_readding_replaces_rows(index):
+    """Test that identifiers and affiliations gone from a record go."""
+    work = {'put-code': 22, 'external-ids': {'external-id': [{
+        'external-id-type': 'doi', 'external-id-value': '10.1000/other'}]}}
+    index.add(ORCID_ID, 'work', work, '22')
+    index.add(ORCID_ID, 'employments', {'employment-summary': []})
+    assert index.find_by_affiliation('brown university') == []
+    assert index.find_by_doi('10.1000/xyz123') == [ORCID_ID]
+    assert index.find_by_put_code(11) is None
+
+    work['external-ids']['external-id'] = []
+    index.add(ORCID_ID, 'work', work, '22')
+    assert index.find_by_doi('10.1000/other') == []
+    assert index.find_by_doi('10.1000/xyz123') == [ORCID_ID]
+
+    index.add(ORCID_ID, 'record', {'orcid-identifier': {'path': ORCID_ID}})
+    assert index.find_by_doi('10.1000/xyz123') == []
+    assert index.find_by_external_id('Scopus Author ID', '7007156898') == []
+    assert index.find_by_put_code(21) is None
+    assert index.find_by_name('carberry') == [ORCID_ID]
+
+
+def test_put_codes_of_different_sections(index):
+    """Test that a put-code is only replaced within its own section."""
+    index.add(ORCID_ID, 'employment', {
+        'put-code': 12, 'organization': {'name': 'CERN'}}, put_code='12')
+    index.add(ORCID_ID, 'work', {'put-code': 12, 'external-ids': {
+        'external-id': [{'external-id-type': 'doi',
+                         'external-id-value': '10.1000/cern'}]}},
+              put_code='12')
+    assert index.find_by_affiliation('cern') == [ORCID_ID]
+    assert index.find_by_doi('10.1000/cern') == [ORCID_ID]
+    assert index.find_by_put_code(12, 'employment') == \
+        (ORCID_ID, 'employment')
+    assert index.find_by_put_code(12, 'work') == (ORCID_ID, 'work')
+
+    index.add(ORCID_ID, 'work', {'put-code': 12}, put_code='12')
+    assert index.find_by_doi('10.1000/cern') == []
+    assert index.find_by_affiliation('cern') == [ORCID_ID]
+
+
+def test_names_with_quotes(index):
+    """Test that names containing quotes can be searched."""
+    index.add('0000-0001-5109-3700', 'person', {
+        'name': {'given-names': {'value': 'Miles'},
+                 'family-name': {'value': 'O"Brien'}}})
+    assert index.find_by_name('o"brien') == ['0000-0001-5109-3700']
+
+
+def test_null_external_ids(index):
+    """Test that external ids with a null type or value are skipped."""
+    index.add(ORCID_ID, 'work', {'put-code': 23, 'external-ids': {
+        'external-id': [{'external-id-type': 'doi',
+                         'external-id-value': None},
+                        {'external-id-type': None,
+                         'external-id-value': '10.1000/null'}]}},
+              put_code='23')
+    assert index.find_by_put_code(23) == (ORCID_ID, 'work')
+    assert index.find_by_doi('10.1000/null') == []
+
+
+def test_api_feeds_index():
+    """Test that records read through the API are indexed."""
+    server = StubServer({'/v2.0/%s/record' % ORCID_ID: (
+        200, {}, json.dumps(record).encode('utf-8'))})
+    index = RecordIndex()
+    api = PublicAPI('key', 'secret', index=index)
+    api._endpoint = server.url
+    try:
+        api.read_record_public(ORCID_ID, 'record', 'token')
+    finally:
+        server.close()
+    assert index.find_by_doi('10.1000/XYZ123') == [ORCID_ID]
+
+
+def test_index_failures_do_not_fail_reads():
+    """Test that a record is returned even if it cannot be indexed."""
+    server = StubServer({'/v2.0/%s/record' % ORCID_ID: (
+        200, {}, json.dumps(record).encode('utf-8'))})
+    index = RecordIndex()
+    index.close()
+    api = PublicAPI('key', 'secret', index=index)
+    api._endpoint = server.url
+    try:
+        assert api.read_record_public(ORCID_ID, 'record', 'token') == record
+    finally:
+        server.close()
@@ -0,0 +1,98 @@
+"""Tests for the timing of the calls phase by phase."""
+
+import pytest
+import requests
+import simplejson as json
+
+from orcid import MemberAPI, PublicAPI
+from orcid.hedging import HedgingPolicy
+from orcid.profiling import Profiler
+
+from .helpers import StubServer, exemplary_work
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+@pytest.fixture
+def server():
+    """Return a server answering record reads and writes."""
+    server = StubServer({
+        '/v2.0/%s/record' % ORCID_ID: (200, {}, json.dumps(
+            {'orcid-identifier': {'path': ORCID_ID}}).encode()),
+        '/v2.0/%s/work/123' % ORCID_ID: (200, {}, b'')})
+    yield server
+    server.close()
+
+
+def test_read_phases(server):
+    """Test that a read is broken down into its phases."""
+    timings = []
+    profiler = Profiler(callback=timings.append)
+    api = PublicAPI('key', 'secret', profiler=profiler)
+    api._endpoint = server.url
+    api.read_record_public(ORCID_ID, 'record', 'token')
+    timing = api.last_timing
+    assert timings == [timing]
+    assert timing.name == 'read_record_public'
+    assert list(timing.phases) == ['validate', 'dns', 'connect', 'wait',
+                                   'download', 'deserialize']
+    assert timing.total >= sum(timing.phases.values())
+    assert timing.error is None
+
+    # The connection is reused.
+    api.read_record_public(ORCID_ID, 'record', 'token')
+    assert 'connect' not in api.last_timing.phases
+    with pytest.raises(requests.HTTPError):
+        api.read_record_public(ORCID_ID, 'person', 'token')
+    assert isinstance(api.last_timing.error, requests.HTTPError)
+    summary = profiler.summary()['read_record_public']
+    assert (summary['calls'], summary['errors']) == (3, 1)
+    assert summary['total'] >= summary['wait'] > 0
+
+
+def test_write_phases(server):
+    """Test that writes time the serialization."""
+    api = MemberAPI('key', 'secret', profiler=Profiler())
+    api._endpoint = server.url
+    api.update_record(ORCID_ID, 'token', 'work', dict(exemplary_work), '123')
+    assert api.last_timing.name == 'update_record'
+    assert list(api.last_timing.phases)[:2] == ['validate', 'serialize']
+
+
+def test_http2_transport(server):
+    """Test that the HTTP/2 transport reports the connection."""
+    pytest.importorskip('httpx')
+    from orcid.transport import HTTP2Transport
+    api = PublicAPI('key', 'secret', transport=HTTP2Transport(),
+                    profiler=Profiler())
+    api._endpoint = server.url
+    api.read_record_public(ORCID_ID, 'record', 'token')
+    assert {'connect', 'wait', 'download'} <= set(api.last_timing.phases)
+
+
+def test_hedged_read_phases(server):
+    """Test that reads sent from the hedging threads are timed."""
+    hedging = HedgingPolicy(budget=1, min_samples=1)
+    api = PublicAPI('key', 'secret', hedging=hedging, profiler=Profiler())
+    api._endpoint = server.url
+    try:
+        for _ in range(2):
+            api.read_record_public(ORCID_ID, 'record', 'token')
+            assert {'wait', 'download', 'deserialize'} <= \
+                set(api.last_timing.phases)
+    finally:
+        hedging.shutdown()
+    assert hedging.requests == 2
+
+
+def test_sampling(server):
+    """Test that calls that are not sampled are not timed."""
+    timings = []
+    api = PublicAPI('key', 'secret',
+                    profiler=Profiler(0, callback=timings.append))
+    api._endpoint = server.url
+    api.read_record_public(ORCID_ID, 'record', 'token')
+    assert api.last_timing is None
+    assert timings == []
+    with pytest.raises(ValueError):
+        Profiler(sample_rate=2)
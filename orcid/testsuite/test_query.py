@@ -0,0 +1,83 @@
+"""Tests for the search query builder and the expanded searches."""
+
+import pytest
+import simplejson as json
+
+from orcid import PublicAPI
+from orcid.query import Query, escape
+
+from .helpers import StubServer
+
+
+def test_escape():
+    """Test that the Lucene special characters are escaped."""
+    assert escape('10.1000/xyz(1):2') == r'10.1000\/xyz\(1\)\:2'
+    assert escape('plain') == 'plain'
+
+
+def test_fields_and_operators():
+    """Test that fields are validated and combined."""
+    assert str(Query.field('family_name', 'Sanchez')) == \
+        'family-name:Sanchez'
+    assert str(Query.field('doi-self', '10.1/a')) == r'doi-self:10.1\/a'
+    assert str(Query.field('affiliation-org-name', 'Univ of X')) == \
+        'affiliation-org-name:"Univ of X"'
+    with pytest.raises(ValueError):
+        Query.field('family-names', 'Sanchez')
+
+    query = Query.all(given_names='Ana', family_name='Sanchez')
+    assert str(query) == '(family-name:Sanchez) AND (given-names:Ana)'
+    with pytest.raises(ValueError):
+        Query.all()
+    query = (Query.field('orcid', '1') | Query('text:x')) & \
+        ~Query.field('email', 'a@b')
+    assert str(query) == \
+        '((orcid:1) OR (text:x)) AND (*:* NOT (email:a@b))'
+
+
+def test_expanded_search():
+    """Test that expanded results are paginated with typed queries."""
+    pages = [{'expanded-result': [{'orcid-id': '1'}, {'orcid-id': '2'}],
+              'num-found': 3},
+             {'expanded-result': [{'orcid-id': '3'}], 'num-found': 3},
+             {'expanded-result': None, 'num-found': 3}]
+
+    def respond(handler):
+        return 200, {}, json.dumps(pages.pop(0)).encode()
+
+    server = StubServer({'/v3.0/expanded-search/': respond})
+    api = PublicAPI('key', 'secret')
+    api._endpoint = server.url
+    try:
+        results = list(api.expanded_search_generator(
+            Query.field('family-name', 'Sanchez'), pagination=2,
+            access_token='token'))
+    finally:
+        server.close()
+    assert [result['orcid-id'] for result in results] == ['1', '2', '3']
+    assert server.requests[0][1] == \
+        '/v3.0/expanded-search/?q=family-name%3ASanchez&rows=2'
+    assert server.requests[1][1].endswith('&start=2&rows=2')
+    assert server.requests[0][2]['Accept'] == 'application/vnd.orcid+json'
+
+
+def test_csv_search():
+    """Test that the CSV search selects the fields on the server."""
+    body = (u'orcid,given-names,family-name\n'
+            u'0000-0002-1825-0097,Jos\xe9,Carberry\n').encode('utf-8')
+    server = StubServer({'/v3.0/csv-search/': (
+        200, {'Content-Type': 'text/csv'}, body)})
+    api = PublicAPI('key', 'secret')
+    api._endpoint = server.url
+    try:
+        results = api.csv_search('text:x', ['orcid', 'given-names',
+                                            'family-name'],
+                                 access_token='token')
+    finally:
+        server.close()
+    assert results == [{'orcid': '0000-0002-1825-0097',
+                        'given-names': u'Jos\xe9',
+                        'family-name': 'Carberry'}]
+    assert server.requests[0][1] == (
+        '/v3.0/csv-search/?fl=orcid%2Cgiven-names%2Cfamily-name&q=text%3Ax')
+    assert server.requests[0][2]['Accept'] == 'text/csv'
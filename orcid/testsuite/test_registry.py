@@ -0,0 +1,48 @@
+"""Tests for the registry of the clients of several institutions."""
+
+import pytest
+
+from orcid import MemberAPI
+from orcid.registry import ClientRegistry
+from orcid.scheduler import RequestScheduler
+from orcid.tokens import SQLiteTokenStore
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+def test_clients_share_resources():
+    """Test that clients share the transport but not the tokens."""
+    registry = ClientRegistry(
+        sandbox=True, timeout=5,
+        token_store_factory=lambda tenant: SQLiteTokenStore(':memory:'),
+        scheduler_factory=lambda tenant: RequestScheduler(rate=24))
+    registry.register('a', 'APP-A', 'secret-a')
+    registry.register('b', 'APP-B', 'secret-b')
+    first, second = registry.get('a'), registry.get('b')
+    assert isinstance(first, MemberAPI)
+    assert registry.get('a') is first
+    assert sorted(registry.tenants()) == ['a', 'b']
+    assert (first._key, second._key) == ('APP-A', 'APP-B')
+    assert first._endpoint == 'https://api.sandbox.orcid.org'
+    assert first._timeout == second._timeout == 5
+    assert first._transport is second._transport is registry.transport
+    assert first._get_builder() is second._get_builder()
+    assert first._token_store is not second._token_store
+    assert first._scheduler is not second._scheduler
+
+    first._token_store.set(ORCID_ID, {'access_token': 'a'})
+    assert second._token_store.get(ORCID_ID) is None
+
+    registry.register('a', 'APP-C', 'secret-c')
+    assert registry.get('a')._key == 'APP-C'
+    registry.unregister('b')
+    assert 'b' not in registry
+    with pytest.raises(KeyError):
+        registry.get('b')
+    registry.close()
+
+
+def test_per_tenant_options():
+    """Test that per-tenant state cannot be shared by mistake."""
+    with pytest.raises(ValueError):
+        ClientRegistry(token_store=SQLiteTokenStore(':memory:'))
@@ -0,0 +1,118 @@
+"""Tests for the scheduling of requests by priority."""
+
+import threading
+import time
+
+import pytest
+import simplejson as json
+
+from orcid import PublicAPI
+from orcid.exceptions import DeadlineExceeded
+from orcid.scheduler import RequestScheduler
+
+from .helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+def _wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError('Condition not met')
+
+
+def test_interactive_requests_jump_the_queue():
+    """Test that queued classes are served by their weights."""
+    scheduler = RequestScheduler(max_concurrent=1)
+    assert scheduler.acquire()
+    order = []
+
+    def request(priority):
+        assert scheduler.acquire(priority)
+        order.append(priority)
+        scheduler.release()
+
+    threads = []
+    for priority in ['batch'] * 5 + ['interactive'] * 5:
+        thread = threading.Thread(target=request, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        _wait_for(lambda: sum(metrics['queued'] for metrics in
+                              scheduler.metrics().values()) == len(threads))
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert order == ['interactive'] * 5 + ['batch'] * 5
+    metrics = scheduler.metrics()
+    assert metrics['batch']['dispatched'] == 5
+    assert metrics['interactive']['dispatched'] == 6
+    assert metrics['batch']['queued'] == 0
+    assert metrics['batch']['max_wait'] >= metrics['batch']['mean_wait'] > 0
+
+
+def test_batch_requests_get_their_share():
+    """Test that a busy interactive class does not starve batch requests."""
+    scheduler = RequestScheduler(max_concurrent=1,
+                                 weights={'interactive': 3, 'batch': 1})
+    assert scheduler.acquire()
+    order = []
+
+    def request(priority):
+        assert scheduler.acquire(priority)
+        order.append(priority)
+        scheduler.release()
+
+    threads = []
+    for priority in ['interactive'] * 6 + ['batch'] * 2:
+        thread = threading.Thread(target=request, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        _wait_for(lambda: sum(metrics['queued'] for metrics in
+                              scheduler.metrics().values()) == len(threads))
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert order.index('batch') < 4
+
+
+def test_rate_and_timeout():
+    """Test that the rate is limited and waiting can time out."""
+    scheduler = RequestScheduler(rate=20)
+    start = time.time()
+    for _ in range(5):
+        assert scheduler.acquire('batch')
+        scheduler.release()
+    assert time.time() - start >= 0.15
+    assert not scheduler.acquire(timeout=0)
+    assert scheduler.metrics()['interactive']['queued'] == 0
+    with pytest.raises(ValueError):
+        scheduler.acquire('urgent')
+
+
+def test_api_priority_and_deadline():
+    """Test that the API requests go through the scheduler."""
+    server = StubServer({'/v2.0/%s/record' % ORCID_ID: (
+        200, {}, json.dumps({}).encode())})
+    scheduler = RequestScheduler(max_concurrent=1)
+    api = PublicAPI('key', 'secret', scheduler=scheduler)
+    api._endpoint = server.url
+    try:
+        with api.priority('batch'):
+            api.read_record_public(ORCID_ID, 'record', 'token')
+        api.read_record_public(ORCID_ID, 'record', 'token')
+
+        assert scheduler.acquire()
+        try:
+            with pytest.raises(DeadlineExceeded):
+                with api.deadline(0.1):
+                    api.read_record_public(ORCID_ID, 'record', 'token')
+        finally:
+            scheduler.release()
+    finally:
+        server.close()
+    metrics = scheduler.metrics()
+    assert metrics['batch']['dispatched'] == 1
+    assert metrics['interactive']['dispatched'] == 2
+    assert len(server.requests) == 2
@@ -0,0 +1,91 @@
+"""Tests for the coalescing of concurrent identical reads."""
+
+import threading
+
+import pytest
+import requests
+import simplejson as json
+
+from orcid import PublicAPI
+from orcid.singleflight import SingleFlight
+
+from .helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+def _read_concurrently(api, threads=8):
+    results = []
+
+    def read():
+        try:
+            results.append(api.read_record_public(ORCID_ID, 'record',
+                                                  'token'))
+        except Exception as error:
+            results.append(error)
+
+    workers = [threading.Thread(target=read) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def _stub(status, body, release):
+    def respond(handler):
+        release.wait(5)
+        return status, {}, body
+    return StubServer({'/v2.0/%s/record' % ORCID_ID: respond})
+
+
+def test_concurrent_reads_share_a_request():
+    """Test that identical reads in flight send a single request."""
+    release = threading.Event()
+    server = _stub(200, json.dumps({'orcid-identifier': {}}).encode(),
+                   release)
+    single_flight = SingleFlight()
+    api = PublicAPI('key', 'secret', single_flight=single_flight)
+    api._endpoint = server.url
+    timer = threading.Timer(0.5, release.set)
+    timer.start()
+    try:
+        results = _read_concurrently(api)
+    finally:
+        server.close()
+    assert results == [{'orcid-identifier': {}}] * 8
+    # Every result is a separate copy.
+    assert len(set(id(result) for result in results)) == 8
+    assert len(server.requests) == 1
+    assert single_flight.calls == 8
+    assert single_flight.shared == 7
+
+    single_flight.do('key', lambda: 1)
+    assert single_flight.shared == 7
+
+
+def test_concurrent_reads_share_the_error():
+    """Test that all the callers receive the error of the request."""
+    release = threading.Event()
+    server = _stub(404, b'', release)
+    api = PublicAPI('key', 'secret', single_flight=SingleFlight())
+    api._endpoint = server.url
+    timer = threading.Timer(0.5, release.set)
+    timer.start()
+    try:
+        results = _read_concurrently(api, threads=4)
+    finally:
+        server.close()
+    assert len(server.requests) == 1
+    assert all(isinstance(result, requests.exceptions.HTTPError)
+               for result in results)
+
+
+def test_different_reads_are_not_shared():
+    """Test that the key separates different reads."""
+    single_flight = SingleFlight()
+    assert single_flight.do(('a',), lambda: 1) == 1
+    assert single_flight.do(('b',), lambda: 2) == 2
+    with pytest.raises(ZeroDivisionError):
+        single_flight.do(('a',), lambda: 1 / 0)
+    assert single_flight.shared == 0
@@ -0,0 +1,81 @@
+"""Tests for the storage of researchers' tokens."""
+
+import time
+
+import pytest
+import simplejson as json
+
+from orcid import MemberAPI
+from orcid.exceptions import TokenNotFound
+from orcid.tokens import SQLiteTokenStore
+
+from .helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+def _token(access_token, refresh_token='refresh', expires_in=631138518):
+    return {'access_token': access_token, 'token_type': 'bearer',
+            'refresh_token': refresh_token, 'expires_in': expires_in,
+            'scope': '/read-limited /activities/update', 'name': 'Josiah',
+            'orcid': ORCID_ID}
+
+
+def test_store_persists_and_caches(tmpdir):
+    """Test that tokens survive the store and the cache is bounded."""
+    path = str(tmpdir.join('tokens.db'))
+    store = SQLiteTokenStore(path, cache_size=1)
+    stored = store.set(ORCID_ID, _token('a'))
+    assert stored['expires_at'] > time.time() + 631138000
+    assert store.get(ORCID_ID) == stored
+    store.set('0000-0001-5109-3700', _token('b'))
+    assert store.get(ORCID_ID) == stored
+    assert (store.hits, store.misses) == (1, 1)
+    store.close()
+
+    store = SQLiteTokenStore(path)
+    assert store.get(ORCID_ID)['access_token'] == 'a'
+    store.delete(ORCID_ID)
+    assert store.get(ORCID_ID) is None
+    store.close()
+
+
+def test_api_resolves_and_refreshes_tokens():
+    """Test that stored tokens are used and refreshed when expiring."""
+    issued = [_token('first', expires_in=60), _token('second')]
+    server = StubServer({
+        '/oauth/token': lambda handler: (200, {}, json.dumps(
+            issued.pop(0)).encode()),
+        '/v2.0/%s/record' % ORCID_ID: (200, {}, b'{}')})
+    store = SQLiteTokenStore(':memory:')
+    api = MemberAPI('key', 'secret', token_store=store)
+    api._endpoint = server.url
+    api._token_url = server.url + '/oauth/token'
+    try:
+        token = api.get_token_from_authorization_code('code', 'uri')
+        assert store.get(ORCID_ID) == token
+        # The first token expires within the refresh margin.
+        assert api.read_record_member(ORCID_ID, 'record') == {}
+        assert store.get(ORCID_ID)['access_token'] == 'second'
+        api.read_record_member(ORCID_ID, 'record')
+    finally:
+        server.close()
+    paths = [request[1] for request in server.requests]
+    assert paths == ['/oauth/token', '/oauth/token',
+                     '/v2.0/%s/record' % ORCID_ID,
+                     '/v2.0/%s/record' % ORCID_ID]
+    assert b'grant_type=refresh_token' in server.requests[1][3]
+    assert server.requests[2][2]['Authorization'] == 'Bearer second'
+
+
+def test_missing_tokens():
+    """Test that calls without a usable token fail before any request."""
+    with pytest.raises(ValueError):
+        MemberAPI('key', 'secret').read_record_member(ORCID_ID, 'record')
+    store = SQLiteTokenStore(':memory:')
+    api = MemberAPI('key', 'secret', token_store=store)
+    with pytest.raises(TokenNotFound):
+        api.add_record(ORCID_ID, None, 'work', {'title': 'Title'})
+    store.set(ORCID_ID, _token('a', refresh_token=None, expires_in=1))
+    with pytest.raises(TokenNotFound):
+        api.remove_record(ORCID_ID, None, 'work', '12')
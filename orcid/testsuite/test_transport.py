@@ -0,0 +1,185 @@
+"""Tests for the HTTP transports."""
+
+import gzip
+import io
+import time
+
+import pytest
+import requests
+from requests.exceptions import (ChunkedEncodingError, ConnectionError,
+                                 ContentDecodingError, HTTPError, Timeout)
+
+from orcid import MemberAPI, PublicAPI
+from orcid.exceptions import DeadlineExceeded, ResponseTooLarge
+from orcid.transport import RequestsTransport
+
+from .helpers import StubServer
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+def http2_transport():
+    """Get an HTTP/2 transport, if httpx is installed."""
+    pytest.importorskip('httpx')
+    from orcid.transport import HTTP2Transport
+    return HTTP2Transport()
+
+
+@pytest.fixture(params=[RequestsTransport, http2_transport])
+def transport(request):
+    """Get every available transport."""
+    transport = request.param()
+    yield transport
+    transport.close()
+
+
+def gzipped(data):
+    """Compress data with gzip."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as compressed:
+        compressed.write(data)
+    return buffer.getvalue()
+
+
+WORKS = b'[' + b'1, ' * 500 + b'1]'
+
+
+def partial_body(stall):
+    """Get a route sending a part of the body, then stalling or closing."""
+    def route(handler):
+        handler.send_response(200)
+        handler.send_header('Content-Length', str(len(WORKS)))
+        handler.end_headers()
+        handler.wfile.write(WORKS[:100])
+        handler.wfile.flush()
+        if stall:
+            time.sleep(1)
+        handler.close_connection = True
+    return route
+
+
+@pytest.fixture
+def server():
+    """Get a stub ORCID server."""
+    server = StubServer({
+        '/v2.0/%s/record' % ORCID_ID: (200, {}, b'{"path": "x"}'),
+        '/v2.0/%s/works' % ORCID_ID: (200, {}, WORKS),
+        '/v2.0/%s/activities' % ORCID_ID: (
+            200, {'Content-Encoding': 'gzip'}, gzipped(WORKS)),
+        '/v2.0/%s/person' % ORCID_ID: (
+            200, {'Content-Encoding': 'gzip'}, b'corrupt' * 10),
+        '/v2.0/%s/educations' % ORCID_ID: partial_body(stall=False),
+        '/v2.0/%s/fundings' % ORCID_ID: partial_body(stall=True),
+    })
+    yield server
+    server.close()
+
+
+def test_read_through_transport(server, transport):
+    """Test that records are read through the given transport."""
+    api = PublicAPI('key', 'secret', transport=transport,
+                    max_response_bytes=1000)
+    api._endpoint = server.url
+    assert api.read_record_public(ORCID_ID, 'record', 'token') == \
+        {'path': 'x'}
+    with pytest.raises(ResponseTooLarge):
+        api.read_record_public(ORCID_ID, 'works', 'token')
+    with pytest.raises(HTTPError):
+        api.read_record_public(ORCID_ID, 'biography', 'token')
+    assert server.requests[0][2]['Authorization'] == 'Bearer token'
+
+
+def test_compressed_response(server, transport):
+    """Test that compressed bodies are decoded and counted."""
+    api = PublicAPI('key', 'secret', transport=transport)
+    api._endpoint = server.url
+    assert len(api.read_record_public(ORCID_ID, 'activities',
+                                      'token')) == 501
+    assert 'gzip' in server.requests[0][2]['Accept-Encoding']
+    assert transport.stats.compressed_bytes == len(gzipped(WORKS))
+    assert transport.stats.decompressed_bytes == len(WORKS)
+
+
+def test_compressed_response_limit(server, transport):
+    """Test that the size limit applies to the decoded body."""
+    api = PublicAPI('key', 'secret', transport=transport,
+                    max_response_bytes=1000)
+    api._endpoint = server.url
+    with pytest.raises(ResponseTooLarge):
+        api.read_record_public(ORCID_ID, 'activities', 'token')
+
+
+def test_login_session_closed(transport):
+    """Test that the session of a failed login is closed."""
+    closed = []
+    create = transport.session
+
+    def fail(*args, **kwargs):
+        raise ConnectionError('unreachable')
+
+    def session():
+        created = create()
+        close = created.close
+        created.request = fail
+        created.close = lambda: closed.append(close())
+        return created
+
+    transport.session = session
+    api = MemberAPI('key', 'secret', transport=transport)
+    with pytest.raises(ConnectionError):
+        api.get_token('user', 'password', 'https://example.com')
+    assert closed == [None]
+
+
+@pytest.mark.parametrize('deadline', [None, 0.2])
+def test_body_errors(server, transport, deadline):
+    """Test that failures reading the body are the ones of requests."""
+    api = PublicAPI('key', 'secret', transport=transport, timeout=0.2,
+                    deadline=deadline)
+    api._endpoint = server.url
+    with pytest.raises(ChunkedEncodingError):
+        api.read_record_public(ORCID_ID, 'educations', 'token')
+    with pytest.raises(ContentDecodingError):
+        api.read_record_public(ORCID_ID, 'person', 'token')
+    with pytest.raises(Timeout) as raised:
+        api.read_record_public(ORCID_ID, 'fundings', 'token')
+    if deadline is not None:
+        assert isinstance(raised.value, DeadlineExceeded)
+
+
+def test_session_keeps_settings(server):
+    """Test that login sessions keep the settings and share the pools."""
+    session = requests.Session()
+    session.verify = '/etc/ssl/ca.pem'
+    session.proxies = {'https': 'http://proxy:3128'}
+    session.headers['X-Client'] = 'orcid'
+    transport = RequestsTransport(session=session)
+    created = transport.session()
+    assert created._session.verify == '/etc/ssl/ca.pem'
+    assert created._session.proxies == {'https': 'http://proxy:3128'}
+    assert created._session.headers['X-Client'] == 'orcid'
+    assert created._session.adapters['https://'] is session.adapters[
+        'https://']
+    assert created._session.cookies is not session.cookies
+    created.close()
+    url = server.url + '/v2.0/%s/record' % ORCID_ID
+    assert transport.request('GET', url).status_code == 200
+
+
+@pytest.mark.parametrize('with_client', [False, True])
+def test_http2_session_keeps_settings(server, with_client):
+    """Test that HTTP/2 login sessions keep the settings of the client."""
+    httpx = pytest.importorskip('httpx')
+    from orcid.transport import HTTP2Transport
+    if with_client:
+        transport = HTTP2Transport(httpx.Client(headers={'X-Client': 'orcid'}))
+    else:
+        transport = HTTP2Transport(headers={'X-Client': 'orcid'})
+    url = server.url + '/v2.0/%s/record' % ORCID_ID
+    created = transport.session()
+    created.request('GET', url)
+    created.close()
+    transport.request('GET', url)
+    transport.close()
+    assert [request[2]['X-Client'] for request in server.requests] == \
+        ['orcid', 'orcid']
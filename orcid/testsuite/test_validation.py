@@ -0,0 +1,112 @@
+"""Tests for local payload validation."""
+
+import copy
+
+import pytest
+from lxml import etree
+
+from orcid import MemberAPI, PublicAPI
+from orcid.exceptions import InvalidIdentifier, ValidationError
+from orcid.validation import (SchemaValidator, is_valid_orcid_id,
+                              orcid_id_errors, put_code_errors)
+
+from .helpers import exemplary_work, exemplary_work_xml
+
+WORK_XSD = """<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+           targetNamespace="http://www.orcid.org/ns/work"
+           elementFormDefault="qualified">
+    <xs:element name="work">
+        <xs:complexType>
+            <xs:sequence>
+                <xs:element name="type" type="xs:string"/>
+            </xs:sequence>
+        </xs:complexType>
+    </xs:element>
+</xs:schema>
+"""
+
+
+def test_valid_json_work():
+    """Test that a complete work passes."""
+    validator = SchemaValidator()
+    assert validator.errors('work', exemplary_work) == []
+    validator.validate('work', exemplary_work)
+
+
+def test_invalid_json_work():
+    """Test that every missing field is reported."""
+    work = copy.deepcopy(exemplary_work)
+    del work['type']
+    work['title']['title']['value'] = ''
+
+    with pytest.raises(ValidationError) as excinfo:
+        SchemaValidator().validate('work', work)
+    assert excinfo.value.errors == [('title.title.value', 'missing value'),
+                                    ('type', 'missing value')]
+
+
+def test_bulk_works():
+    """Test that bulk payloads are checked per item."""
+    errors = SchemaValidator().errors('works', {'bulk': [
+        {'work': exemplary_work}, {'work': {'type': 'OTHER'}}]})
+    assert errors == [('bulk[1].work.title.title.value', 'missing value')]
+
+
+def test_xml_work(tmpdir):
+    """Test validating XML with a cached compiled schema."""
+    tmpdir.join('work-2.0.xsd').write(WORK_XSD)
+    validator = SchemaValidator(str(tmpdir))
+
+    valid = etree.XML('<work xmlns="http://www.orcid.org/ns/work">'
+                      '<type>other</type></work>')
+    assert validator.errors('work', valid,
+                            'application/orcid+xml') == []
+    errors = validator.errors('work', exemplary_work_xml,
+                              'application/orcid+xml')
+    assert len(errors) == 1
+    assert 'title' in errors[0][1]
+
+
+def test_member_api_rejects_before_sending():
+    """Test that invalid records never reach the network."""
+    api = MemberAPI('key', 'secret', sandbox=True,
+                    validator=SchemaValidator())
+    with pytest.raises(ValidationError):
+        api.add_record('0000-0002-1825-0097', 'token', 'work',
+                       {'type': 'OTHER'})
+
+
+def test_orcid_id_checksum():
+    """Test that iDs are checked for their format and check digit."""
+    assert is_valid_orcid_id('0000-0002-1694-233X')
+    assert not is_valid_orcid_id('0000-0002-1694-2330')
+    assert orcid_id_errors(['0000-0002-1825-0097', '0000-0002-1825-0098',
+                            '0000-0002-1825-009', None]) == \
+        [(1, 'wrong check digit'), (2, 'not an ORCID iD'),
+         (3, 'not an ORCID iD')]
+    assert put_code_errors([12, '12', '012', 0, 'x', True]) == \
+        [(2, 'not a put-code'), (3, 'not a put-code'),
+         (4, 'not a put-code'), (5, 'not a put-code')]
+    # Digits of other scripts are not ASCII digits.
+    assert orcid_id_errors([u'\u0660000-0002-1825-0097']) == \
+        [(0, 'not an ORCID iD')]
+    assert put_code_errors([u'1\u0662']) == [(0, 'not a put-code')]
+
+
+def test_api_rejects_identifiers_before_sending():
+    """Test that malformed identifiers never reach the network."""
+    api = PublicAPI('key', 'secret')
+    api._endpoint = 'http://127.0.0.1:9'
+    with pytest.raises(InvalidIdentifier) as error:
+        api.read_record_public('0000-0002-1825-0098', 'record', 'token')
+    assert error.value.errors == [('0000-0002-1825-0098',
+                                   'wrong check digit')]
+    with pytest.raises(InvalidIdentifier) as error:
+        api.read_record_public('0000-0002-1825-0097', 'works', 'token',
+                               ['1', 'x'])
+    assert error.value.errors == [('x', 'not a put-code')]
+    api = MemberAPI('key', 'secret')
+    api._endpoint = 'http://127.0.0.1:9'
+    with pytest.raises(InvalidIdentifier):
+        api.remove_record('0000-0002-1825-0097', 'token', 'work', 'x')
@@ -0,0 +1,132 @@
+"""Tests for the flattening of works summaries."""
+
+from lxml import etree
+
+from orcid.works import (WorkSummary, doi_index, external_id_index,
+                         flatten_works)
+
+
+def _external_id(id_type, value, relationship='SELF'):
+    return {'external-id-type': id_type, 'external-id-value': value,
+            'external-id-relationship': relationship}
+
+
+WORKS = {'group': [
+    {'work-summary': [
+        {'put-code': 11, 'display-index': '0', 'type': 'JOURNAL_ARTICLE',
+         'title': {'title': {'value': 'Imported'}},
+         'publication-date': {'year': {'value': '2001'}},
+         'source': {'source-name': {'value': 'Crossref'}},
+         'external-ids': {'external-id': [
+             _external_id('doi', 'https://doi.org/10.1/ABC'),
+             _external_id('issn', '1234-5678', 'PART_OF')]}},
+        {'put-code': 12, 'display-index': '1', 'type': 'JOURNAL_ARTICLE',
+         'title': {'title': {'value': 'Preferred'}},
+         'publication-date': {'year': {'value': '2001'}},
+         'source': {'source-name': {'value': 'Jane'}},
+         'external-ids': {'external-id': [
+             _external_id('doi', '10.1/abc')]}}]},
+    {'work-summary': [
+        {'put-code': 13, 'type': 'BOOK',
+         'title': {'title': {'value': 'Book'}},
+         'publication-date': None, 'source': None,
+         'external-ids': {'external-id': [
+             _external_id('isbn', '978-3-16')]}}]}]}
+
+WORKS_XML = etree.XML("""
+<activities:works xmlns:activities="http://www.orcid.org/ns/activities"
+        xmlns:common="http://www.orcid.org/ns/common"
+        xmlns:work="http://www.orcid.org/ns/work">
+    <activities:group>
+        <work:work-summary put-code="11" display-index="0">
+            <common:source>
+                <common:source-name>Crossref</common:source-name>
+            </common:source>
+            <work:title><common:title>Imported</common:title></work:title>
+            <common:external-ids>
+                <common:external-id>
+                    <common:external-id-type>doi</common:external-id-type>
+                    <common:external-id-value>https://doi.org/10.1/ABC</common:external-id-value>
+                    <common:external-id-relationship>self</common:external-id-relationship>
+                </common:external-id>
+                <common:external-id>
+                    <common:external-id-type>issn</common:external-id-type>
+                    <common:external-id-value>1234-5678</common:external-id-value>
+                    <common:external-id-relationship>part-of</common:external-id-relationship>
+                </common:external-id>
+            </common:external-ids>
+            <work:type>journal-article</work:type>
+            <common:publication-date>
+                <common:year>2001</common:year>
+            </common:publication-date>
+        </work:work-summary>
+        <work:work-summary put-code="12" display-index="1">
+            <common:source>
+                <common:source-name>Jane</common:source-name>
+            </common:source>
+            <work:title><common:title>Preferred</common:title></work:title>
+            <common:external-ids>
+                <common:external-id>
+                    <common:external-id-type>doi</common:external-id-type>
+                    <common:external-id-value>10.1/abc</common:external-id-value>
+                    <common:external-id-relationship>self</common:external-id-relationship>
+                </common:external-id>
+            </common:external-ids>
+            <work:type>journal-article</work:type>
+            <common:publication-date>
+                <common:year>2001</common:year>
+            </common:publication-date>
+        </work:work-summary>
+    </activities:group>
+    <activities:group>
+        <work:work-summary put-code="13">
+            <work:title><common:title>Book</common:title></work:title>
+            <common:external-ids>
+                <common:external-id>
+                    <common:external-id-type>isbn</common:external-id-type>
+                    <common:external-id-value>978-3-16</common:external-id-value>
+                    <common:external-id-relationship>self</common:external-id-relationship>
+                </common:external-id>
+            </common:external-ids>
+            <work:type>book</work:type>
+        </work:work-summary>
+    </activities:group>
+</activities:works>
+""")
+
+PREFERRED = WorkSummary(12, 'Preferred', 'journal-article', '2001', 'Jane',
+                        (('doi', '10.1/abc'),))
+BOOK = WorkSummary(13, 'Book', 'book', None, None, (('isbn', '978-3-16'),))
+
+
+def test_flatten_works():
+    """Test that both representations flatten to the same summaries."""
+    for works in (WORKS, WORKS_XML):
+        assert flatten_works(works) == [PREFERRED, BOOK]
+        assert [work.put_code for work in
+                flatten_works(works, preferred=False)] == [11, 12, 13]
+        assert [work.put_code for work in
+                flatten_works(works, preferred_source='Crossref')] == \
+            [11, 13]
+
+
+def test_nested_works():
+    """Test that works are found in activities and records."""
+    record = {'activities-summary': {'works': WORKS}}
+    assert flatten_works(record) == [PREFERRED, BOOK]
+    assert flatten_works({'activities-summary': None}) == []
+    wrapper = etree.Element('record')
+    wrapper.append(etree.fromstring(etree.tostring(WORKS_XML)))
+    assert flatten_works(wrapper) == [PREFERRED, BOOK]
+    assert flatten_works(etree.Element('record')) == []
+
+
+def test_indexes():
+    """Test that DOIs are normalized and related ids are ignored."""
+    for works in (WORKS, WORKS_XML):
+        assert doi_index(works) == {'10.1/abc': PREFERRED}
+        assert doi_index(works, preferred_source='Crossref')[
+            '10.1/abc'].put_code == 11
+        assert external_id_index(works) == {
+            ('doi', '10.1/abc'): [PREFERRED],
+            ('isbn', '978-3-16'): [BOOK]}
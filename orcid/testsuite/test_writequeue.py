@@ -0,0 +1,104 @@
+"""Tests for the write-coalescing queue."""
+
+import pytest
+
+from orcid.writequeue import WriteQueue
+
+ORCID_ID = '0000-0002-1825-0097'
+
+
+class RecordingAPI(object):
+    """Stand-in for MemberAPI recording the writes it receives."""
+
+    def __init__(self):
+        self.calls = []
+
+    def add_record(self, orcid_id, token, request_type, data,
+                   content_type='application/orcid+json'):
+        if data.get('fail'):
+            raise ValueError('Rejected.')
+        self.calls.append(('add', request_type, data))
+        return '%d' % len(self.calls)
+
+    def update_record(self, orcid_id, token, request_type, data, put_code,
+                      content_type='application/orcid+json'):
+        self.calls.append(('update', put_code, data))
+
+    def remove_record(self, orcid_id, token, request_type, put_code):
+        self.calls.append(('remove', put_code))
+
+
+@pytest.fixture
+def api():
+    """Get a recording API."""
+    return RecordingAPI()
+
+
+def test_updates_are_coalesced(api):
+    """Test that only the last update of a record is sent."""
+    queue = WriteQueue(api, max_delay=60)
+    first = queue.update_record(ORCID_ID, 'token', 'work', {'v': 1}, '12')
+    second = queue.update_record(ORCID_ID, 'token', 'work', {'v': 2}, '12')
+    other = queue.update_record(ORCID_ID, 'token', 'work', {'v': 3}, '13')
+    queue.flush()
+
+    assert api.calls == [('update', '12', {'v': 2}),
+                         ('update', '13', {'v': 3})]
+    assert first.result() == second.result() == '12'
+    assert other.result() == '13'
+    assert (queue.submitted, queue.sent, queue.saved) == (3, 2, 1)
+
+
+def test_add_then_remove_cancels(api):
+    """Test that removing a pending addition sends nothing."""
+    queue = WriteQueue(api, max_delay=60)
+    added = queue.add_record(ORCID_ID, 'token', 'work', {'v': 1})
+    removed = queue.remove_record(ORCID_ID, 'token', 'work', added)
+    queue.close()
+
+    assert api.calls == []
+    assert added.result() is None and removed.result() is None
+    assert queue.saved == 2
+
+
+def test_update_of_pending_addition(api):
+    """Test that an update is merged into the pending addition."""
+    queue = WriteQueue(api, max_delay=60)
+    added = queue.add_record(ORCID_ID, 'token', 'work', {'v': 1})
+    updated = queue.update_record(ORCID_ID, 'token', 'work', {'v': 2}, added)
+    queue.flush()
+    assert api.calls == [('add', 'work', {'v': 2})]
+    assert added.result() == updated.result() == '1'
+
+    queue.remove_record(ORCID_ID, 'token', 'work', added)
+    queue.close()
+    assert api.calls[-1] == ('remove', '1')
+
+
+def test_flush_on_size(api):
+    """Test that the background worker flushes full queues."""
+    queue = WriteQueue(api, max_pending=2, max_delay=60)
+    queue.update_record(ORCID_ID, 'token', 'work', {}, '1')
+    future = queue.update_record(ORCID_ID, 'token', 'work', {}, '2')
+    assert future.result(timeout=5) == '2'
+    queue.close()
+
+
+def test_write_after_sent_addition(api):
+    """Test that writes of an addition being sent do not block."""
+    queue = WriteQueue(api, max_delay=60)
+    added = queue.add_record(ORCID_ID, 'token', 'work', {'v': 1})
+    failed = queue.add_record(ORCID_ID, 'token', 'work', {'fail': True})
+    # Take the additions from the queue without completing their futures.
+    with queue._condition:
+        pending, queue._pending = queue._pending, type(queue._pending)()
+    updated = queue.update_record(ORCID_ID, 'token', 'work', {'v': 2}, added)
+    removed = queue.remove_record(ORCID_ID, 'token', 'work', failed)
+    assert not updated.done() and not removed.done()
+
+    queue._send(pending.values())
+    with pytest.raises(ValueError):
+        removed.result(timeout=5)
+    queue.close()
+    assert updated.result() == '1'
+    assert api.calls == [('add', 'work', {'v': 1}), ('update', '1', {'v': 2})]
@@ -0,0 +1,64 @@
+"""Tests for the access to XML payloads."""
+
+import io
+
+import pytest
+from lxml import etree
+
+from orcid import PublicAPI
+from orcid.xmlutils import (TunedParser, external_ids, extract,
+                            last_modified, parse_xml, put_codes, titles)
+
+from .test_works import WORKS_XML
+
+PAYLOAD = etree.tostring(WORKS_XML).replace(
+    b'<work:type>book</work:type>',
+    b'<work:type>book</work:type>'
+    b'<common:last-modified-date>2017-01-01T00:00:00.000Z'
+    b'</common:last-modified-date>')
+
+EXTERNAL_IDS = [('doi', 'https://doi.org/10.1/ABC'), ('issn', '1234-5678'),
+                ('doi', '10.1/abc'), ('isbn', '978-3-16')]
+
+
+def test_precompiled_xpaths():
+    """Test that the common fields are read from parsed trees."""
+    tree = parse_xml(PAYLOAD)
+    assert tree.text is None
+    assert put_codes(tree) == [11, 12, 13]
+    assert titles(tree) == ['Imported', 'Preferred', 'Book']
+    assert external_ids(tree) == EXTERNAL_IDS
+    assert last_modified(tree) == ['2017-01-01T00:00:00.000Z']
+
+
+def test_extract():
+    """Test that the target parser reads the same fields."""
+    assert extract(PAYLOAD) == {
+        'put-codes': [11, 12, 13],
+        'titles': ['Imported', 'Preferred', 'Book'],
+        'external-ids': EXTERNAL_IDS,
+        'last-modified': ['2017-01-01T00:00:00.000Z']}
+    assert extract(io.BytesIO(PAYLOAD), ['put-codes']) == \
+        {'put-codes': [11, 12, 13]}
+    with pytest.raises(ValueError):
+        extract(PAYLOAD, ['abstract'])
+
+
+def test_tuned_parser_is_opt_in():
+    """Test that XML responses keep their blank text by default."""
+    api = PublicAPI('key', 'secret')
+    tree = api._deserialize_by_content_type(PAYLOAD, 'application/orcid+xml')
+    assert tree.text.strip() == ''
+    assert put_codes(tree) == [11, 12, 13]
+    api = PublicAPI('key', 'secret', parser=TunedParser())
+    tree = api._deserialize_by_content_type(PAYLOAD, 'application/orcid+xml')
+    assert tree.text is None
+    assert put_codes(tree) == [11, 12, 13]
+    assert api._deserialize_by_content_type(
+        b'{"a": 1}', 'application/orcid+json') == {'a': 1}
+
+
+def test_limits_are_kept():
+    """Test that the tuned parser keeps the depth limit of lxml."""
+    with pytest.raises(etree.XMLSyntaxError):
+        parse_xml(b'<a>' * 300 + b'</a>' * 300)
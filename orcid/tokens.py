@@ -0,0 +1,138 @@
+"""Storage of the OAuth tokens of researchers."""
+
+from collections import OrderedDict
+import sqlite3
+import threading
+import time
+
+import simplejson as json
+
+
+class TokenStore(object):
+    """Tokens by ORCID iD, with an LRU cache in front of a backend.
+
+    The tokens are the dictionaries returned by
+    `get_token_from_authorization_code`. An ``expires_at`` timestamp is
+    added when they are stored. Subclasses persist the tokens by
+    implementing ``_load``, ``_save`` and ``_delete``.
+    """
+
+    def __init__(self, cache_size=10000):
+        """Initialize the store.
+
+        Parameters
+        ----------
+        :param cache_size: integer
+            The number of tokens kept in memory.
+        """
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, orcid_id):
+        """Return the token of an iD, or None."""
+        with self._cache_lock:
+            token = self._cache.get(orcid_id)
+            if token is not None:
+                self._cache[orcid_id] = self._cache.pop(orcid_id)
+                self.hits += 1
+                return token
+            self.misses += 1
+        token = self._load(orcid_id)
+        if token is not None:
+            self._remember(orcid_id, token)
+        return token
+
+    def set(self, orcid_id, token):
+        """Store the token of an iD.
+
+        Parameters
+        ----------
+        :param orcid_id: string
+            The iD of the researcher.
+        :param token: dict
+            The token, as returned by `get_token_from_authorization_code`.
+
+        Returns
+        -------
+        :returns: dict
+            The stored token, with the ``expires_at`` key.
+        """
+        token = dict(token)
+        if 'expires_at' not in token and token.get('expires_in'):
+            token['expires_at'] = time.time() + int(token['expires_in'])
+        self._save(orcid_id, token)
+        self._remember(orcid_id, token)
+        return token
+
+    def delete(self, orcid_id):
+        """Remove the token of an iD."""
+        with self._cache_lock:
+            self._cache.pop(orcid_id, None)
+        self._delete(orcid_id)
+
+    def close(self):
+        """Release the resources of the backend."""
+
+    def _remember(self, orcid_id, token):
+        with self._cache_lock:
+            self._cache.pop(orcid_id, None)
+            self._cache[orcid_id] = token
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _load(self, orcid_id):
+        raise NotImplementedError
+
+    def _save(self, orcid_id, token):
+        raise NotImplementedError
+
+    def _delete(self, orcid_id):
+        raise NotImplementedError
+
+
+class SQLiteTokenStore(TokenStore):
+    """Token store persisted in a sqlite database."""
+
+    def __init__(self, path, cache_size=10000):
+        """Initialize the store.
+
+        Parameters
+        ----------
+        :param path: string
+            The sqlite database file.
+        :param cache_size: integer
+            The number of tokens kept in memory.
+        """
+        super(SQLiteTokenStore, self).__init__(cache_size)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS tokens ('
+                'orcid_id TEXT PRIMARY KEY, token TEXT NOT NULL, '
+                'expires_at REAL)')
+
+    def close(self):
+        """Close the database."""
+        self._connection.close()
+
+    def _load(self, orcid_id):
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT token FROM tokens WHERE orcid_id = ?',
+                (orcid_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _save(self, orcid_id, token):
+        with self._lock, self._connection as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)',
+                (orcid_id, json.dumps(token), token.get('expires_at')))
+
+    def _delete(self, orcid_id):
+        with self._lock, self._connection as connection:
+            connection.execute('DELETE FROM tokens WHERE orcid_id = ?',
+                               (orcid_id,))
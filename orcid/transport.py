@@ -0,0 +1,464 @@
+"""HTTP transports used by the API classes."""
+
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+import socket
+import sys
+import threading
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import (ConnectTimeoutError, ProtocolError,
+                                ReadTimeoutError, SSLError)
+from urllib3.util.connection import allowed_gai_family
+import zlib
+
+from .profiling import CONNECT, DNS, TLS, current, timer
+if sys.version_info[0] == 2:
+    from cookielib import DefaultCookiePolicy
+else:
+    from http.cookiejar import DefaultCookiePolicy
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+
+_DECODING_ERRORS = (zlib.error, brotli.error) if brotli else (zlib.error,)
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class TransferStats(object):
+    """Counters of the bytes received by a transport.
+
+    ``compressed_bytes`` counts the bytes as sent over the network and
+    ``decompressed_bytes`` the bytes of the decoded bodies.
+    """
+
+    def __init__(self):
+        """Initialize the counters."""
+        self._lock = threading.Lock()
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+
+    def add(self, compressed, decompressed):
+        """Count the sizes of a received chunk."""
+        with self._lock:
+            self.compressed_bytes += compressed
+            self.decompressed_bytes += decompressed
+
+
+class _Decompressor(object):
+
+    def __init__(self, encoding):
+        encoding = (encoding or '').strip().lower()
+        self._deflate = encoding == 'deflate'
+        if encoding == 'gzip':
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self._deflate:
+            self._decompressor = zlib.decompressobj()
+        elif encoding == 'br' and brotli is not None:
+            self._decompressor = brotli.Decompressor()
+        else:
+            self._decompressor = None
+
+    def decompress(self, data):
+        if self._decompressor is None or not data:
+            return data
+        if self._deflate:
+            try:
+                return self._decompressor.decompress(data)
+            except zlib.error:
+                # Some servers send raw deflate streams without the zlib
+                # header.
+                self._deflate = False
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        if hasattr(self._decompressor, 'process'):
+            return self._decompressor.process(data)
+        return self._decompressor.decompress(data)
+
+    def flush(self):
+        if self._decompressor is None or \
+                not hasattr(self._decompressor, 'flush'):
+            return b''
+        return self._decompressor.flush()
+
+
+class _DecodingReader(object):
+    """File-like object decompressing a stream of raw chunks on the fly.
+
+    `requests` reads response bodies from it, so the body is decoded
+    incrementally whether it is consumed at once or streamed.
+    """
+
+    def __init__(self, chunks, encoding, stats, close, release_conn=None):
+        self._chunks = chunks
+        self._decompressor = _Decompressor(encoding)
+        self._stats = stats
+        self._close = close
+        self._release_conn = release_conn or close
+        self._buffer = b''
+        self._done = False
+
+    def read(self, size=-1, **kwargs):
+        while not self._done and (size < 0 or len(self._buffer) < size):
+            try:
+                raw = next(self._chunks)
+            except StopIteration:
+                raw = b''
+                self._done = True
+            try:
+                data = self._decompressor.flush() if self._done else \
+                    self._decompressor.decompress(raw)
+            except _DECODING_ERRORS as error:
+                raise requests.exceptions.ContentDecodingError(error)
+            self._stats.add(len(raw), len(data))
+            self._buffer += data
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self._close()
+
+    def release_conn(self):
+        self._release_conn()
+
+
+def _urllib3_chunks(raw):
+    """Yield the raw chunks of a body, raising the errors of `requests`."""
+    try:
+        for chunk in raw.stream(_CHUNK_SIZE, decode_content=False):
+            yield chunk
+    except ReadTimeoutError as error:
+        raise requests.exceptions.ReadTimeout(error)
+    except SSLError as error:
+        raise requests.exceptions.SSLError(error)
+    except ProtocolError as error:
+        raise requests.exceptions.ChunkedEncodingError(error)
+
+
+class _TimedConnectionMixin(object):
+    """Connection timing name resolution and connection when profiled."""
+
+    _connected_at = None
+
+    def _new_conn(self):
+        new_conn = super(_TimedConnectionMixin, self)._new_conn
+        timing = current()
+        if timing is None:
+            return new_conn()
+        start = timer()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port,
+                                           allowed_gai_family(),
+                                           socket.SOCK_STREAM)
+        except socket.gaierror:
+            # Let urllib3 report the failure.
+            return new_conn()
+        resolved = timer()
+        timing.add(DNS, resolved - start)
+        host = self._dns_host
+        try:
+            # Connect to the resolved addresses in turn, like urllib3.
+            for index, address in enumerate(addresses):
+                self._dns_host = address[4][0]
+                try:
+                    sock = new_conn()
+                    break
+                except ConnectTimeoutError:
+                    if index == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+            self._connected_at = timer()
+            timing.add(CONNECT, self._connected_at - resolved)
+        return sock
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+
+    def connect(self):
+        self._connected_at = None
+        super(_TimedHTTPSConnection, self).connect()
+        timing = current()
+        if timing is not None and self._connected_at is not None:
+            timing.add(TLS, timer() - self._connected_at)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """Adapter whose connections report their phases to the profiler."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(_TimedAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool}
+
+
+_TRACED = {'connection.connect_tcp': CONNECT,
+           'connection.start_tls': TLS}
+
+
+def _trace(timing):
+    """Return an httpx trace callback adding the phases to a timing."""
+    started = {}
+
+    def trace(event, info):
+        name, _, stage = event.rpartition('.')
+        if name not in _TRACED:
+            return
+        if stage == 'started':
+            started[name] = timer()
+        elif name in started:
+            timing.add(_TRACED[name], timer() - started.pop(name))
+    return trace
+
+
+class RequestsTransport(object):
+    """HTTP/1.1 transport keeping a pool of connections alive.
+
+    The default transport. Every request is sent with `requests`, so the
+    responses and exceptions are the ones of `requests`.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10,
+                 session=None, accept_encoding=ACCEPT_ENCODING):
+        """Initialize the transport.
+
+        Parameters
+        ----------
+        :param pool_connections: integer
+            The number of hosts to keep connection pools for.
+        :param pool_maxsize: integer
+            The maximum number of connections kept alive per host. Set it to
+            the number of threads sharing the transport.
+        :param session: requests.Session
+            The session to send the requests with. If None, a session that
+            does not keep cookies is created.
+        :param accept_encoding: string
+            The content codings accepted from the server. By default gzip,
+            deflate and, if the ``brotli`` package is installed, brotli.
+        """
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(DefaultCookiePolicy(
+                allowed_domains=[]))
+            adapter = _TimedAdapter(pool_connections=pool_connections,
+                                    pool_maxsize=pool_maxsize)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        session.headers['Accept-Encoding'] = accept_encoding
+        self._session = session
+        self._accept_encoding = accept_encoding
+        self._shares_connections = False
+        self.stats = TransferStats()
+
+    def request(self, method, url, **kwargs):
+        """Send a request.
+
+        Parameters
+        ----------
+        :param method: string
+            The HTTP method, for example 'GET'.
+        :param url: string
+            The URL of the request.
+        :param kwargs:
+            The arguments of `requests.request`: headers, params, data,
+            timeout and stream.
+
+        Returns
+        -------
+        :returns: requests.Response
+            The response.
+        """
+        stream = kwargs.pop('stream', False)
+        response = self._session.request(method, url, stream=True, **kwargs)
+        raw = response.raw
+        response.raw = _DecodingReader(
+            _urllib3_chunks(raw), response.headers.get('Content-Encoding'),
+            self.stats, raw.close, raw.release_conn)
+        if not stream:
+            response.content
+        return response
+
+    def session(self):
+        """Return a transport keeping cookies, for multi-step flows.
+
+        The transport has the settings and the adapters of this one, and a
+        cookie jar of its own.
+        """
+        source = self._session
+        session = requests.Session()
+        session.headers = source.headers.copy()
+        session.auth = source.auth
+        session.proxies = dict(source.proxies)
+        session.hooks = dict((event, list(hooks))
+                             for event, hooks in source.hooks.items())
+        session.params = dict(source.params)
+        session.verify = source.verify
+        session.cert = source.cert
+        session.max_redirects = source.max_redirects
+        session.trust_env = source.trust_env
+        session.adapters = source.adapters.copy()
+        transport = RequestsTransport(session=session,
+                                      accept_encoding=self._accept_encoding)
+        transport._shares_connections = True
+        transport.stats = self.stats
+        return transport
+
+    def close(self):
+        """Close the connections not shared with another transport."""
+        if not self._shares_connections:
+            self._session.close()
+
+
+class HTTP2Transport(object):
+    """HTTP/2 transport multiplexing concurrent requests.
+
+    All the requests to a host share a single connection, whatever the
+    number of threads using the transport. Requires the ``httpx`` package
+    with HTTP/2 support (``pip install httpx[http2]``). The responses and
+    exceptions are converted to the ones of `requests`, so the transport can
+    replace `RequestsTransport` transparently.
+    """
+
+    def __init__(self, client=None, accept_encoding=ACCEPT_ENCODING,
+                 **kwargs):
+        """Initialize the transport.
+
+        Parameters
+        ----------
+        :param client: httpx.Client
+            The client to send the requests with. If None, one is created
+            with HTTP/2 enabled.
+        :param accept_encoding: string
+            The content codings accepted from the server, see
+            `RequestsTransport`.
+        :param kwargs:
+            Additional arguments of `httpx.Client`.
+        """
+        import httpx
+        self._httpx = httpx
+        if client is None:
+            client = httpx.Client(http2=True, **kwargs)
+            self._kwargs = kwargs
+        else:
+            self._kwargs = None
+        client.headers['Accept-Encoding'] = accept_encoding
+        self._client = client
+        self._accept_encoding = accept_encoding
+        self._shares_connections = False
+        self.stats = TransferStats()
+
+    def request(self, method, url, headers=None, params=None, data=None,
+                timeout=None, stream=False):
+        """Send a request, see `RequestsTransport.request`."""
+        httpx = self._httpx
+        if isinstance(data, dict):
+            data, content = data, None
+        else:
+            data, content = None, data
+        timing = current()
+        request = self._client.build_request(
+            method, url, headers=headers, params=params, data=data,
+            content=content, timeout=self._timeout(timeout),
+            extensions=None if timing is None else {
+                'trace': _trace(timing)})
+        with self._translate_errors():
+            response = self._client.send(request, stream=True)
+        return self._convert(response, stream)
+
+    def session(self):
+        """Return a transport keeping cookies, for multi-step flows.
+
+        The transport is created with the arguments of this one, or shares
+        the connections and the settings of the client it was given. Its
+        cookie jar is its own.
+        """
+        if self._kwargs is not None:
+            kwargs = dict(self._kwargs)
+            kwargs.pop('cookies', None)
+            transport = HTTP2Transport(accept_encoding=self._accept_encoding,
+                                       **kwargs)
+        else:
+            source = self._client
+            client = self._httpx.Client(
+                auth=source.auth, params=source.params,
+                headers=source.headers, timeout=source.timeout,
+                follow_redirects=source.follow_redirects,
+                max_redirects=source.max_redirects,
+                event_hooks=dict((event, list(hooks)) for event, hooks
+                                 in source.event_hooks.items()),
+                base_url=source.base_url,
+                trust_env=source.trust_env, transport=source._transport)
+            client._mounts = dict(source._mounts)
+            transport = HTTP2Transport(client,
+                                       accept_encoding=self._accept_encoding)
+            transport._shares_connections = True
+        transport.stats = self.stats
+        return transport
+
+    def close(self):
+        """Close the connections not shared with another transport."""
+        if not self._shares_connections:
+            self._client.close()
+
+    @contextmanager
+    def _translate_errors(self):
+        httpx = self._httpx
+        try:
+            yield
+        except httpx.ConnectTimeout as error:
+            raise requests.exceptions.ConnectTimeout(error)
+        except httpx.TimeoutException as error:
+            raise requests.exceptions.ReadTimeout(error)
+        except httpx.ProtocolError as error:
+            raise requests.exceptions.ChunkedEncodingError(error)
+        except httpx.TransportError as error:
+            raise requests.exceptions.ConnectionError(error)
+
+    def _chunks(self, response):
+        # The body is read by `requests`, after `request` returned.
+        with self._translate_errors():
+            for chunk in response.iter_raw(_CHUNK_SIZE):
+                yield chunk
+
+    def _timeout(self, timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return self._httpx.Timeout(read, connect=connect)
+        return self._httpx.Timeout(timeout)
+
+    def _convert(self, response, stream):
+        converted = requests.models.Response()
+        converted.status_code = response.status_code
+        converted.reason = response.reason_phrase
+        converted.headers = CaseInsensitiveDict(response.headers.items())
+        converted.url = str(response.url)
+        converted.encoding = response.charset_encoding
+        converted.raw = _DecodingReader(
+            self._chunks(response), response.headers.get('Content-Encoding'),
+            self.stats, response.close)
+        if not stream:
+            try:
+                converted.content
+            finally:
+                response.close()
+        return converted
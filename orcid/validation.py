@@ -0,0 +1,271 @@
+"""Local validation of ORCID payloads before they are sent."""
+
+import numbers
+import os
+import re
+import sys
+import threading
+
+from lxml import etree
+
+from .exceptions import InvalidIdentifier, ValidationError
+if sys.version_info[0] == 2:
+    string_types = basestring,
+else:
+    string_types = str,
+
+# Names of the XSD files as published in the ORCID model
+# (https://github.com/ORCID/orcid-model, ``record_2.0`` directory).
+SCHEMA_FILES = {'education': 'education-2.0.xsd',
+                'employment': 'employment-2.0.xsd',
+                'funding': 'funding-2.0.xsd',
+                'peer-review': 'peer-review-2.0.xsd',
+                'work': 'work-2.0.xsd'}
+
+_AFFILIATION_FIELDS = (('organization', 'name'),
+                       ('organization', 'address', 'city'),
+                       ('organization', 'address', 'country'))
+
+# Fields which the v2.0 schema marks as mandatory, in the JSON layout.
+REQUIRED_FIELDS = {
+    'education': _AFFILIATION_FIELDS,
+    'employment': _AFFILIATION_FIELDS,
+    'funding': (('title', 'title', 'value'),
+                ('type',)) + _AFFILIATION_FIELDS,
+    'peer-review': (('reviewer-role',),
+                    ('review-identifiers', 'external-id'),
+                    ('review-type',),
+                    ('review-completion-date', 'year', 'value'),
+                    ('review-group-id',),
+                    ('convening-organization', 'name'),
+                    ('convening-organization', 'address', 'city'),
+                    ('convening-organization', 'address', 'country')),
+    'work': (('title', 'title', 'value'),
+             ('type',)),
+}
+
+_ORCID_ID = re.compile(r'[0-9]{4}-[0-9]{4}-[0-9]{4}-[0-9]{3}[0-9X]\Z')
+_PUT_CODE = re.compile(r'[1-9][0-9]*\Z')
+
+_schema_cache = {}
+_schema_cache_lock = threading.Lock()
+
+
+def _load_schema(path):
+    # One compiled schema per file is shared by all validators of the
+    # process. lxml validators keep their error log on the instance, so every
+    # schema comes with a lock serializing its use.
+    entry = _schema_cache.get(path)
+    if entry is None:
+        with _schema_cache_lock:
+            entry = _schema_cache.get(path)
+            if entry is None:
+                entry = (etree.XMLSchema(etree.parse(path)),
+                         threading.Lock())
+                _schema_cache[path] = entry
+    return entry
+
+
+def _lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+class SchemaValidator(object):
+    """Validate records against the ORCID schema without the network.
+
+    JSON payloads are checked for the fields that the ORCID v2.0 schema
+    requires. XML payloads are validated with the XSD files from the ORCID
+    model, if ``schema_dir`` points to them. The compiled schema of every
+    type is loaded on first use and kept for the lifetime of the process.
+    """
+
+    def __init__(self, schema_dir=None):
+        """Initialize the validator.
+
+        Parameters
+        ----------
+        :param schema_dir: string
+            Directory containing the ORCID v2.0 XSD files, for example
+            ``work-2.0.xsd``. If None, XML payloads are not validated.
+        """
+        self._schema_dir = schema_dir
+
+    def errors(self, request_type, data,
+               content_type='application/orcid+json'):
+        """Return the list of problems found in a payload.
+
+        Parameters
+        ----------
+        :param request_type: string
+            One of 'education', 'employment', 'funding', 'peer-review',
+            'work' or 'works'. Other types are not checked.
+        :param data: dict | lxml.etree._Element
+            The record, as passed to `MemberAPI.add_record`.
+        :param content_type: string
+            MIME type of the passed record.
+
+        Returns
+        -------
+        :returns: list of tuples
+            ``(path, message)`` pairs, empty if the payload is valid.
+        """
+        if content_type == 'application/orcid+json':
+            if request_type == 'works':
+                return self._bulk_errors(data)
+            return self._json_errors(request_type, data)
+        if content_type == 'application/orcid+xml':
+            return self._xml_errors(request_type, data)
+        raise NotImplementedError('Cannot validate content of type %s'
+                                  % content_type)
+
+    def validate(self, request_type, data,
+                 content_type='application/orcid+json'):
+        """Raise `ValidationError` if a payload is not valid.
+
+        Parameters
+        ----------
+        :param request_type: string
+            The type of the record, for example 'work'.
+        :param data: dict | lxml.etree._Element
+            The record, as passed to `MemberAPI.add_record`.
+        :param content_type: string
+            MIME type of the passed record.
+        """
+        errors = self.errors(request_type, data, content_type)
+        if errors:
+            raise ValidationError(request_type, errors)
+
+    def _json_errors(self, request_type, data, prefix=''):
+        if request_type not in REQUIRED_FIELDS:
+            return []
+        if not isinstance(data, dict):
+            return [(prefix or '.', 'expected an object')]
+        errors = []
+        for path in REQUIRED_FIELDS[request_type]:
+            if _lookup(data, path) in (None, '', [], {}):
+                errors.append((prefix + '.'.join(path), 'missing value'))
+        return errors
+
+    def _bulk_errors(self, data):
+        items = data.get('bulk') if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            return [('bulk', 'expected a list')]
+        errors = []
+        for index, item in enumerate(items):
+            errors.extend(self._json_errors(
+                'work', _lookup(item, ('work',)),
+                'bulk[%d].work.' % index))
+        return errors
+
+    def _xml_errors(self, request_type, data):
+        if self._schema_dir is None or request_type not in SCHEMA_FILES:
+            return []
+        schema, lock = _load_schema(os.path.join(self._schema_dir,
+                                                 SCHEMA_FILES[request_type]))
+        with lock:
+            if schema.validate(data):
+                return []
+            return [(entry.path, entry.message)
+                    for entry in schema.error_log]
+
+
+def _check_character(orcid_id):
+    # ISO 7064 11,2 over the first 15 digits.
+    total = 0
+    for character in orcid_id[:18]:
+        if character != '-':
+            total = (total + ord(character) - 48) * 2
+    result = (12 - total % 11) % 11
+    return 'X' if result == 10 else chr(48 + result)
+
+
+def _orcid_id_error(orcid_id):
+    if not isinstance(orcid_id, string_types) or \
+            not _ORCID_ID.match(orcid_id):
+        return 'not an ORCID iD'
+    if orcid_id[18] != _check_character(orcid_id):
+        return 'wrong check digit'
+    return None
+
+
+def _put_code_error(put_code):
+    if isinstance(put_code, string_types):
+        if _PUT_CODE.match(put_code):
+            return None
+    elif isinstance(put_code, numbers.Integral) and \
+            not isinstance(put_code, bool) and put_code > 0:
+        return None
+    return 'not a put-code'
+
+
+def is_valid_orcid_id(orcid_id):
+    """Return whether a string is an ORCID iD with a valid check digit."""
+    return _orcid_id_error(orcid_id) is None
+
+
+def orcid_id_errors(orcid_ids):
+    """Return the problems found in ORCID iDs, without the network.
+
+    The iDs must be in the '0000-0002-1825-0097' form, with the check digit
+    of ISO 7064 11,2.
+
+    Parameters
+    ----------
+    :param orcid_ids: iterable of strings
+        The iDs to check.
+
+    Returns
+    -------
+    :returns: list of tuples
+        ``(index, message)`` pairs for the invalid iDs, empty if all the iDs
+        are valid.
+    """
+    error = _orcid_id_error
+    return [(index, message) for index, message in
+            enumerate(map(error, orcid_ids)) if message is not None]
+
+
+def put_code_errors(put_codes):
+    """Return the problems found in put-codes.
+
+    Put-codes are positive integers, or strings of their digits.
+
+    Parameters
+    ----------
+    :param put_codes: iterable
+        The put-codes to check.
+
+    Returns
+    -------
+    :returns: list of tuples
+        ``(index, message)`` pairs for the invalid put-codes.
+    """
+    error = _put_code_error
+    return [(index, message) for index, message in
+            enumerate(map(error, put_codes)) if message is not None]
+
+
+def validate_identifiers(orcid_id, put_code=None):
+    """Raise `InvalidIdentifier` if an iD or put-codes are malformed.
+
+    Parameters
+    ----------
+    :param orcid_id: string
+        The ORCID iD.
+    :param put_code: string | integer | list
+        A put-code, a list of put-codes, or None.
+    """
+    errors = []
+    message = _orcid_id_error(orcid_id)
+    if message is not None:
+        errors.append((orcid_id, message))
+    if put_code is not None:
+        put_codes = put_code if isinstance(put_code, list) else [put_code]
+        errors.extend((put_codes[index], message) for index, message
+                      in put_code_errors(put_codes))
+    if errors:
+        raise InvalidIdentifier(errors)
@@ -0,0 +1,290 @@
+"""Flattening and indexing of works summaries.
+
+The works of a record are grouped by their external ids. Every group holds
+one summary per source that added the work::
+
+    from orcid.works import doi_index, flatten_works
+
+    works = api.read_record_public(orcid_id, 'works', token)
+    for work in flatten_works(works):
+        print(work.put_code, work.title, work.year)
+    by_doi = doi_index(works)
+
+The functions accept the JSON dictionaries and the lxml elements returned by
+``read_record_public`` and ``read_record_member`` for the 'works',
+'activities' and 'record' request types.
+"""
+
+from collections import namedtuple
+
+
+class WorkSummary(namedtuple('WorkSummary', ['put_code', 'title', 'type',
+                                             'year', 'source',
+                                             'external_ids'])):
+    """A flat work summary.
+
+    ``put_code`` is an integer, ``type`` is lower case with dashes, for
+    example 'journal-article', ``source`` is the name of the source and
+    ``external_ids`` is a tuple of the ``(type, value)`` pairs identifying
+    the work, the types in lower case.
+    """
+
+    __slots__ = ()
+
+
+_new_summary = WorkSummary._make
+
+
+_ACTIVITIES = '{http://www.orcid.org/ns/activities}'
+_COMMON = '{http://www.orcid.org/ns/common}'
+_WORK = '{http://www.orcid.org/ns/work}'
+
+# Work types as spelled in JSON, for example 'JOURNAL_ARTICLE', converted to
+# the XML spelling.
+_TYPES = {}
+
+_DOI_PREFIXES = ('https://doi.org/', 'http://doi.org/', 'https://dx.doi.org/',
+                 'http://dx.doi.org/', 'doi:')
+
+
+def _value(node):
+    if isinstance(node, dict):
+        return node.get('value')
+    return node
+
+
+def _is_self(relationship):
+    # Other relationships, such as 'part-of' for the ISSN of a journal,
+    # identify something else than the work.
+    return relationship is None or relationship.lower() == 'self'
+
+
+def _works_node(works):
+    if isinstance(works, dict):
+        if 'group' in works:
+            return works
+        if 'activities-summary' in works:
+            works = works['activities-summary'] or {}
+        return works.get('works') or {}
+    if works.tag == _ACTIVITIES + 'works':
+        return works
+    return works.find('.//' + _ACTIVITIES + 'works')
+
+
+def _dict_external_ids(node):
+    external_ids = (node.get('external-ids') or {}).get('external-id')
+    if not external_ids:
+        return ()
+    pairs = []
+    for item in external_ids:
+        id_type = item.get('external-id-type')
+        value = item.get('external-id-value')
+        if id_type and value and \
+                _is_self(item.get('external-id-relationship')):
+            pairs.append((id_type.lower(), value))
+    return tuple(pairs)
+
+
+def _type(work_type):
+    converted = _TYPES[work_type] = work_type.lower().replace('_', '-')
+    return converted
+
+
+def _dict_source(summary):
+    return _value((summary.get('source') or {}).get('source-name'))
+
+
+def _dict_summary(summary):
+    title = (summary.get('title') or {}).get('title')
+    year = (summary.get('publication-date') or {}).get('year')
+    source = (summary.get('source') or {}).get('source-name')
+    work_type = summary.get('type')
+    if work_type:
+        work_type = _TYPES.get(work_type) or _type(work_type)
+    return _new_summary((summary.get('put-code'),
+                         title and title.get('value'), work_type,
+                         year and year.get('value'),
+                         source and source.get('value'),
+                         _dict_external_ids(summary)))
+
+
+def _dict_groups(works):
+    for group in works.get('group') or ():
+        yield group.get('work-summary') or ()
+
+
+_TITLE = _WORK + 'title'
+_TYPE = _WORK + 'type'
+_PUBLICATION_DATE = _COMMON + 'publication-date'
+_SOURCE = _COMMON + 'source'
+_EXTERNAL_IDS = _COMMON + 'external-ids'
+_EXTERNAL_ID_TYPE = _COMMON + 'external-id-type'
+_EXTERNAL_ID_VALUE = _COMMON + 'external-id-value'
+_EXTERNAL_ID_RELATIONSHIP = _COMMON + 'external-id-relationship'
+
+
+def _xml_external_ids(node):
+    pairs = []
+    for item in node:
+        id_type = value = relationship = None
+        for child in item:
+            tag = child.tag
+            if tag == _EXTERNAL_ID_TYPE:
+                id_type = child.text
+            elif tag == _EXTERNAL_ID_VALUE:
+                value = child.text
+            elif tag == _EXTERNAL_ID_RELATIONSHIP:
+                relationship = child.text
+        if id_type and value and _is_self(relationship):
+            pairs.append((id_type.lower(), value))
+    return tuple(pairs)
+
+
+def _xml_source(summary):
+    return summary.findtext(_SOURCE + '/' + _COMMON + 'source-name')
+
+
+def _xml_summary(summary):
+    # A single pass over the children, which is faster than a search for
+    # every field.
+    title = work_type = year = source = None
+    external_ids = ()
+    for child in summary:
+        tag = child.tag
+        if tag == _TITLE:
+            title = child.findtext(_COMMON + 'title')
+        elif tag == _TYPE:
+            work_type = child.text
+        elif tag == _PUBLICATION_DATE:
+            year = child.findtext(_COMMON + 'year')
+        elif tag == _SOURCE:
+            source = child.findtext(_COMMON + 'source-name')
+        elif tag == _EXTERNAL_IDS:
+            external_ids = _xml_external_ids(child)
+    put_code = summary.get('put-code')
+    return WorkSummary(int(put_code) if put_code else None, title,
+                       work_type, year, source, external_ids)
+
+
+def _xml_groups(works):
+    for group in works.iterchildren(_ACTIVITIES + 'group'):
+        yield group.findall(_WORK + 'work-summary')
+
+
+_DICT = (_dict_groups, _dict_summary, _dict_source)
+_XML = (_xml_groups, _xml_summary, _xml_source)
+
+
+def _representation(works):
+    works = _works_node(works)
+    if isinstance(works, dict):
+        return works, _DICT
+    if works is None:
+        return {}, _DICT
+    return works, _XML
+
+
+def _display_index(summary):
+    # A key of the dictionaries and an attribute of the elements, both read
+    # with get.
+    return int(summary.get('display-index') or 0)
+
+
+def _pick(summaries, source, preferred_source):
+    # Only the chosen summary of a group is converted.
+    if preferred_source is not None:
+        for summary in summaries:
+            if source(summary) == preferred_source:
+                return summary
+    best = summaries[0]
+    if len(summaries) > 1:
+        # The researcher's preferred version has the highest display
+        # index. Ties go to the first one listed.
+        best_index = _display_index(best)
+        for candidate in summaries[1:]:
+            candidate_index = _display_index(candidate)
+            if candidate_index > best_index:
+                best, best_index = candidate, candidate_index
+    return best
+
+
+def flatten_works(works, preferred=True, preferred_source=None):
+    """Return the works of a record as flat summaries.
+
+    Parameters
+    ----------
+    :param works: dict or lxml.etree._Element
+        The 'works', 'activities' or 'record' of a researcher, as returned
+        by ``read_record_public``.
+    :param preferred: boolean
+        Should only the preferred summary of every group be returned. If
+        False, the summaries of all the sources are returned.
+    :param preferred_source: string
+        The name of a source whose summaries should be preferred over the
+        researcher's choice.
+
+    Returns
+    -------
+    :returns: list of WorkSummary
+        The summaries, in the order of the groups.
+    """
+    works, (groups, convert, source) = _representation(works)
+    if not preferred:
+        return [convert(summary) for group in groups(works)
+                for summary in group]
+    return [convert(_pick(group, source, preferred_source))
+            for group in groups(works) if len(group)]
+
+
+def _normalize(id_type, value):
+    if id_type == 'doi':
+        value = value.lower()
+        if value.startswith(_DOI_PREFIXES):
+            for prefix in _DOI_PREFIXES:
+                if value.startswith(prefix):
+                    return value[len(prefix):]
+    return value
+
+
+def external_id_index(works, preferred_source=None):
+    """Index the preferred summaries by their external ids.
+
+    The DOIs are normalized to lower case without URL prefix.
+
+    Parameters
+    ----------
+    :param works: dict or lxml.etree._Element
+        See `flatten_works`.
+    :param preferred_source: string
+        See `flatten_works`.
+
+    Returns
+    -------
+    :returns: dict
+        Maps ``(type, value)`` pairs to lists of `WorkSummary`.
+    """
+    index = {}
+    for summary in flatten_works(works, preferred_source=preferred_source):
+        for id_type, value in summary.external_ids:
+            index.setdefault((id_type, _normalize(id_type, value)),
+                             []).append(summary)
+    return index
+
+
+def doi_index(works, preferred_source=None):
+    """Index the preferred summaries by DOI.
+
+    See `external_id_index`.
+
+    Returns
+    -------
+    :returns: dict
+        Maps normalized DOIs to `WorkSummary`. If several works have the
+        same DOI, the first one is kept.
+    """
+    index = {}
+    for summary in flatten_works(works, preferred_source=preferred_source):
+        for id_type, value in summary.external_ids:
+            if id_type == 'doi':
+                index.setdefault(_normalize(id_type, value), summary)
+    return index
@@ -0,0 +1,234 @@
+"""Write-behind queue coalescing MemberAPI updates."""
+
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+import time
+
+ADD = 'add'
+UPDATE = 'update'
+REMOVE = 'remove'
+
+
+class _Operation(object):
+
+    def __init__(self, kind, orcid_id, token, request_type, data, put_code,
+                 content_type, future):
+        self.kind = kind
+        self.orcid_id = orcid_id
+        self.token = token
+        self.request_type = request_type
+        self.data = data
+        self.put_code = put_code
+        self.content_type = content_type
+        self.futures = [future]
+        self.created = time.time()
+
+
+class WriteQueue(object):
+    """Coalesce pending writes to ORCID records before sending them.
+
+    Operations are kept per (orcid_id, request_type, put_code). A later
+    update of the same record replaces the pending one, an update of a
+    pending addition is merged into the addition, and a removal of a pending
+    addition cancels both. The pending operations are sent by a background
+    thread once ``max_pending`` of them are queued or the oldest one waited
+    ``max_delay`` seconds.
+
+    Every method returns a `concurrent.futures.Future` resolving to the
+    put-code the record ends up with, or None if it was removed.
+    """
+
+    def __init__(self, api, max_pending=100, max_delay=1.0):
+        """Initialize the queue.
+
+        Parameters
+        ----------
+        :param api: orcid.MemberAPI
+            The API used to send the writes.
+        :param max_pending: integer
+            Number of pending operations triggering a flush.
+        :param max_delay: float
+            Maximum time in seconds an operation waits before being sent.
+        """
+        self._api = api
+        self._max_pending = max_pending
+        self._max_delay = max_delay
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._flushing = False
+        self._closed = False
+        self._worker = None
+        self.submitted = 0
+        self.sent = 0
+        self.saved = 0
+
+    def add_record(self, orcid_id, token, request_type, data,
+                   content_type='application/orcid+json'):
+        """Queue `MemberAPI.add_record`.
+
+        The returned future can be passed as ``put_code`` to
+        `update_record` and `remove_record` before the record is created.
+        """
+        future = Future()
+        operation = _Operation(ADD, orcid_id, token, request_type, data,
+                               None, content_type, future)
+        self._submit((orcid_id, request_type, future), operation)
+        return future
+
+    def update_record(self, orcid_id, token, request_type, data, put_code,
+                      content_type='application/orcid+json'):
+        """Queue `MemberAPI.update_record`."""
+        future = Future()
+        operation = _Operation(UPDATE, orcid_id, token, request_type, data,
+                               put_code, content_type, future)
+        self._submit((orcid_id, request_type, put_code), operation)
+        return future
+
+    def remove_record(self, orcid_id, token, request_type, put_code):
+        """Queue `MemberAPI.remove_record`."""
+        future = Future()
+        operation = _Operation(REMOVE, orcid_id, token, request_type, None,
+                               put_code, None, future)
+        self._submit((orcid_id, request_type, put_code), operation)
+        return future
+
+    def flush(self):
+        """Send all pending operations and wait until they are done."""
+        with self._condition:
+            while self._flushing:
+                self._condition.wait()
+            self._flushing = True
+            pending, self._pending = self._pending, OrderedDict()
+        try:
+            self._send(pending.values())
+        finally:
+            with self._condition:
+                self._flushing = False
+                self._condition.notify_all()
+
+    def close(self):
+        """Send all pending operations and stop the background thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+        while True:
+            self.flush()
+            # Operations waiting for an addition are queued once it is sent.
+            with self._condition:
+                if not self._pending:
+                    return
+
+    def _submit(self, key, operation, chained=False):
+        with self._condition:
+            if self._closed and not chained:
+                raise RuntimeError('The queue is closed.')
+            pending = self._pending.get(key)
+            in_flight = None
+            if pending is not None:
+                self._coalesce(key, pending, operation)
+                self.submitted += 1
+            elif isinstance(operation.put_code, Future):
+                # The addition has already been taken from the queue.
+                in_flight = operation.put_code
+            else:
+                self.submitted += 1
+                self._pending[key] = operation
+                self._ensure_worker()
+                self._condition.notify_all()
+        if in_flight is not None:
+            in_flight.add_done_callback(
+                lambda added: self._chain(key, operation, added))
+
+    def _chain(self, key, operation, added):
+        try:
+            operation.put_code = added.result()
+            if operation.put_code is None:
+                raise ValueError('The record has been removed.')
+            self._submit((key[0], key[1], operation.put_code), operation,
+                         chained=True)
+        except Exception as error:
+            for future in operation.futures:
+                future.set_exception(error)
+
+    def _coalesce(self, key, pending, operation):
+        if pending.kind == REMOVE:
+            if operation.kind != REMOVE:
+                raise ValueError('The record is already scheduled for '
+                                 'removal.')
+            pending.futures.extend(operation.futures)
+        elif operation.kind == REMOVE:
+            if pending.kind == ADD:
+                # Adding and removing the record is a no-op.
+                del self._pending[key]
+                for future in pending.futures + operation.futures:
+                    future.set_result(None)
+                self.saved += 2
+                return
+            pending.kind = REMOVE
+            pending.data = None
+            pending.token = operation.token
+            pending.futures.extend(operation.futures)
+        else:
+            pending.data = operation.data
+            pending.token = operation.token
+            pending.content_type = operation.content_type
+            pending.futures.extend(operation.futures)
+        self.saved += 1
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run,
+                                            name='orcid-write-queue')
+            self._worker.daemon = True
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._pending) >= self._max_pending:
+                        break
+                    if self._pending:
+                        oldest = next(iter(self._pending.values()))
+                        timeout = oldest.created + self._max_delay - \
+                            time.time()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._condition.wait(timeout)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _send(self, operations):
+        for operation in operations:
+            try:
+                put_code = self._execute(operation)
+            except Exception as error:
+                for future in operation.futures:
+                    future.set_exception(error)
+            else:
+                for future in operation.futures:
+                    future.set_result(put_code)
+            with self._condition:
+                self.sent += 1
+
+    def _execute(self, operation):
+        if operation.kind == ADD:
+            return self._api.add_record(operation.orcid_id, operation.token,
+                                        operation.request_type,
+                                        operation.data,
+                                        content_type=operation.content_type)
+        if operation.kind == UPDATE:
+            self._api.update_record(operation.orcid_id, operation.token,
+                                    operation.request_type, operation.data,
+                                    operation.put_code,
+                                    content_type=operation.content_type)
+            return operation.put_code
+        self._api.remove_record(operation.orcid_id, operation.token,
+                                operation.request_type, operation.put_code)
+        return None
@@ -0,0 +1,210 @@
+"""Fast access to the fields of ORCID XML payloads.
+
+`parse_xml` builds trees with a parser tuned for ORCID payloads. The APIs
+use it for the 'application/orcid+xml' accept type when created with
+``parser=TunedParser()``. The precompiled XPath expressions of this module
+read common fields from any tree without passing namespace maps around.
+`extract` reads the same fields straight from the payload without building
+the tree at all, so its memory use does not grow with the payload. For
+payloads already in memory, `parse_xml` and the XPath expressions are
+faster::
+
+    from orcid.xmlutils import extract
+
+    fields = extract(payload, ('put-codes', 'external-ids'))
+"""
+
+from bs4 import BeautifulSoup
+import simplejson as json
+import threading
+
+from lxml import etree
+
+NAMESPACES = {'activities': 'http://www.orcid.org/ns/activities',
+              'common': 'http://www.orcid.org/ns/common',
+              'work': 'http://www.orcid.org/ns/work'}
+
+_COMMON = '{%s}' % NAMESPACES['common']
+
+# The fields `extract` can read.
+FIELDS = ('put-codes', 'titles', 'external-ids', 'last-modified')
+
+PUT_CODES = etree.XPath('//@put-code')
+TITLES = etree.XPath('//common:title/text()', namespaces=NAMESPACES)
+EXTERNAL_IDS = etree.XPath('//common:external-id', namespaces=NAMESPACES)
+LAST_MODIFIED = etree.XPath('//common:last-modified-date/text()',
+                            namespaces=NAMESPACES)
+
+# Payloads come from the network: entities are not resolved. The size and
+# depth limits of lxml are kept.
+_PARSER_OPTIONS = {'resolve_entities': False, 'no_network': True}
+
+_local = threading.local()
+
+
+def _parser():
+    # lxml parsers must not be used by several threads at once.
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = _local.parser = etree.XMLParser(remove_blank_text=True,
+                                                 **_PARSER_OPTIONS)
+    return parser
+
+
+def parse_xml(data):
+    """Parse an ORCID XML payload.
+
+    Whitespace between elements is dropped and entities are not resolved,
+    unlike `lxml.etree.XML`.
+
+    Parameters
+    ----------
+    :param data: bytes
+        The payload.
+
+    Returns
+    -------
+    :returns: lxml.etree._Element
+        The root element.
+    """
+    return etree.fromstring(data, _parser())
+
+
+class TunedParser(object):
+    """Parser of responses using `parse_xml` for XML documents.
+
+    Pass it as the ``parser`` of the APIs. JSON documents and HTML pages
+    are parsed as without it.
+    """
+
+    def loads(self, data):
+        """Decode a JSON document."""
+        return json.loads(data)
+
+    def parse_xml(self, data):
+        """Parse an XML document with `parse_xml`."""
+        return parse_xml(data)
+
+    def parse_html(self, data):
+        """Parse an HTML page with html5lib."""
+        return BeautifulSoup(data, 'html5lib')
+
+
+def put_codes(tree):
+    """Return the put-codes of a tree, as integers."""
+    return [int(put_code) for put_code in PUT_CODES(tree)]
+
+
+def titles(tree):
+    """Return the titles of a tree."""
+    return [title.strip() for title in TITLES(tree)]
+
+
+def external_ids(tree):
+    """Return the external ids of a tree as ``(type, value)`` pairs."""
+    pairs = []
+    for external_id in EXTERNAL_IDS(tree):
+        pairs.append((external_id.findtext(_COMMON + 'external-id-type'),
+                      external_id.findtext(_COMMON + 'external-id-value')))
+    return pairs
+
+
+def last_modified(tree):
+    """Return the last modification dates of a tree."""
+    return [date.strip() for date in LAST_MODIFIED(tree)]
+
+
+class _PutCodeCollector(object):
+    """Parser target collecting the put-codes only.
+
+    Without ``data`` and ``end`` methods, the parser does not report the
+    text and the closing tags at all.
+    """
+
+    def __init__(self):
+        self._result = {'put-codes': []}
+        self._put_codes = self._result['put-codes']
+
+    def start(self, tag, attrib):
+        put_code = attrib.get('put-code')
+        if put_code:
+            self._put_codes.append(int(put_code))
+
+    def close(self):
+        return self._result
+
+
+_TEXT_FIELDS = {_COMMON + 'title': 'titles',
+                _COMMON + 'last-modified-date': 'last-modified',
+                _COMMON + 'external-id-type': 'external-ids',
+                _COMMON + 'external-id-value': 'external-ids'}
+
+
+class _FieldCollector(_PutCodeCollector):
+    """Parser target collecting fields from the parser events."""
+
+    def __init__(self, fields):
+        self._result = dict((field, []) for field in fields)
+        self._put_codes = self._result.get('put-codes')
+        self._text_tags = frozenset(tag for tag, field in _TEXT_FIELDS.items()
+                                    if field in self._result)
+        self._text = None
+        self._external_id = {}
+
+    def start(self, tag, attrib):
+        if self._put_codes is not None:
+            put_code = attrib.get('put-code')
+            if put_code:
+                self._put_codes.append(int(put_code))
+        if tag in self._text_tags:
+            self._text = []
+
+    def data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def end(self, tag):
+        if self._text is not None:
+            text = ''.join(self._text).strip()
+            self._text = None
+            field = _TEXT_FIELDS[tag]
+            if field == 'external-ids':
+                self._external_id[tag] = text
+            else:
+                self._result[field].append(text)
+        elif tag == _COMMON + 'external-id' and self._external_id:
+            self._result['external-ids'].append(
+                (self._external_id.get(_COMMON + 'external-id-type'),
+                 self._external_id.get(_COMMON + 'external-id-value')))
+            self._external_id = {}
+
+
+def extract(source, fields=FIELDS):
+    """Read fields from an XML payload without building its tree.
+
+    Parameters
+    ----------
+    :param source: bytes or file
+        The payload, or a file opened in binary mode.
+    :param fields: iterable of strings
+        Some of `FIELDS`.
+
+    Returns
+    -------
+    :returns: dict
+        Maps the fields to the lists of their values, in document order:
+        integers for 'put-codes', ``(type, value)`` pairs for
+        'external-ids' and strings for the others.
+    """
+    fields = set(fields)
+    unknown = fields - set(FIELDS)
+    if unknown:
+        raise ValueError('Unknown fields: %s' % ', '.join(sorted(unknown)))
+    if fields == set(['put-codes']):
+        target = _PutCodeCollector()
+    else:
+        target = _FieldCollector(fields)
+    parser = etree.XMLParser(target=target, **_PARSER_OPTIONS)
+    if isinstance(source, bytes):
+        return etree.fromstring(source, parser)
+    return etree.parse(source, parser)
@@ -38,7 +38,15 @@ setup(author='Mateusz Susik',
       ],
       cmdclass={'test': PyTest},
       description='A python wrapper over the ORCID API',
-      install_requires=['html5lib', 'beautifulsoup4', 'requests', 'simplejson', 'lxml'],
+      entry_points={'console_scripts': ['orcid=orcid.cli:main']},
+      extras_require={'parquet': ['pyarrow'],
+                      'http2': ['httpx[http2]'],
+                      'brotli': ['brotli'],
+                      'lmdb': ['lmdb'],
+                      'gevent': ['gevent'],
+                      'benchmarks': ['pytest', 'pytest-benchmark']},
+      install_requires=['html5lib', 'beautifulsoup4', 'requests', 'simplejson', 'lxml',
+                        'futures; python_version < "3"'],
       keywords=['orcid', 'api', 'wrapper'],
       license='BSD',
       long_description=open('README.rst', 'r').read(),